@@ -0,0 +1,114 @@
+"""
+Benchmark : temps et mémoire d'export par format (xlsx, csv, ndjson, parquet).
+
+Remplit une base SQLite temporaire puis exporte toutes les lignes avec le même
+chemin que `/api/v1/export` (curseur serveur + service d'export). Chaque
+format tourne dans un sous-processus pour mesurer son pic mémoire (RSS) isolé.
+
+Usage :
+    python benchmarks/bench_export_formats.py --rows 100000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FORMATS = ["csv", "ndjson", "parquet", "xlsx"]
+
+
+def _populate(rows: int) -> None:
+    from sqlalchemy import insert
+    from benchmarks.harness import migrate
+    from database.connexion import engine
+    from database.models import GeneratedContent
+
+    migrate(os.environ["DATABASE_URL"])
+    cibles = ["LinkedIn", "Facebook", "Instagram", "TikTok", "Mail"]
+    prospect_types = ["Peu qualifié", "Qualifié", "Hautement qualifié"]
+    texte = "Texte éditorial de démonstration pour le benchmark d'export. " * 8
+    batch = []
+    with engine.begin() as connection:
+        for i in range(rows):
+            batch.append({
+                "cible": cibles[i % 5],
+                "prospect_type": prospect_types[i % 3],
+                "generation_date": date(2025, 1, 6) + timedelta(days=7 * (i % 52)),
+                "theme_general": f"Thème général {i % 40}",
+                "theme_hebdo": f"Thème hebdo {i % 52}",
+                "texte": texte,
+                "used": i % 2,
+                "created_at": datetime(2025, 1, 1) + timedelta(seconds=i),
+            })
+            if len(batch) == 5000:
+                connection.execute(insert(GeneratedContent), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(GeneratedContent), batch)
+
+
+def _child(export_format: str) -> None:
+    from database.connexion import SessionLocal
+    from models.schemas import ExportFormatEnum
+    from repository.conn_repo import DBContentRepository
+    from services.content_export import ContentExportService
+
+    fmt = ExportFormatEnum(export_format)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    size = 0
+
+    if fmt in (ExportFormatEnum.CSV, ExportFormatEnum.NDJSON):
+        for chunk in ContentExportService.stream_rows(fmt, SessionLocal, 1000):
+            size += len(chunk)
+    else:
+        db = SessionLocal()
+        try:
+            rows = DBContentRepository(db).stream_content(chunk_size=1000)
+            output, _ = ContentExportService.build_file(fmt, rows)
+            for chunk in iter(lambda: output.read(64 * 1024), b""):
+                size += len(chunk)
+            output.close()
+        finally:
+            db.close()
+
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{export_format}\t{elapsed:.2f}\t{size / 1e6:.1f}\t{(peak - baseline) / 1024:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    if args.child:
+        _child(args.child)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_export_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    _populate(args.rows)
+
+    print(f"{args.rows} lignes")
+    print("format\ttemps(s)\ttaille(Mo)\tpic RSS(Mo)")
+    for export_format in args.formats.split(","):
+        result = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", export_format],
+            cwd=ROOT, env=os.environ, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"{export_format}\terreur : {result.stderr.strip().splitlines()[-1]}")
+        else:
+            print(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    main()
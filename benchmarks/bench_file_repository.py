@@ -0,0 +1,133 @@
+"""
+Benchmark : coût d'une sauvegarde de FileContentRepository selon la taille du stockage.
+
+Le stockage est rempli par lots jusqu'à chaque palier (1k, 10k, 100k contenus
+par défaut), puis on mesure la latence moyenne de `save_content_with_request`
+unitaire, de `mark_as_used` et de `get_content`. L'ancien format (tableau JSON
+relu et réécrit à chaque sauvegarde) est mesuré jusqu'à --legacy-max contenus.
+
+Usage :
+    python benchmarks/bench_file_repository.py --checkpoints 1000,10000,100000 --samples 200
+    python benchmarks/bench_file_repository.py --fsync-interval 0   # fsync à chaque écriture
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FILL_BATCH_SIZE = 5000
+
+
+def _item(i: int):
+    from models.schemas import CibleEnum, ContentRequest, ContentResponse, ProspectTypeEnum
+
+    cibles = list(CibleEnum)
+    prospect_types = list(ProspectTypeEnum)
+    request = ContentRequest(
+        cible=cibles[i % len(cibles)],
+        prospect_type=prospect_types[i % len(prospect_types)],
+        date=date(2025, 1, 6).isoformat()
+    )
+    content = ContentResponse(
+        theme_general=f"Thème général {i % 40}",
+        theme_hebdo=f"Thème hebdo {i % 52}",
+        texte="Texte éditorial de démonstration pour le benchmark du stockage fichier. " * 6,
+        cible=request.cible,
+        prospect_type=request.prospect_type,
+        generation_date=request.date
+    )
+    return content, request
+
+
+def _legacy_save(path: str, content, request) -> None:
+    """Ancien FileContentRepository : relecture et réécriture complètes du tableau JSON"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = []
+    content_dict = content.model_dump(mode="json")
+    content_dict.update({"cible": request.cible.value, "prospect_type": request.prospect_type.value})
+    content_dict["created_at"] = datetime.now().isoformat()
+    data.append(content_dict)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+async def _run(args) -> None:
+    from repository.content_repo import FileContentRepository
+
+    workdir = tempfile.mkdtemp(prefix="bench_file_repo_")
+    repository = FileContentRepository(os.path.join(workdir, "contents.ndjson"), fsync_interval=args.fsync_interval)
+    legacy_path = os.path.join(workdir, "legacy.json")
+    checkpoints = sorted(int(value) for value in args.checkpoints.split(","))
+    sample = [_item(i) for i in range(args.samples)]
+
+    print(f"fsync toutes les {args.fsync_interval}s, {args.samples} mesures par palier (µs par opération)")
+    print("contenus\tsave\tmark_as_used\tget_content\tancien save")
+    stored = 0
+    try:
+        for checkpoint in checkpoints:
+            while stored < checkpoint:
+                batch = min(FILL_BATCH_SIZE, checkpoint - stored)
+                await repository.save_many([_item(stored + i) for i in range(batch)])
+                stored += batch
+
+            start = time.perf_counter()
+            for content, request in sample:
+                await repository.save_content_with_request(content, request)
+            save = (time.perf_counter() - start) / len(sample)
+            stored += len(sample)
+
+            start = time.perf_counter()
+            for content_id in range(1, stored + 1, max(1, stored // len(sample)))[:len(sample)]:
+                await repository.mark_as_used(content_id)
+            mark = (time.perf_counter() - start) / len(sample)
+
+            start = time.perf_counter()
+            for content_id in range(stored, 0, -max(1, stored // len(sample)))[:len(sample)]:
+                await repository.get_content(content_id)
+            read = (time.perf_counter() - start) / len(sample)
+
+            legacy = "-"
+            if checkpoint <= args.legacy_max:
+                with open(legacy_path, "w", encoding="utf-8") as f:
+                    json.dump([_item(i)[0].model_dump(mode="json") for i in range(checkpoint)], f, indent=2)
+                samples = sample[:max(1, len(sample) // 10)]
+                start = time.perf_counter()
+                for content, request in samples:
+                    _legacy_save(legacy_path, content, request)
+                legacy = f"{(time.perf_counter() - start) / len(samples) * 1e6:.0f}"
+
+            print(f"{checkpoint}\t{save * 1e6:.0f}\t{mark * 1e6:.0f}\t{read * 1e6:.0f}\t{legacy}")
+
+        start = time.perf_counter()
+        unused = await repository.get_unused_content()
+        print(f"get_unused_content : {len(unused)} contenus en {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        patched = await repository.compact()
+        print(f"compact : {patched} lignes en {time.perf_counter() - start:.2f}s")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoints", default="1000,10000,100000")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--fsync-interval", type=float, default=1.0)
+    parser.add_argument("--legacy-max", type=int, default=10000, help="Taille maximale mesurée pour l'ancien format")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
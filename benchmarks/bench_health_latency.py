@@ -0,0 +1,94 @@
+"""
+Benchmark : latence de /health pendant une charge de génération.
+
+Démarre le serveur OpenAI factice et l'API (SQLite local), lance des appels
+concurrents à /api/v1/generate-content et sonde /health en parallèle pour
+mesurer p50/p99. Avec un client OpenAI bloquant, /health attend la fin de
+chaque génération ; avec le client asynchrone, il reste à quelques ms.
+
+Usage :
+    python benchmarks/bench_health_latency.py --generations 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.harness import migrate, percentile, start_server, stop_servers, wait_ready  # noqa: E402
+
+
+async def _run(args):
+    api = f"http://127.0.0.1:{args.api_port}"
+    health_latencies = []
+    generation_latencies = []
+
+    async with httpx.AsyncClient(timeout=120, limits=httpx.Limits(max_connections=args.concurrency + 5)) as client:
+        semaphore = asyncio.Semaphore(args.concurrency)
+        payload = {"cible": "LinkedIn", "prospect_type": "Qualifié", "date": "2025-06-15"}
+
+        async def generate():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(f"{api}/api/v1/generate-content", json=payload)
+                response.raise_for_status()
+                generation_latencies.append(time.perf_counter() - start)
+
+        async def probe(stop: asyncio.Event):
+            while not stop.is_set():
+                start = time.perf_counter()
+                await client.get(f"{api}/health")
+                health_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(args.probe_interval)
+
+        stop = asyncio.Event()
+        prober = asyncio.create_task(probe(stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(generate() for _ in range(args.generations)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await prober
+
+    print(f"Générations : {args.generations} en {wall:.2f}s ({args.generations / wall:.1f} req/s)")
+    print(f"  génération p50={statistics.median(generation_latencies) * 1000:.0f}ms "
+          f"p99={percentile(generation_latencies, 99) * 1000:.0f}ms")
+    print(f"/health ({len(health_latencies)} sondes) : "
+          f"p50={statistics.median(health_latencies) * 1000:.1f}ms "
+          f"p99={percentile(health_latencies, 99) * 1000:.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    parser.add_argument("--api-port", type=int, default=9000)
+    parser.add_argument("--openai-port", type=int, default=9100)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_health_")
+    database_url = f"sqlite:///{workdir}/bench.db"
+    migrate(database_url)
+    fake = start_server("benchmarks.fake_openai:app", args.openai_port, {"FAKE_OPENAI_LATENCY_MS": str(args.latency_ms)})
+    api = start_server("main:app", args.api_port, {
+        "DATABASE_URL": database_url,
+        "OPENAI_API_KEY": "sk-fake",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.openai_port}/v1",
+        "OPENAI_MAX_CONCURRENCY": str(args.concurrency),
+    })
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{args.openai_port}/docs"))
+        asyncio.run(wait_ready(f"http://127.0.0.1:{args.api_port}/health"))
+        asyncio.run(_run(args))
+    finally:
+        stop_servers(api, fake)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark : coût de construction du prompt par requête.
+
+Compare, sur les mêmes requêtes :
+- fstring : l'ancien prompt f-string inline (reproduit ici) ;
+- template : `string.Template.substitute` sur le fichier à chaque requête ;
+- compiled : registre précompilé (`services/prompt_templates.py`), messages compris.
+
+Usage :
+    python benchmarks/bench_prompt_render.py --iterations 100000
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from string import Template
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.schemas import CibleEnum, ContentRequest, ProspectTypeEnum  # noqa: E402
+from services.prompt_templates import PromptTemplateRegistry  # noqa: E402
+
+
+def fstring_prompt(request: ContentRequest) -> str:
+    """Prompt construit inline avant l'introduction des templates"""
+    return f"""
+      Tu es un expert en marketing digital, en communication éditoriale et en veille contextuelle mondiale et locale.
+
+      Ta mission est de générer un contenu éditorial pour :
+      - Cible : {request.cible.value}
+      - Type de prospect : {request.prospect_type.value}
+      - Date de référence : {request.date}
+
+      Tu dois détecter automatiquement :
+      - le **contexte local** (pays ou région d’où l’API semble utilisée),
+      - et/ou les **tendances populaires au niveau mondial** à ce moment-là.
+
+      Le `theme_hebdo` doit refléter **un fait marquant** ou **un sujet populaire cette semaine-là**, comme :
+      - une fête ou journée spéciale (locale ou internationale),
+      - une actualité virale ou buzz sur les réseaux sociaux,
+      - une tendance dans la culture, la tech, l’économie ou l’environnement.
+
+      Ta réponse doit être un **JSON strictement valide** contenant :
+      {{
+        "theme_general": "ligne éditoriale principale adaptée à {request.cible.value}",
+        "theme_hebdo": "focus éditorial spécifique pour la semaine du {request.date}, basé sur un contexte local ou une tendance populaire actuelle",
+        "texte": "contenu à publier, engageant et adapté à un public {request.prospect_type.value} sur {request.cible.value}"
+      }}
+
+      ⚠️ Réponds uniquement avec ce JSON. N’invente aucun fait. Si rien de pertinent n’existe, propose un thème intemporel ou inspirant.
+      """
+
+
+def _measure(label: str, render, requests, iterations: int) -> None:
+    cycle = itertools.islice(itertools.cycle(requests), iterations)
+    start = time.perf_counter()
+    for request in cycle:
+        render(request)
+    elapsed = time.perf_counter() - start
+    print(f"{label}\t{elapsed * 1e6 / iterations:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--variants", default="", help="PROMPT_VARIANT_WEIGHTS, ex: default:90,concise:10")
+    args = parser.parse_args()
+
+    requests = [
+        ContentRequest(cible=cible, prospect_type=prospect_type, date=f"2025-06-{day:02d}")
+        for cible in CibleEnum for prospect_type in ProspectTypeEnum for day in (2, 9, 16, 23)
+    ]
+
+    start = time.perf_counter()
+    registry = PromptTemplateRegistry(variant_weights=args.variants)
+    print(f"compilation des templates : {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    source = Template((registry.directory / "default.txt").read_text(encoding="utf-8").strip())
+
+    def template_prompt(request: ContentRequest) -> str:
+        return source.substitute(
+            cible=request.cible.value, prospect_type=request.prospect_type.value, date=request.date
+        )
+
+    print(f"{args.iterations} rendus, {len(requests)} requêtes distinctes")
+    print("méthode\tµs/rendu")
+    _measure("fstring", fstring_prompt, requests, args.iterations)
+    _measure("template", template_prompt, requests, args.iterations)
+    _measure("compiled", registry.render, requests, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark : débit utile et contenus de secours face à des 429.
+
+Le serveur OpenAI factice applique une limite de requêtes par minute
+(`FAKE_OPENAI_RPM`) et répond 429 au-delà. Trois configurations du client
+sont comparées, chacune contre un serveur neuf :
+- fail-fast : aucune reprise, chaque 429 donne un contenu de secours ;
+- sdk : reprises intégrées du SDK OpenAI (OPENAI_MAX_RETRIES=2) ;
+- adaptive : limiteur partagé, backoff avec jitter et disjoncteur.
+
+Usage :
+    python benchmarks/bench_rate_limit.py --generations 300 --concurrency 50 --rpm 1200
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "fail-fast": {"OPENAI_RESILIENCE_ENABLED": "false", "OPENAI_MAX_RETRIES": "0"},
+    "sdk": {"OPENAI_RESILIENCE_ENABLED": "false", "OPENAI_MAX_RETRIES": "2"},
+    "adaptive": {"OPENAI_RESILIENCE_ENABLED": "true", "OPENAI_MAX_RETRIES": "0"},
+}
+
+
+async def _child(generations: int, concurrency: int) -> None:
+    from models.schemas import CibleEnum, ContentRequest, ProspectTypeEnum
+    from services.content_ai import OpenAIContentGenerator
+    from services.openai_client import close_async_openai_client
+
+    generator = OpenAIContentGenerator()
+    semaphore = asyncio.Semaphore(concurrency)
+    cibles = list(CibleEnum)
+    results = []
+
+    async def generate(i: int):
+        request = ContentRequest(cible=cibles[i % len(cibles)], prospect_type=ProspectTypeEnum.QUALIFIE, date="2025-06-16")
+        async with semaphore:
+            results.append(await generator.generate_content(request))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(generate(i) for i in range(generations)))
+    elapsed = time.perf_counter() - start
+    await close_async_openai_client()
+
+    fallbacks = sum(1 for content in results if content.fallback)
+    succeeded = generations - fallbacks
+    print(f"{succeeded}\t{fallbacks}\t{elapsed:.2f}\t{succeeded / elapsed:.1f}")
+
+
+def _wait_ready(port: int, timeout: float = 20) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs")
+            return
+        except httpx.TransportError:
+            time.sleep(0.1)
+    raise RuntimeError("Serveur OpenAI factice non démarré")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--generations", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rpm", type=float, default=1200)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--openai-port", type=int, default=9100)
+    parser.add_argument("--modes", default=",".join(MODES))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        asyncio.run(_child(args.generations, args.concurrency))
+        return
+
+    print(f"{args.generations} générations, concurrence {args.concurrency}, limite {args.rpm:.0f} req/min")
+    print("mode\tsuccès\tsecours\ttemps(s)\tsuccès/s")
+    for mode in args.modes.split(","):
+        fake = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "benchmarks.fake_openai:app",
+             "--port", str(args.openai_port), "--log-level", "warning"],
+            cwd=ROOT,
+            env={**os.environ, "FAKE_OPENAI_RPM": str(args.rpm), "FAKE_OPENAI_LATENCY_MS": str(args.latency_ms)},
+        )
+        try:
+            _wait_ready(args.openai_port)
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child",
+                 "--generations", str(args.generations), "--concurrency", str(args.concurrency)],
+                cwd=ROOT,
+                env={
+                    **os.environ,
+                    **MODES[mode],
+                    "OPENAI_API_KEY": "sk-fake",
+                    "OPENAI_BASE_URL": f"http://127.0.0.1:{args.openai_port}/v1",
+                    "OPENAI_MAX_CONCURRENCY": str(args.concurrency),
+                },
+                capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                print(f"{mode}\terreur : {result.stderr.strip().splitlines()[-1]}")
+            else:
+                print(f"{mode}\t{result.stdout.strip().splitlines()[-1]}")
+        finally:
+            fake.terminate()
+            fake.wait()
+
+
+if __name__ == "__main__":
+    main()
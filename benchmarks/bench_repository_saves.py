@@ -0,0 +1,109 @@
+"""
+Benchmark : débit d'insertion (lignes/s) de DBContentRepository.
+
+Compare `save_content_with_request` appelé ligne par ligne à `save_many` par
+lots. Par défaut sur une base SQLite temporaire ; `DATABASE_URL` permet de
+cibler PostgreSQL (le chemin COPY s'active au-delà de BULK_COPY_THRESHOLD).
+
+Usage :
+    python benchmarks/bench_repository_saves.py --rows 5000 --batch-size 500
+    DATABASE_URL=postgresql://... python benchmarks/bench_repository_saves.py --rows 20000 --batch-size 10000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _items(rows: int):
+    from models.schemas import CibleEnum, ContentRequest, ContentResponse, ProspectTypeEnum
+
+    cibles = list(CibleEnum)
+    prospect_types = list(ProspectTypeEnum)
+    texte = "Texte éditorial de démonstration pour le benchmark d'insertion. " * 8
+    for i in range(rows):
+        generation_date = date(2025, 1, 6) + timedelta(days=7 * (i % 52))
+        request = ContentRequest(
+            cible=cibles[i % len(cibles)],
+            prospect_type=prospect_types[i % len(prospect_types)],
+            date=generation_date.isoformat()
+        )
+        content = ContentResponse(
+            theme_general=f"Thème général {i % 40}",
+            theme_hebdo=f"Thème hebdo {i % 52}",
+            texte=texte,
+            cible=request.cible,
+            prospect_type=request.prospect_type,
+            generation_date=generation_date
+        )
+        yield content, request
+
+
+async def _bench_single(rows: int) -> float:
+    from database.connexion import session_scope
+    from repository.conn_repo import DBContentRepository
+
+    async with session_scope() as db:
+        repository = DBContentRepository(db)
+        start = time.perf_counter()
+        for content, request in _items(rows):
+            if not await repository.save_content_with_request(content, request):
+                raise RuntimeError("save_content_with_request a échoué")
+        return time.perf_counter() - start
+
+
+async def _bench_bulk(rows: int, batch_size: int) -> float:
+    from database.connexion import session_scope
+    from repository.conn_repo import DBContentRepository
+
+    items = list(_items(rows))
+    async with session_scope() as db:
+        repository = DBContentRepository(db)
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            ids = await repository.save_many(items[offset:offset + batch_size])
+            if not ids:
+                raise RuntimeError("save_many n'a inséré aucune ligne")
+        return time.perf_counter() - start
+
+
+async def _run(args) -> None:
+    from benchmarks.harness import migrate
+    from database.connexion import dispose_engines, engine
+
+    # Schéma migré (index compris) : celui que l'application utilise
+    migrate(os.environ["DATABASE_URL"])
+    print(f"{args.rows} lignes, base : {engine.url.get_backend_name()}")
+    print("mode\ttemps(s)\tlignes/s")
+
+    elapsed = await _bench_single(args.rows)
+    print(f"unitaire\t{elapsed:.2f}\t{args.rows / elapsed:.0f}")
+
+    elapsed = await _bench_bulk(args.rows, args.batch_size)
+    print(f"lot de {args.batch_size}\t{elapsed:.2f}\t{args.rows / elapsed:.0f}")
+
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        workdir = tempfile.mkdtemp(prefix="bench_saves_")
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ.setdefault("DB_ECHO", "false")
+
+    sys.path.insert(0, ROOT)
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Serveur OpenAI factice pour les benchmarks locaux.
+
+Implémente le strict nécessaire de `/v1/chat/completions` (avec ou sans
+`stream`) avec une latence et un taux d'erreur configurables, ainsi que `/v1/files` et
+`/v1/batches` pour tester le mode batch de bout en bout, sans jamais appeler
+le vrai fournisseur.
+
+Lancement :
+    FAKE_OPENAI_LATENCY_MS=800 uvicorn benchmarks.fake_openai:app --port 9100
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+FAKE_OPENAI_LATENCY_MS = float(os.getenv("FAKE_OPENAI_LATENCY_MS", "500"))
+# Latence supplémentaire tirée uniformément dans [0, jitter]
+FAKE_OPENAI_LATENCY_JITTER_MS = float(os.getenv("FAKE_OPENAI_LATENCY_JITTER_MS", "0"))
+# Part des appels en erreur serveur (500 / 503), comme une panne partielle du fournisseur
+FAKE_OPENAI_ERROR_RATE = float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0"))
+# En mode stream : latence avant le premier token puis délai entre deux deltas
+FAKE_OPENAI_TOKEN_INTERVAL_MS = float(os.getenv("FAKE_OPENAI_TOKEN_INTERVAL_MS", "10"))
+# Limite de requêtes par minute simulée (0 = illimité) : au-delà, réponse 429.
+# La rafale tolérée vaut par défaut une seconde de débit.
+FAKE_OPENAI_RPM = float(os.getenv("FAKE_OPENAI_RPM", "0"))
+FAKE_OPENAI_BURST = float(os.getenv("FAKE_OPENAI_BURST", str(max(1.0, FAKE_OPENAI_RPM / 60))))
+# Part des réponses mal formées quand la requête n'impose pas de JSON schema
+# (balises de code, texte autour du JSON ou JSON tronqué, comme un vrai modèle)
+FAKE_OPENAI_MALFORMED_RATE = float(os.getenv("FAKE_OPENAI_MALFORMED_RATE", "0"))
+
+app = FastAPI(title="Fake OpenAI")
+
+
+class _FakeRateLimit:
+    """Seau à jetons côté serveur, avec les en-têtes x-ratelimit-* d'OpenAI"""
+
+    def __init__(self, rpm: float, burst: float):
+        self.rpm = rpm
+        self.burst = burst
+        self.level = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> tuple:
+        """Retourne (accepté, en-têtes)"""
+        now = time.monotonic()
+        self.level = min(self.burst, self.level + (now - self.updated) * self.rpm / 60)
+        self.updated = now
+        accepted = self.level >= 1
+        if accepted:
+            self.level -= 1
+        reset = (1 - self.level) * 60 / self.rpm if self.level < 1 else 0.0
+        headers = {
+            "x-ratelimit-limit-requests": str(int(self.rpm)),
+            "x-ratelimit-remaining-requests": str(int(self.level)),
+            "x-ratelimit-reset-requests": f"{int(reset * 1000)}ms",
+        }
+        if not accepted:
+            headers["retry-after-ms"] = str(int(reset * 1000) + 1)
+        return accepted, headers
+
+
+_rate_limit = _FakeRateLimit(FAKE_OPENAI_RPM, FAKE_OPENAI_BURST) if FAKE_OPENAI_RPM > 0 else None
+
+# Stockage en mémoire des fichiers et batches
+_files = {}
+_batches = {}
+
+
+def _latency() -> float:
+    return (FAKE_OPENAI_LATENCY_MS + random.uniform(0, FAKE_OPENAI_LATENCY_JITTER_MS)) / 1000
+
+
+# Vocabulaire des textes factices : chaque texte est différent (pas de quasi-doublon)
+_WORDS = (
+    "marque", "client", "projet", "équipe", "coulisses", "conseil", "tendance", "semaine", "offre",
+    "atelier", "témoignage", "astuce", "question", "communauté", "lancement", "résultat", "vidéo",
+    "réseau", "stratégie", "idée", "partage", "expertise", "défi", "solution", "histoire", "produit",
+    "événement", "engagement", "découverte", "inspiration", "nouveauté", "qualité", "service", "valeur",
+)
+
+
+def _fake_content(prompt: str) -> str:
+    return json.dumps({
+        "theme_general": "Ligne éditoriale de démonstration",
+        "theme_hebdo": "Focus de la semaine (serveur factice)",
+        "texte": f"Texte généré localement ({len(prompt)} caractères de prompt) : "
+                 + " ".join(random.choices(_WORDS, k=40)) + ".",
+    }, ensure_ascii=False)
+
+
+def _malformed(content: str) -> str:
+    return random.choice([
+        f"```json\n{content}\n```",
+        f"Voici le contenu demandé :\n{content}",
+        content[:len(content) // 2],
+    ])
+
+
+def _completion(body: dict) -> dict:
+    prompt = body["messages"][-1]["content"]
+    content = _fake_content(prompt)
+    structured = (body.get("response_format") or {}).get("type") == "json_schema"
+    if not structured and random.random() < FAKE_OPENAI_MALFORMED_RATE:
+        content = _malformed(content)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake-model"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content, "refusal": None},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 60, "total_tokens": len(prompt) // 4 + 60},
+    }
+
+
+async def _stream_completion(body: dict):
+    completion = _completion(body)
+    text = completion["choices"][0]["message"]["content"]
+    base = {key: completion[key] for key in ("id", "created", "model")}
+    base["object"] = "chat.completion.chunk"
+
+    await asyncio.sleep(_latency())
+    for start in range(0, len(text), 8):
+        chunk = {**base, "choices": [{"index": 0, "delta": {"content": text[start:start + 8]}, "finish_reason": None}]}
+        yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        await asyncio.sleep(FAKE_OPENAI_TOKEN_INTERVAL_MS / 1000)
+
+    yield f"data: {json.dumps({**base, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield f"data: {json.dumps({**base, 'choices': [], 'usage': completion['usage']})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    headers = {}
+    if _rate_limit is not None:
+        accepted, headers = _rate_limit.take()
+        if not accepted:
+            return JSONResponse(
+                status_code=429,
+                headers=headers,
+                content={"error": {"message": "Rate limit reached for requests", "type": "requests", "code": "rate_limit_exceeded"}}
+            )
+    if random.random() < FAKE_OPENAI_ERROR_RATE:
+        await asyncio.sleep(_latency())
+        return JSONResponse(
+            status_code=random.choice((500, 503)),
+            content={"error": {"message": "The server had an error while processing your request", "type": "server_error"}}
+        )
+    if body.get("stream"):
+        return StreamingResponse(_stream_completion(body), media_type="text/event-stream", headers=headers)
+    await asyncio.sleep(_latency())
+    return JSONResponse(_completion(body), headers=headers)
+
+
+def _file_object(file_id: str, filename: str, purpose: str) -> dict:
+    return {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(_files[file_id]),
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "status": "processed",
+    }
+
+
+@app.post("/v1/files")
+async def upload_file(file: UploadFile = File(...), purpose: str = Form(...)):
+    file_id = f"file-{uuid.uuid4().hex}"
+    _files[file_id] = await file.read()
+    return _file_object(file_id, file.filename or "upload.jsonl", purpose)
+
+
+@app.get("/v1/files/{file_id}/content")
+async def file_content(file_id: str):
+    if file_id not in _files:
+        raise HTTPException(status_code=404, detail="file not found")
+    return PlainTextResponse(_files[file_id])
+
+
+def _run_batch(input_file_id: str) -> tuple:
+    lines = []
+    for raw in _files[input_file_id].decode("utf-8").splitlines():
+        if not raw.strip():
+            continue
+        item = json.loads(raw)
+        lines.append(json.dumps({
+            "id": f"batch_req_{uuid.uuid4().hex}",
+            "custom_id": item["custom_id"],
+            "response": {"status_code": 200, "request_id": uuid.uuid4().hex, "body": _completion(item["body"])},
+            "error": None,
+        }, ensure_ascii=False))
+    output_file_id = f"file-{uuid.uuid4().hex}"
+    _files[output_file_id] = ("\n".join(lines) + "\n").encode("utf-8")
+    return output_file_id, len(lines)
+
+
+@app.post("/v1/batches")
+async def create_batch(request: Request):
+    body = await request.json()
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    _batches[batch_id] = {
+        "id": batch_id,
+        "object": "batch",
+        "endpoint": body["endpoint"],
+        "input_file_id": body["input_file_id"],
+        "completion_window": body["completion_window"],
+        "status": "validating",
+        "created_at": int(time.time()),
+        "metadata": body.get("metadata"),
+        "output_file_id": None,
+        "error_file_id": None,
+        "request_counts": {"total": 0, "completed": 0, "failed": 0},
+    }
+    return _batches[batch_id]
+
+
+@app.get("/v1/batches/{batch_id}")
+async def retrieve_batch(batch_id: str):
+    batch = _batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="batch not found")
+    # Un tour de polling en "in_progress" avant la complétion
+    if batch["status"] == "validating":
+        batch["status"] = "in_progress"
+    elif batch["status"] == "in_progress":
+        output_file_id, count = _run_batch(batch["input_file_id"])
+        batch.update({
+            "status": "completed",
+            "output_file_id": output_file_id,
+            "request_counts": {"total": count, "completed": count, "failed": 0},
+        })
+    return batch
@@ -0,0 +1,107 @@
+"""
+Outils communs des benchmarks : lancement des serveurs, percentiles, mémoire.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import Optional, Sequence
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def wait_ready(url: str, timeout: float = 20) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"Serveur non démarré : {url}")
+
+
+def start_server(module: str, port: int, env: dict) -> subprocess.Popen:
+    """Lance `uvicorn module --port port` depuis la racine du dépôt"""
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env={**os.environ, **env},
+    )
+
+
+def migrate(database_url: str) -> None:
+    """Crée ou met à jour le schéma de la base (alembic upgrade head)"""
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": database_url},
+        check=True,
+        capture_output=True,
+    )
+
+
+def stop_servers(*processes: subprocess.Popen) -> None:
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Mémoire résidente d'un processus (Linux, /proc) ; None ailleurs"""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class MemorySampler:
+    """Échantillonne la mémoire résidente d'un processus pendant un scénario"""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        self.pid = pid
+        self.interval = interval
+        self.start_rss = rss_bytes(pid)
+        self.peak_rss = self.start_rss
+        self._task: Optional[asyncio.Task] = None
+
+    async def _sample(self) -> None:
+        while True:
+            rss = rss_bytes(self.pid)
+            if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+                self.peak_rss = rss
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self) -> "MemorySampler":
+        self._task = asyncio.create_task(self._sample())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._task.cancel()
+        self.end_rss = rss_bytes(self.pid)
+
+
+def git_revision() -> str:
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        return f"{revision}-dirty" if dirty else revision
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
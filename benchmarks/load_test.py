@@ -0,0 +1,335 @@
+"""
+Test de charge de l'API contre un serveur OpenAI factice.
+
+Démarre le serveur factice (latence, jitter, taux d'erreur, streaming) et
+l'API sur une base SQLite temporaire (ou `--database-url` PostgreSQL),
+pré-remplit la base, puis envoie pour chaque scénario un nombre fixe de
+requêtes avec une concurrence donnée. Pour chaque scénario : débit,
+percentiles de latence totale et du premier octet, mémoire résidente de l'API
+(début, pic, fin) et contenus de secours / retries OpenAI lus sur /metrics.
+
+Scénarios : generate (/generate-content), stream (/generate-content/stream),
+hebdo (/generate-content-hebdo), getall (/getall-contents), excel
+(/extract-excel), export (/export?format=csv).
+
+Les résultats s'enregistrent en JSON (`--output`, avec le commit) et se
+comparent à une exécution de référence (`--compare`) : le script sort en
+erreur si une métrique se dégrade au-delà de `--threshold` %.
+
+Usage :
+    python benchmarks/load_test.py --concurrency 50 --requests 300 --output bench-main.json
+    python benchmarks/load_test.py --scenarios generate,getall,excel=20 --compare bench-main.json
+    python benchmarks/load_test.py --latency-ms 800 --jitter-ms 400 --error-rate 0.05 --scenarios generate,stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.harness import (  # noqa: E402
+    MemorySampler, git_revision, migrate, percentile, start_server, stop_servers, wait_ready
+)
+
+CIBLES = ["LinkedIn", "Facebook", "Instagram", "TikTok", "Mail"]
+PROSPECT_TYPES = ["Peu qualifié", "Qualifié", "Hautement qualifié"]
+BASE_DATE = date(2025, 1, 6)
+SCENARIOS = ("generate", "stream", "hebdo", "getall", "excel", "export")
+# Métriques comparées : (chemin, sens) ; +1 plus grand est meilleur, -1 plus petit est meilleur
+COMPARED_METRICS = (
+    (("throughput_rps",), 1),
+    (("latency_ms", "p50"), -1),
+    (("latency_ms", "p99"), -1),
+    (("rss_mb", "peak"), -1),
+)
+# Écarts absolus ignorés (bruit de mesure) : 2 ms, 2 Mo, 0.5 req/s
+NOISE_FLOOR = {"latency_ms": 2.0, "rss_mb": 2.0, "throughput_rps": 0.5}
+
+
+def _generation_payload(index: int, key_space: int) -> dict:
+    """Requête `index` ; au-delà de `key_space` requêtes distinctes, les clés se répètent (cache)"""
+    key = index % key_space
+    return {
+        "cible": CIBLES[key % len(CIBLES)],
+        "prospect_type": PROSPECT_TYPES[(key // len(CIBLES)) % len(PROSPECT_TYPES)],
+        "date": (BASE_DATE + timedelta(weeks=key // (len(CIBLES) * len(PROSPECT_TYPES)))).isoformat(),
+    }
+
+
+def _request_for(scenario: str, index: int, args) -> Tuple[str, str, dict]:
+    """(méthode, chemin, options httpx) de la requête `index` du scénario"""
+    if scenario == "generate":
+        return "POST", "/api/v1/generate-content", {"json": _generation_payload(index, args.key_space)}
+    if scenario == "stream":
+        return "POST", "/api/v1/generate-content/stream", {"json": _generation_payload(index, args.key_space)}
+    if scenario == "hebdo":
+        day = BASE_DATE + timedelta(weeks=index % args.key_space)
+        return "POST", "/api/v1/generate-content-hebdo", {"params": {"date_": day.isoformat()}}
+    if scenario == "getall":
+        offset = random.randrange(0, max(1, args.seed_rows - args.page_size))
+        return "GET", "/api/v1/getall-contents", {"params": {"limit": args.page_size, "offset": offset}}
+    if scenario == "excel":
+        return "GET", "/api/v1/extract-excel", {}
+    if scenario == "export":
+        return "GET", "/api/v1/export", {"params": {"format": "csv"}}
+    raise ValueError(f"Scénario inconnu : {scenario}")
+
+
+def _parse_scenarios(value: str, default_requests: int) -> List[Tuple[str, int]]:
+    scenarios = []
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, requests = item.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Scénario inconnu : {name} (disponibles : {', '.join(SCENARIOS)})")
+        scenarios.append((name, int(requests) if requests else default_requests))
+    return scenarios
+
+
+def _metric_totals(text: str, names: Tuple[str, ...]) -> Dict[str, float]:
+    """Somme de chaque compteur Prometheus, toutes étiquettes confondues"""
+    totals = {name: 0.0 for name in names}
+    for line in text.splitlines():
+        name = line.split("{", 1)[0].split(" ", 1)[0]
+        if name in totals:
+            totals[name] += float(line.rsplit(" ", 1)[1])
+    return totals
+
+
+async def _metrics(client: httpx.AsyncClient, api: str) -> Dict[str, float]:
+    response = await client.get(f"{api}/metrics")
+    return _metric_totals(response.text, ("content_fallback_total", "openai_retries_total"))
+
+
+def _seed(args, database_url: str) -> None:
+    """Insère `seed_rows` contenus via save_many (lectures et exports)"""
+    os.environ["DATABASE_URL"] = database_url
+    from database.connexion import engine, session_scope
+    from models.schemas import ContentRequest, ContentResponse
+    from repository.conn_repo import DBContentRepository
+
+    texte = "Texte éditorial de démonstration pour le test de charge. " * 8
+
+    async def _insert():
+        async with session_scope() as db:
+            repository = DBContentRepository(db)
+            for offset in range(0, args.seed_rows, 5000):
+                items = []
+                for index in range(offset, min(args.seed_rows, offset + 5000)):
+                    request = ContentRequest(**_generation_payload(index, args.seed_rows))
+                    items.append((ContentResponse(
+                        theme_general=f"Thème général {index % 40}",
+                        theme_hebdo=f"Thème hebdo {index % 52}",
+                        texte=texte,
+                        cible=request.cible,
+                        prospect_type=request.prospect_type,
+                        generation_date=request.date
+                    ), request))
+                await repository.save_many(items)
+
+    asyncio.run(_insert())
+    engine.dispose()
+
+
+async def _run_scenario(client: httpx.AsyncClient, api: str, api_pid: int,
+                        scenario: str, requests: int, args) -> dict:
+    latencies: List[float] = []
+    first_bytes: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def send(index: int, record: bool) -> None:
+        nonlocal errors
+        method, path, options = _request_for(scenario, index, args)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with client.stream(method, f"{api}{path}", **options) as response:
+                    first_byte = None
+                    async for _ in response.aiter_raw():
+                        if first_byte is None:
+                            first_byte = time.perf_counter() - start
+                    failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed, first_byte = True, None
+            elapsed = time.perf_counter() - start
+        if not record:
+            return
+        if failed:
+            errors += 1
+            return
+        latencies.append(elapsed)
+        if first_byte is not None:
+            first_bytes.append(first_byte)
+
+    await asyncio.gather(*(send(-index - 1, False) for index in range(args.warmup)))
+
+    before = await _metrics(client, api)
+    with MemorySampler(api_pid) as memory:
+        started = time.perf_counter()
+        await asyncio.gather(*(send(index, True) for index in range(requests)))
+        wall = time.perf_counter() - started
+    after = await _metrics(client, api)
+
+    def _ms(values: List[float]) -> Optional[dict]:
+        if not values:
+            return None
+        return {
+            "p50": round(percentile(values, 50) * 1000, 2),
+            "p90": round(percentile(values, 90) * 1000, 2),
+            "p99": round(percentile(values, 99) * 1000, 2),
+            "max": round(max(values) * 1000, 2),
+        }
+
+    def _mb(value: Optional[int]) -> Optional[float]:
+        return round(value / 1024 / 1024, 1) if value is not None else None
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": _ms(latencies),
+        "first_byte_ms": _ms(first_bytes),
+        "rss_mb": {"start": _mb(memory.start_rss), "peak": _mb(memory.peak_rss), "end": _mb(memory.end_rss)},
+        "fallbacks": int(after["content_fallback_total"] - before["content_fallback_total"]),
+        "openai_retries": int(after["openai_retries_total"] - before["openai_retries_total"]),
+    }
+
+
+def _format_row(name: str, result: dict) -> str:
+    latency = result["latency_ms"] or {}
+    first_byte = result["first_byte_ms"] or {}
+    return "\t".join(str(value) for value in (
+        name, result["requests"], result["errors"], result["throughput_rps"],
+        latency.get("p50", "-"), latency.get("p90", "-"), latency.get("p99", "-"),
+        first_byte.get("p50", "-"), result["rss_mb"]["peak"] or "-", result["fallbacks"], result["openai_retries"],
+    ))
+
+
+def _lookup(result: dict, path: Tuple[str, ...]) -> Optional[float]:
+    value = result
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Lignes de comparaison ; les régressions au-delà de `threshold` % commencent par REGRESSION"""
+    lines = [f"Comparaison avec {baseline.get('revision', '?')} ({baseline.get('timestamp', '?')})"]
+    for scenario, result in current["scenarios"].items():
+        reference = baseline.get("scenarios", {}).get(scenario)
+        if reference is None:
+            continue
+        for path, direction in COMPARED_METRICS:
+            old, new = _lookup(reference, path), _lookup(result, path)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            worse = -change * direction
+            label = f"{scenario} {'.'.join(path)}: {old} -> {new} ({change:+.1f}%)"
+            if worse > threshold and abs(new - old) > NOISE_FLOOR[path[0]]:
+                lines.append(f"REGRESSION {label}")
+            else:
+                lines.append(f"           {label}")
+    return lines
+
+
+async def _run(args, api_pid: int) -> dict:
+    api = f"http://127.0.0.1:{args.api_port}"
+    results = {}
+    limits = httpx.Limits(max_connections=args.concurrency + 5, max_keepalive_connections=args.concurrency + 5)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        print("scénario\treq\terreurs\treq/s\tp50(ms)\tp90(ms)\tp99(ms)\t1er octet p50\tRSS pic(Mo)\tsecours\tretries")
+        for scenario, requests in _parse_scenarios(args.scenarios, args.requests):
+            results[scenario] = await _run_scenario(client, api, api_pid, scenario, requests, args)
+            print(_format_row(scenario, results[scenario]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="generate,stream,hebdo=50,getall,excel=10,export=10",
+                        help="Scénarios séparés par des virgules, `nom=requêtes` pour changer le nombre de requêtes")
+    parser.add_argument("--requests", type=int, default=200, help="Requêtes mesurées par scénario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=5, help="Requêtes non mesurées avant chaque scénario")
+    parser.add_argument("--key-space", type=int, default=100000,
+                        help="Requêtes de génération distinctes (petite valeur : cache et regroupement)")
+    parser.add_argument("--seed-rows", type=int, default=5000, help="Contenus insérés avant la charge")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Part d'erreurs 5xx du serveur factice")
+    parser.add_argument("--token-interval-ms", type=float, default=5)
+    parser.add_argument("--database-url", default=None, help="Base de test (SQLite temporaire par défaut)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--api-port", type=int, default=9000)
+    parser.add_argument("--openai-port", type=int, default=9100)
+    parser.add_argument("--output", default=None, help="Fichier JSON des résultats")
+    parser.add_argument("--compare", default=None, help="Résultats de référence (JSON) à comparer")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Dégradation tolérée (%%)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    database_url = args.database_url or f"sqlite:///{workdir}/load.db"
+    migrate(database_url)
+    if args.seed_rows:
+        _seed(args, database_url)
+
+    fake = start_server("benchmarks.fake_openai:app", args.openai_port, {
+        "FAKE_OPENAI_LATENCY_MS": str(args.latency_ms),
+        "FAKE_OPENAI_LATENCY_JITTER_MS": str(args.jitter_ms),
+        "FAKE_OPENAI_ERROR_RATE": str(args.error_rate),
+        "FAKE_OPENAI_TOKEN_INTERVAL_MS": str(args.token_interval_ms),
+    })
+    api = start_server("main:app", args.api_port, {
+        "DATABASE_URL": database_url,
+        "OPENAI_API_KEY": "sk-fake",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.openai_port}/v1",
+        "OPENAI_MAX_CONCURRENCY": str(args.concurrency),
+        "DB_ECHO": "false",
+    })
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{args.openai_port}/docs"))
+        asyncio.run(wait_ready(f"http://127.0.0.1:{args.api_port}/health"))
+        scenarios = asyncio.run(_run(args, api.pid))
+    finally:
+        stop_servers(api, fake)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": database_url.split(":", 1)[0],
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("output", "compare", "database_url", "api_port", "openai_port")},
+        "scenarios": scenarios,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Résultats : {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("Attention : paramètres différents de la référence, comparaison indicative")
+        lines = compare(baseline, report, args.threshold)
+        print("\n".join(lines))
+        if any(line.startswith("REGRESSION") for line in lines):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Union
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 # Chargement des variables d'environnement
 load_dotenv()
@@ -13,14 +16,61 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 POSTGRES_HOST = os.getenv("POSTGRES_HOST", "localhost")
 POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 
-DATABASE_URL = (
+# DATABASE_URL permet de cibler une autre base (ex: SQLite pour les benchmarks)
+DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
 
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+# Configuration du pool de connexions
+DB_ECHO = _env_bool("DB_ECHO", False)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# Moteur asynchrone optionnel (asyncpg ou psycopg 3)
+DB_ASYNC_ENABLED = _env_bool("DB_ASYNC_ENABLED", False)
+DB_ASYNC_DRIVER = os.getenv("DB_ASYNC_DRIVER", "asyncpg")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL.replace(
+    "postgresql://", f"postgresql+{DB_ASYNC_DRIVER}://", 1
+)
+
+def _engine_options(url: str, async_driver: bool = False) -> dict:
+    """Options du moteur : pool, pre-ping, recycle et timeout de requête"""
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    if url.startswith("sqlite"):
+        return options
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        if async_driver and "+asyncpg" in url:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
 # Initialisation SQLAlchemy
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL, True)) if DB_ASYNC_ENABLED else None
+AsyncSessionLocal: Optional[async_sessionmaker] = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False) if async_engine is not None else None
+)
+
+# Session fournie aux repositories : synchrone ou asynchrone selon la configuration
+DBSession = Union[Session, AsyncSession]
+
 # Base des modèles SQLAlchemy
 Base = declarative_base()
 
@@ -31,3 +81,27 @@ def get_db():
         yield db
     finally:
         db.close()
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[DBSession]:
+    """Session asynchrone si DB_ASYNC_ENABLED, sinon session synchrone"""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+# Dépendance pour FastAPI (remplace get_db pour les repositories)
+async def get_session() -> AsyncIterator[DBSession]:
+    async with session_scope() as session:
+        yield session
+
+async def dispose_engines() -> None:
+    """Ferme les pools de connexions (arrêt de l'application)"""
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
@@ -1,17 +1,144 @@
 from database.connexion import Base
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, Boolean, ForeignKey, Index, text
+from sqlalchemy import BigInteger, LargeBinary, SmallInteger, literal_column
 from sqlalchemy.sql import func
 
+# Configuration de recherche plein texte PostgreSQL
+SEARCH_CONFIG = "french"
+# Origine des contenus pré-générés par le stock (services.content_pool)
+POOL_SOURCE = "pool"
+
 class GeneratedContent(Base):
     __tablename__ = "generated_contents"
 
-    id = Column(Integer, primary_key=True, index=True)
-    cible = Column(String(50), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    cible = Column(String(50), nullable=False)
     prospect_type = Column(String(50), nullable=False, index=True)
     generation_date = Column(DateTime, nullable=False, index=True)
     theme_general = Column(Text, nullable=False)
     theme_hebdo = Column(Text, nullable=False)
     texte = Column(Text, nullable=False)
     used = Column(Integer, default=0)
+    model = Column(String(100), nullable=True)
+    prompt_version = Column(String(64), nullable=True)
+    # POOL_SOURCE pour le stock pré-généré, NULL pour les générations à la demande
+    source = Column(String(20), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    # Schéma versionné par Alembic (migrations/) : tout changement d'index ou de
+    # colonne ici s'accompagne d'une révision (alembic revision --autogenerate)
+    __table_args__ = (
+        # Filtres de get_all_content / export / pagination : égalités puis plage de dates
+        Index("ix_generated_contents_filters", "cible", "prospect_type", "generation_date"),
+        # Listes sans filtre triées par (created_at, id) décroissants (pagination par clé)
+        Index("ix_generated_contents_recent", "created_at", "id"),
+        # Index partiel des contenus disponibles : sert la réservation concurrente (claim)
+        # d'une semaine donnée, puis l'ordre d'ancienneté
+        Index(
+            "ix_generated_contents_unused",
+            "cible", "prospect_type", "generation_date", "created_at",
+            postgresql_where=text("used = 0"),
+            sqlite_where=text("used = 0")
+        ),
+        # Contenus disponibles du stock pré-généré : réservation par /generate-content
+        Index(
+            "ix_generated_contents_pool",
+            "cible", "prospect_type", "generation_date", "created_at",
+            postgresql_where=text(f"used = 0 AND source = '{POOL_SOURCE}'"),
+            sqlite_where=text(f"used = 0 AND source = '{POOL_SOURCE}'")
+        ),
+        # Recherche plein texte : même expression que SEARCH_DOCUMENT (PostgreSQL uniquement)
+        Index(
+            "ix_generated_contents_search",
+            text(f"to_tsvector('{SEARCH_CONFIG}'::regconfig, theme_general || ' ' || theme_hebdo || ' ' || texte)"),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
+
+def _search_text(columns=GeneratedContent.__table__.c):
+    space = literal_column("' '")
+    return columns.theme_general.op("||")(space).op("||")(columns.theme_hebdo).op("||")(space).op("||")(columns.texte)
+
+# Document plein texte : les requêtes de recherche reprennent exactement
+# l'expression de l'index GIN pour que PostgreSQL l'utilise
+SEARCH_DOCUMENT = func.to_tsvector(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), _search_text())
+
+class ContentSignature(Base):
+    """Signature MinHash du texte d'un contenu (quasi-doublons)"""
+    __tablename__ = "content_signatures"
+
+    content_id = Column(Integer, ForeignKey("generated_contents.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+
+class ContentSignatureBand(Base):
+    """Bandes LSH des signatures : la clé primaire (band, band_hash, content_id) sert la recherche de candidats"""
+    __tablename__ = "content_signature_bands"
+
+    band = Column(SmallInteger, primary_key=True)
+    band_hash = Column(BigInteger, primary_key=True)
+    content_id = Column(Integer, ForeignKey("generated_contents.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+class ContentStat(Base):
+    """Nombre de contenus par (cible, prospect_type, semaine, used), tenu à jour à chaque écriture"""
+    __tablename__ = "content_stats"
+
+    cible = Column(String(50), primary_key=True)
+    prospect_type = Column(String(50), primary_key=True)
+    # Lundi de la semaine ISO de generation_date
+    week_start = Column(Date, primary_key=True)
+    used = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class IdempotencyKey(Base):
+    """Réponse enregistrée d'une requête portant un en-tête Idempotency-Key"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    # Empreinte du corps et des paramètres : une même clé ne sert qu'à une seule requête
+    request_hash = Column(String(64), nullable=False)
+    # pending : génération en cours ; completed : `response` contient la réponse à rejouer
+    status = Column(String(20), nullable=False, default="pending")
+    response = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    total_items = Column(Integer, nullable=False, default=0)
+    completed_items = Column(Integer, nullable=False, default=0)
+    failed_items = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class GenerationJobItem(Base):
+    __tablename__ = "generation_job_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("generation_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    cible = Column(String(50), nullable=False)
+    prospect_type = Column(String(50), nullable=False)
+    generation_date = Column(Date, nullable=False)
+    status = Column(String(20), nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    content_id = Column(Integer, ForeignKey("generated_contents.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class OpenAIBatchIngestion(Base):
+    """Progression de l'ingestion d'un batch OpenAI : une nouvelle ingestion reprend sans doublons"""
+    __tablename__ = "openai_batch_ingestions"
+
+    batch_id = Column(String(100), primary_key=True)
+    # Lignes du fichier de sortie traitées, validées dans la transaction de leurs contenus
+    lines = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    completed_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,124 @@
+"""
+Partitionnement mensuel de generated_contents par generation_date (PostgreSQL).
+
+Optionnel : la table n'est partitionnée que par la migration 0004 lancée avec
+`alembic -x partition_contents=true upgrade head`. Les partitions des mois à
+venir sont ensuite créées à l'avance (cron quotidien ou déploiement) :
+    python -m database.partitions --ahead 3
+
+Une partition DEFAULT reçoit les dates hors des partitions existantes (jobs ou
+stock générés plusieurs semaines à l'avance, par exemple). PostgreSQL refuse de
+créer une partition dont la plage contient des lignes de DEFAULT : la partition
+DEFAULT est alors détachée le temps de créer le mois, puis ses lignes de ce mois
+sont déplacées dans la nouvelle partition avant de la rattacher.
+"""
+import argparse
+import json
+import os
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+PARTITIONED_TABLE = "generated_contents"
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+# Mois créés à l'avance après le mois courant
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Nom de la partition d'un mois : generated_contents_y2025m03"""
+    return f"{PARTITIONED_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(connection: Connection) -> bool:
+    """True si generated_contents est une table partitionnée (toujours False hors PostgreSQL)"""
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"
+    ), {"table": PARTITIONED_TABLE}).scalar())
+
+
+def _exists(connection: Connection, name: str) -> bool:
+    return connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def _default_has_rows(connection: Connection, start: date, end: date) -> bool:
+    return connection.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+        "WHERE generation_date >= :start AND generation_date < :end)"
+    ), {"start": start, "end": end}).scalar()
+
+
+def create_month_partitions(connection: Connection, first_month: date, last_month: date) -> List[str]:
+    """
+    Crée les partitions manquantes de first_month à last_month inclus et la partition DEFAULT.
+
+    Les lignes d'un mois déjà écrites dans DEFAULT sont déplacées dans la
+    partition du mois. Le détachement verrouille la table parente jusqu'à la
+    fin de la transaction de l'appelant.
+    """
+    created = []
+    has_default = _exists(connection, DEFAULT_PARTITION)
+    month = month_start(first_month)
+    while month <= last_month:
+        name = partition_name(month)
+        end = add_months(month, 1)
+        if not _exists(connection, name):
+            move = has_default and _default_has_rows(connection, month, end)
+            if move:
+                connection.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+            connection.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {PARTITIONED_TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            if move:
+                bounds = {"start": month, "end": end}
+                range_filter = "WHERE generation_date >= :start AND generation_date < :end"
+                # Même ordre de colonnes : DEFAULT a été créée comme partition de la table parente
+                connection.execute(text(
+                    f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} {range_filter}"
+                ), bounds)
+                connection.execute(text(f"DELETE FROM {DEFAULT_PARTITION} {range_filter}"), bounds)
+                connection.execute(text(
+                    f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"
+                ))
+                print(f"Lignes de {month.isoformat()} déplacées de {DEFAULT_PARTITION} vers {name}")
+            created.append(name)
+        month = end
+
+    if not _exists(connection, DEFAULT_PARTITION):
+        connection.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARTITIONED_TABLE} DEFAULT"))
+        created.append(DEFAULT_PARTITION)
+    return created
+
+
+def ensure_partitions(engine: Optional[Engine] = None,
+                      months_ahead: int = PARTITION_MONTHS_AHEAD,
+                      today: Optional[date] = None) -> List[str]:
+    """Partitions du mois courant et des `months_ahead` suivants ; [] si la table n'est pas partitionnée"""
+    if engine is None:
+        from database.connexion import engine
+    current = month_start(today or date.today())
+    with engine.begin() as connection:
+        if not is_partitioned(connection):
+            return []
+        return create_month_partitions(connection, current, add_months(current, months_ahead))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partitions mensuelles de generated_contents")
+    parser.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD, help="Mois créés à l'avance")
+    args = parser.parse_args()
+    print(json.dumps({"created": ensure_partitions(months_ahead=args.ahead)}))
@@ -1,19 +1,46 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from routes.content import router as content_router
+from routes.jobs import router as jobs_router
 import os
 from dotenv import load_dotenv
 import uvicorn
-from database.connexion import Base, engine
+from database.connexion import dispose_engines
+from services.openai_client import close_async_openai_client
+from services.content_pool import CONTENT_POOL_ENABLED, get_pool_scheduler
+from services.generation_jobs import get_job_runner
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from services.prompt_templates import get_prompt_registry
 
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Compiler les templates de prompt une fois (erreur de template visible au démarrage)
+    get_prompt_registry()
+    # Reprendre les jobs de génération interrompus, puis les rechercher périodiquement
+    await get_job_runner().resume_pending_jobs()
+    get_job_runner().start()
+    # Pré-génération du stock de contenus (active seulement sur le réplica leader)
+    if CONTENT_POOL_ENABLED:
+        get_pool_scheduler().start()
+    yield
+    if CONTENT_POOL_ENABLED:
+        await get_pool_scheduler().shutdown()
+    await get_job_runner().shutdown()
+    # Libérer le pool de connexions HTTP partagé vers OpenAI
+    await close_async_openai_client()
+    await dispose_engines()
+
 app = FastAPI(
     title="Content Generator API",
     description="API REST pour générer du contenu éditorial personnalisé via IA",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configuration CORS
@@ -24,11 +51,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-# Créer les tables
-Base.metadata.create_all(bind=engine)
-
 # Inclusion des routes
 app.include_router(content_router)
+app.include_router(jobs_router)
 
 @app.get("/")
 async def root():
@@ -42,6 +67,11 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métriques au format Prometheus (latences par étape, tokens, fallbacks, cache, pool)"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/debug/openai")
 async def debug_openai():
     """Route de diagnostic pour vérifier la configuration OpenAI"""
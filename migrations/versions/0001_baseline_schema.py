@@ -0,0 +1,45 @@
+"""Schéma de base : generated_contents telle que créée par Base.metadata.create_all
+
+Une base créée avant l'introduction d'Alembic a au moins ce schéma :
+    alembic stamp 0001
+    alembic upgrade head
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 21:04:52.862625
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "generated_contents",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("cible", sa.String(length=50), nullable=False),
+        sa.Column("prospect_type", sa.String(length=50), nullable=False),
+        sa.Column("generation_date", sa.DateTime(), nullable=False),
+        sa.Column("theme_general", sa.Text(), nullable=False),
+        sa.Column("theme_hebdo", sa.Text(), nullable=False),
+        sa.Column("texte", sa.Text(), nullable=False),
+        sa.Column("used", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_generated_contents_id", "generated_contents", ["id"])
+    op.create_index("ix_generated_contents_cible", "generated_contents", ["cible"])
+    op.create_index("ix_generated_contents_prospect_type", "generated_contents", ["prospect_type"])
+    op.create_index("ix_generated_contents_generation_date", "generated_contents", ["generation_date"])
+
+
+def downgrade() -> None:
+    op.drop_table("generated_contents")
@@ -0,0 +1,199 @@
+"""Colonnes et tables ajoutées avant Alembic (cache, jobs, stats, doublons, idempotence)
+
+- generated_contents : colonnes model et prompt_version, index partiel des
+  contenus non utilisés et index plein texte GIN (PostgreSQL) ;
+- tables content_signatures, content_signature_bands, content_stats,
+  idempotency_keys, generation_jobs et generation_job_items.
+
+Create_all créait les tables manquantes sans jamais modifier une table
+existante : selon la version qui l'a créée, une base non versionnée a une
+partie de ces objets. Seuls les objets absents sont créés, si bien que
+`alembic stamp 0001` suivi de `alembic upgrade head` convient à toute base
+créée avant Alembic. content_stats est calculée depuis les contenus existants
+lorsqu'elle est créée ici.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:12:37.540219
+"""
+from collections import Counter
+from datetime import timedelta
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNUSED = sa.text("used = 0")
+
+
+def _index_exists(bind, name: str) -> bool:
+    if context.is_offline_mode():
+        return False
+    if bind.dialect.name == "postgresql":
+        return bind.execute(sa.text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+    return name in {index["name"] for index in sa.inspect(bind).get_indexes("generated_contents")}
+
+
+def _upgrade_generated_contents(bind) -> None:
+    columns = set() if context.is_offline_mode() else {
+        column["name"] for column in sa.inspect(bind).get_columns("generated_contents")
+    }
+    if "model" not in columns:
+        op.add_column("generated_contents", sa.Column("model", sa.String(length=100), nullable=True))
+    if "prompt_version" not in columns:
+        op.add_column("generated_contents", sa.Column("prompt_version", sa.String(length=64), nullable=True))
+
+    if not _index_exists(bind, "ix_generated_contents_unused"):
+        op.create_index(
+            "ix_generated_contents_unused", "generated_contents", ["cible", "prospect_type", "created_at"],
+            postgresql_where=UNUSED, sqlite_where=UNUSED
+        )
+    if bind.dialect.name == "postgresql" and not _index_exists(bind, "ix_generated_contents_search"):
+        op.create_index(
+            "ix_generated_contents_search", "generated_contents",
+            [sa.text("to_tsvector('french'::regconfig, theme_general || ' ' || theme_hebdo || ' ' || texte)")],
+            postgresql_using="gin"
+        )
+
+
+def _backfill_content_stats(bind) -> None:
+    """Compteurs par (cible, prospect_type, semaine ISO, used) des contenus existants"""
+    contents = sa.table(
+        "generated_contents",
+        sa.column("cible", sa.String), sa.column("prospect_type", sa.String),
+        sa.column("generation_date", sa.DateTime), sa.column("used", sa.Integer),
+    )
+    grouped = bind.execute(
+        sa.select(contents.c.cible, contents.c.prospect_type, contents.c.generation_date, contents.c.used,
+                  sa.func.count())
+        .group_by(contents.c.cible, contents.c.prospect_type, contents.c.generation_date, contents.c.used)
+    ).all()
+
+    counts: Counter = Counter()
+    for cible, prospect_type, generation_date, used, count in grouped:
+        day = generation_date.date()
+        counts[(cible, prospect_type, day - timedelta(days=day.weekday()), used or 0)] += count
+    if counts:
+        op.bulk_insert(sa.table(
+            "content_stats",
+            sa.column("cible", sa.String), sa.column("prospect_type", sa.String),
+            sa.column("week_start", sa.Date), sa.column("used", sa.Integer), sa.column("count", sa.Integer),
+        ), [
+            {"cible": key[0], "prospect_type": key[1], "week_start": key[2], "used": key[3], "count": count}
+            for key, count in sorted(counts.items())
+        ])
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # Mode --sql : aucune base à inspecter, tous les objets sont émis
+    existing = set() if context.is_offline_mode() else set(sa.inspect(bind).get_table_names())
+
+    _upgrade_generated_contents(bind)
+
+    if "content_signatures" not in existing:
+        op.create_table(
+            "content_signatures",
+            sa.Column("content_id", sa.Integer(), nullable=False),
+            sa.Column("signature", sa.LargeBinary(), nullable=False),
+            sa.ForeignKeyConstraint(["content_id"], ["generated_contents.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("content_id"),
+        )
+    if "content_signature_bands" not in existing:
+        op.create_table(
+            "content_signature_bands",
+            sa.Column("band", sa.SmallInteger(), nullable=False),
+            sa.Column("band_hash", sa.BigInteger(), nullable=False),
+            sa.Column("content_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["content_id"], ["generated_contents.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("band", "band_hash", "content_id"),
+        )
+        op.create_index("ix_content_signature_bands_content_id", "content_signature_bands", ["content_id"])
+
+    if "content_stats" not in existing:
+        op.create_table(
+            "content_stats",
+            sa.Column("cible", sa.String(length=50), nullable=False),
+            sa.Column("prospect_type", sa.String(length=50), nullable=False),
+            sa.Column("week_start", sa.Date(), nullable=False),
+            sa.Column("used", sa.Integer(), nullable=False),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("cible", "prospect_type", "week_start", "used"),
+        )
+        if not context.is_offline_mode():
+            _backfill_content_stats(bind)
+
+    if "idempotency_keys" not in existing:
+        op.create_table(
+            "idempotency_keys",
+            sa.Column("key", sa.String(length=255), nullable=False),
+            sa.Column("request_hash", sa.String(length=64), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False),
+            sa.Column("response", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("key"),
+        )
+        op.create_index("ix_idempotency_keys_expires_at", "idempotency_keys", ["expires_at"])
+
+    if "generation_jobs" not in existing:
+        op.create_table(
+            "generation_jobs",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False),
+            sa.Column("start_date", sa.Date(), nullable=False),
+            sa.Column("end_date", sa.Date(), nullable=False),
+            sa.Column("total_items", sa.Integer(), nullable=False),
+            sa.Column("completed_items", sa.Integer(), nullable=False),
+            sa.Column("failed_items", sa.Integer(), nullable=False),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_generation_jobs_id", "generation_jobs", ["id"])
+        op.create_index("ix_generation_jobs_status", "generation_jobs", ["status"])
+
+    if "generation_job_items" not in existing:
+        op.create_table(
+            "generation_job_items",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("job_id", sa.Integer(), nullable=False),
+            sa.Column("cible", sa.String(length=50), nullable=False),
+            sa.Column("prospect_type", sa.String(length=50), nullable=False),
+            sa.Column("generation_date", sa.Date(), nullable=False),
+            sa.Column("status", sa.String(length=20), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("content_id", sa.Integer(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(["content_id"], ["generated_contents.id"], ondelete="SET NULL"),
+            sa.ForeignKeyConstraint(["job_id"], ["generation_jobs.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_generation_job_items_id", "generation_job_items", ["id"])
+        op.create_index("ix_generation_job_items_job_id", "generation_job_items", ["job_id"])
+        op.create_index("ix_generation_job_items_status", "generation_job_items", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_table("generation_job_items")
+    op.drop_table("generation_jobs")
+    op.drop_table("idempotency_keys")
+    op.drop_table("content_stats")
+    op.drop_table("content_signature_bands")
+    op.drop_table("content_signatures")
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_generated_contents_search", table_name="generated_contents")
+    op.drop_index("ix_generated_contents_unused", table_name="generated_contents")
+    # SQLite : suppression de colonne par recopie de la table
+    with op.batch_alter_table("generated_contents") as batch:
+        batch.drop_column("prompt_version")
+        batch.drop_column("model")
@@ -0,0 +1,69 @@
+"""Index composites de generated_contents selon les accès réels
+
+- ix_generated_contents_filters (cible, prospect_type, generation_date) :
+  get_all_content, export et pagination filtrés ;
+- ix_generated_contents_recent (created_at, id) : listes sans filtre triées
+  par (created_at, id) ;
+- ix_generated_contents_unused (partiel, used = 0) : ajoute generation_date
+  pour la réservation d'un contenu du stock d'une semaine donnée ;
+- suppression de ix_generated_contents_id (doublon de la clé primaire) et de
+  ix_generated_contents_cible (préfixe de ix_generated_contents_filters).
+
+Sous PostgreSQL, les index sont créés et supprimés CONCURRENTLY : pas de
+verrou bloquant les écritures pendant la migration d'une table volumineuse.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 21:30:11.402817
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNUSED = sa.text("used = 0")
+
+
+def _create_index(name, columns, **kw) -> None:
+    op.create_index(name, "generated_contents", columns, postgresql_concurrently=True, **kw)
+
+
+def _drop_index(name) -> None:
+    op.drop_index(name, table_name="generated_contents", postgresql_concurrently=True)
+
+
+def _replace_unused_index(columns) -> None:
+    """Remplace l'index partiel des contenus disponibles (PostgreSQL : le nouveau existe avant la suppression de l'ancien)"""
+    if op.get_bind().dialect.name != "postgresql":
+        # SQLite (développement) : ni CONCURRENTLY ni ALTER INDEX ... RENAME
+        _drop_index("ix_generated_contents_unused")
+        _create_index("ix_generated_contents_unused", columns, sqlite_where=UNUSED)
+        return
+    _create_index("ix_generated_contents_unused_new", columns, postgresql_where=UNUSED)
+    _drop_index("ix_generated_contents_unused")
+    op.execute("ALTER INDEX ix_generated_contents_unused_new RENAME TO ix_generated_contents_unused")
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY est interdit dans une transaction
+    with op.get_context().autocommit_block():
+        _create_index("ix_generated_contents_filters", ["cible", "prospect_type", "generation_date"])
+        _create_index("ix_generated_contents_recent", ["created_at", "id"])
+        _replace_unused_index(["cible", "prospect_type", "generation_date", "created_at"])
+        _drop_index("ix_generated_contents_cible")
+        _drop_index("ix_generated_contents_id")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        _create_index("ix_generated_contents_id", ["id"])
+        _create_index("ix_generated_contents_cible", ["cible"])
+        _replace_unused_index(["cible", "prospect_type", "created_at"])
+        _drop_index("ix_generated_contents_recent")
+        _drop_index("ix_generated_contents_filters")
@@ -0,0 +1,128 @@
+"""Partitionnement mensuel optionnel de generated_contents (PostgreSQL)
+
+Sans effet par défaut et hors PostgreSQL. Activation explicite, pendant une
+fenêtre de maintenance (la table est recopiée sous verrou exclusif) :
+    alembic -x partition_contents=true upgrade head
+
+- clé primaire (id, generation_date) : PostgreSQL impose la clé de partition
+  dans toute contrainte d'unicité ; la séquence de id est conservée ;
+- les clés étrangères vers generated_contents.id (signatures, items de job)
+  sont supprimées : une clé étrangère doit référencer une contrainte unique.
+  L'API ne supprime jamais de contenu ; une suppression manuelle doit
+  nettoyer elle-même ces tables ;
+- une partition par mois, du mois le plus ancien des données existantes
+  jusqu'au plus lointain entre PARTITION_MONTHS_AHEAD mois à venir et le mois
+  le plus récent des données (contenus générés à l'avance), plus une
+  partition DEFAULT ; la suite est créée par `python -m database.partitions`,
+  qui déplace hors de DEFAULT les lignes des mois qu'il crée.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 22:02:45.118305
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from database.partitions import (
+    PARTITION_MONTHS_AHEAD, add_months, create_month_partitions, is_partitioned, month_start
+)
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, colonne, ondelete) des clés étrangères vers generated_contents.id
+REFERENCING_KEYS = (
+    ("content_signatures", "content_id", "CASCADE"),
+    ("content_signature_bands", "content_id", "CASCADE"),
+    ("generation_job_items", "content_id", "SET NULL"),
+)
+
+
+def _enabled() -> bool:
+    option = context.get_x_argument(as_dictionary=True).get("partition_contents", "false")
+    return option.lower() in ("1", "true", "yes")
+
+
+def _create_indexes() -> None:
+    """Index de 0001 à 0003, créés sur la table parente et propagés aux partitions"""
+    unused = sa.text("used = 0")
+    op.create_index("ix_generated_contents_prospect_type", "generated_contents", ["prospect_type"])
+    op.create_index("ix_generated_contents_generation_date", "generated_contents", ["generation_date"])
+    op.create_index("ix_generated_contents_filters", "generated_contents",
+                    ["cible", "prospect_type", "generation_date"])
+    op.create_index("ix_generated_contents_recent", "generated_contents", ["created_at", "id"])
+    op.create_index("ix_generated_contents_unused", "generated_contents",
+                    ["cible", "prospect_type", "generation_date", "created_at"], postgresql_where=unused)
+    op.create_index(
+        "ix_generated_contents_search", "generated_contents",
+        [sa.text("to_tsvector('french'::regconfig, theme_general || ' ' || theme_hebdo || ' ' || texte)")],
+        postgresql_using="gin"
+    )
+
+
+def _replace_table(primary_key: str, partition_by: str = "") -> None:
+    """Recopie generated_contents dans une nouvelle table de même définition"""
+    op.execute("ALTER TABLE generated_contents RENAME TO generated_contents_old")
+    op.execute("ALTER INDEX generated_contents_pkey RENAME TO generated_contents_old_pkey")
+    op.execute(
+        "CREATE TABLE generated_contents (LIKE generated_contents_old INCLUDING DEFAULTS, "
+        f"PRIMARY KEY ({primary_key})) {partition_by}"
+    )
+
+
+def _copy_and_drop_old() -> None:
+    op.execute("INSERT INTO generated_contents SELECT * FROM generated_contents_old")
+    # La séquence appartient à l'ancienne colonne : elle serait supprimée avec elle
+    op.execute("ALTER SEQUENCE generated_contents_id_seq OWNED BY generated_contents.id")
+    op.execute("DROP TABLE generated_contents_old CASCADE")
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not _enabled() or is_partitioned(bind):
+        return
+
+    inspector = sa.inspect(bind)
+    for table, _, _ in REFERENCING_KEYS:
+        for foreign_key in inspector.get_foreign_keys(table):
+            if foreign_key["referred_table"] == "generated_contents":
+                op.drop_constraint(foreign_key["name"], table, type_="foreignkey")
+
+    oldest, newest = bind.execute(
+        sa.text("SELECT min(generation_date), max(generation_date) FROM generated_contents")
+    ).one()
+    current = month_start(date.today())
+    last = add_months(current, PARTITION_MONTHS_AHEAD)
+    if newest is not None:
+        last = max(last, month_start(newest.date()))
+
+    _replace_table("id, generation_date", "PARTITION BY RANGE (generation_date)")
+    create_month_partitions(bind, month_start(oldest.date()) if oldest else current, last)
+    _copy_and_drop_old()
+    _create_indexes()
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not is_partitioned(bind):
+        return
+
+    _replace_table("id")
+    _copy_and_drop_old()
+    _create_indexes()
+    for table, column, ondelete in REFERENCING_KEYS:
+        # Références orphelines accumulées sans clé étrangère : même effet que ondelete
+        orphan = f"{column} NOT IN (SELECT id FROM generated_contents)"
+        if ondelete == "CASCADE":
+            op.execute(f"DELETE FROM {table} WHERE {orphan}")
+        else:
+            op.execute(f"UPDATE {table} SET {column} = NULL WHERE {orphan}")
+        op.create_foreign_key(
+            f"{table}_{column}_fkey", table, "generated_contents", [column], ["id"], ondelete=ondelete
+        )
@@ -0,0 +1,33 @@
+"""Progression des ingestions de batchs OpenAI (openai_batch_ingestions)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 10:41:08.226794
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "openai_batch_ingestions",
+        sa.Column("batch_id", sa.String(length=100), nullable=False),
+        sa.Column("lines", sa.Integer(), nullable=False),
+        sa.Column("inserted", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("batch_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("openai_batch_ingestions")
@@ -0,0 +1,59 @@
+"""Origine des contenus (source) et index partiel du stock pré-généré
+
+- generated_contents.source : POOL_SOURCE pour les contenus générés par le
+  stock (services.content_pool), NULL sinon. Les lignes existantes restent à
+  NULL : le stock ne réserve plus que ses propres contenus et se remplit de
+  nouveau au premier passage du planificateur ;
+- ix_generated_contents_pool (partiel, used = 0 AND source = 'pool') :
+  réservation et niveaux du stock.
+
+Sous PostgreSQL, l'index est créé CONCURRENTLY, sauf sur une table
+partitionnée (0004) où CONCURRENTLY n'est pas disponible.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 09:47:52.631904
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from database.partitions import is_partitioned
+
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Valeur de database.models.POOL_SOURCE au moment de cette révision
+POOL = sa.text("used = 0 AND source = 'pool'")
+
+
+def _concurrently() -> bool:
+    bind = op.get_bind()
+    return bind.dialect.name == "postgresql" and (context.is_offline_mode() or not is_partitioned(bind))
+
+
+def upgrade() -> None:
+    op.add_column("generated_contents", sa.Column("source", sa.String(length=20), nullable=True))
+
+    concurrently = _concurrently()
+    # CREATE INDEX CONCURRENTLY est interdit dans une transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_generated_contents_pool", "generated_contents",
+            ["cible", "prospect_type", "generation_date", "created_at"],
+            postgresql_where=POOL, sqlite_where=POOL, postgresql_concurrently=concurrently
+        )
+
+
+def downgrade() -> None:
+    concurrently = _concurrently()
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_generated_contents_pool", table_name="generated_contents",
+                      postgresql_concurrently=concurrently)
+    # SQLite : suppression de colonne par recopie de la table
+    with op.batch_alter_table("generated_contents") as batch:
+        batch.drop_column("source")
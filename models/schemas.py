@@ -1,7 +1,7 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from datetime import date
 from enum import Enum
-from typing import Literal, Union
+from typing import List, Literal, Optional, Union
 from datetime import datetime
 from datetime import datetime, date as dt_date
 
@@ -46,6 +46,14 @@ class ContentRequest(BaseModel):
                 raise ValueError("La date doit être au format YYYY-MM-DD (ex: 2025-07-15)")
             return value
         raise ValueError("Date invalide : doit être une chaîne YYYY-MM-DD ou un objet date.")
+class GeneratedContentFields(BaseModel):
+    """Champs produits par le modèle (schéma des sorties structurées OpenAI)"""
+    model_config = ConfigDict(json_schema_extra={"additionalProperties": False})
+
+    theme_general: str = Field(..., description="Ligne éditoriale principale adaptée au canal")
+    theme_hebdo: str = Field(..., description="Focus éditorial spécifique à la semaine")
+    texte: str = Field(..., description="Contenu à publier")
+
 class ContentResponse(BaseModel):
     theme_general: str = Field(..., description="Ligne éditoriale principale")
     theme_hebdo: str = Field(..., description="Focus éditorial de la semaine")
@@ -54,3 +62,55 @@ class ContentResponse(BaseModel):
     prospect_type: ProspectTypeEnum = Field(..., description="Niveau de maturité du prospect")
     generation_date: dt_date = Field(..., description="Date de génération du contenu")
     used: int = Field(default=0, description="Indicateur d'utilisation")
+    # Métadonnées de génération (non exposées dans les réponses de l'API)
+    model: Optional[str] = Field(default=None, exclude=True)
+    prompt_version: Optional[str] = Field(default=None, exclude=True)
+    fallback: bool = Field(default=False, exclude=True)
+
+class CountModeEnum(str, Enum):
+    EXACT = "exact"
+    CACHED = "cached"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+class ExportFormatEnum(str, Enum):
+    XLSX = "xlsx"
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
+
+class CacheControlEnum(str, Enum):
+    DEFAULT = "default"
+    REFRESH = "refresh"
+
+class GenerationJobRequest(BaseModel):
+    start_date: dt_date = Field(..., description="Première semaine à générer")
+    end_date: dt_date = Field(..., description="Dernière semaine à générer")
+    cibles: List[CibleEnum] = Field(default_factory=lambda: list(CibleEnum), description="Canaux à couvrir")
+    prospect_types: List[ProspectTypeEnum] = Field(default_factory=lambda: list(ProspectTypeEnum), description="Types de prospects à couvrir")
+
+    @field_validator("end_date")
+    @classmethod
+    def validate_date_range(cls, value: dt_date, info) -> dt_date:
+        start_date = info.data.get("start_date")
+        if start_date and value < start_date:
+            raise ValueError("end_date doit être postérieure ou égale à start_date")
+        return value
+
+class GenerationJobStatus(BaseModel):
+    job_id: int
+    status: str
+    start_date: dt_date
+    end_date: dt_date
+    total_items: int
+    completed_items: int
+    failed_items: int
+    pending_items: int
+    error: Optional[str] = None
+
+class ContentClaimRequest(BaseModel):
+    cible: Optional[CibleEnum] = Field(None, description="Canal marketing cible")
+    prospect_type: Optional[ProspectTypeEnum] = Field(None, description="Niveau de maturité du prospect")
+    start_date: Optional[dt_date] = Field(None, description="Date de génération minimale")
+    end_date: Optional[dt_date] = Field(None, description="Date de génération maximale")
+    limit: int = Field(1, ge=1, le=100, description="Nombre de contenus à réserver")
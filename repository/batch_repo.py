@@ -0,0 +1,48 @@
+from datetime import datetime
+from typing import Optional, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.models import OpenAIBatchIngestion
+from repository.session_runner import SessionBoundRepository
+from services.metrics import timed
+
+
+def record_ingestion(db: Session, batch_id: str, lines: int, inserted: int, failed: int,
+                     completed: bool = False) -> None:
+    """Enregistre la progression d'une ingestion, dans la transaction en cours"""
+    db.merge(OpenAIBatchIngestion(
+        batch_id=batch_id,
+        lines=lines,
+        inserted=inserted,
+        failed=failed,
+        completed_at=datetime.utcnow() if completed else None
+    ))
+
+
+class DBBatchIngestionRepository(SessionBoundRepository):
+    """Progression des ingestions de batchs OpenAI (Single Responsibility)"""
+
+    def __init__(self, db: Union[Session, AsyncSession]):
+        super().__init__(db)
+
+    @timed("db.get_batch_ingestion")
+    async def get_progress(self, batch_id: str) -> Optional[OpenAIBatchIngestion]:
+        def _get(db: Session) -> Optional[OpenAIBatchIngestion]:
+            return db.get(OpenAIBatchIngestion, batch_id, populate_existing=True)
+
+        return await self._run(_get)
+
+    @timed("db.save_batch_ingestion")
+    async def save_progress(self, batch_id: str, lines: int, inserted: int, failed: int,
+                            completed: bool = False) -> None:
+        def _save(db: Session) -> None:
+            try:
+                record_ingestion(db, batch_id, lines, inserted, failed, completed)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+        await self._run(_save)
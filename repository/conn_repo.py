@@ -1,111 +1,648 @@
+import base64
+import csv
+import io
+import json
+import os
+import time
+from collections import OrderedDict
+from sqlalchemy import and_, bindparam, func, insert, literal_column, or_, select, text, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database.models import GeneratedContent
+from database.models import SEARCH_CONFIG, SEARCH_DOCUMENT, ContentSignature, ContentSignatureBand, GeneratedContent
 from repository.content_repo import ContentRepositoryInterface
+from repository.session_runner import SessionBoundRepository
+from repository.stats_repo import record_inserted, record_marked_used
+from services.metrics import timed
+from services.minhash import (
+    NEAR_DUPLICATE_MIN_SIMILARITY,
+    minhash_signature,
+    signature_bands,
+    signature_from_bytes,
+    signature_to_bytes,
+    similarity,
+)
 from models.schemas import ContentResponse, ContentRequest
-from typing import List, Optional
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, Union
 from datetime import datetime, date
 
-class DBContentRepository(ContentRepositoryInterface):
+# Colonnes exposées par la pagination (projection optionnelle)
+CONTENT_FIELDS = (
+    "id", "cible", "prospect_type", "generation_date", "theme_general",
+    "theme_hebdo", "texte", "used", "created_at"
+)
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "30"))
+# Combinaisons de filtres gardées au plus (LRU) : les filtres viennent de la query string
+COUNT_CACHE_MAX_SIZE = int(os.getenv("COUNT_CACHE_MAX_SIZE", "1024"))
+# Au-delà de ce nombre de lignes, save_many passe par COPY (PostgreSQL + psycopg2)
+BULK_COPY_THRESHOLD = int(os.getenv("BULK_COPY_THRESHOLD", "5000"))
+COPY_COLUMNS = (
+    "id", "cible", "prospect_type", "generation_date", "theme_general",
+    "theme_hebdo", "texte", "used", "model", "prompt_version", "source"
+)
+# Candidats LSH examinés au plus par recherche de quasi-doublons
+NEAR_DUPLICATE_MAX_CANDIDATES = int(os.getenv("NEAR_DUPLICATE_MAX_CANDIDATES", "200"))
+_count_cache: "OrderedDict[tuple, Tuple[float, int]]" = OrderedDict()
+
+def _cached_count(key: tuple) -> Optional[int]:
+    entry = _count_cache.get(key)
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    _count_cache.move_to_end(key)
+    return entry[1]
+
+def _store_count(key: tuple, total: int) -> None:
+    """Ajoute un total en cache : purge des entrées expirées puis éviction LRU"""
+    now = time.monotonic()
+    for expired in [k for k, (expires_at, _) in _count_cache.items() if expires_at <= now]:
+        del _count_cache[expired]
+    _count_cache[key] = (now + COUNT_CACHE_TTL, total)
+    _count_cache.move_to_end(key)
+    while len(_count_cache) > COUNT_CACHE_MAX_SIZE:
+        _count_cache.popitem(last=False)
+
+def _to_date(value) -> date:
+    """Convertit la date de la requête (str ISO ou date) en objet date"""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+def _to_datetime(value) -> datetime:
+    """Borne de filtre sur generation_date (DateTime) : minuit pour une date ou une chaîne ISO sans heure"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value
+    return datetime(value.year, value.month, value.day)
+
+def encode_cursor(created_at: datetime, content_id: int) -> str:
+    """Curseur opaque (created_at, id) pour la pagination par clé"""
+    raw = json.dumps([created_at.isoformat(), content_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, content_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(content_id)
+    except Exception:
+        raise ValueError("Curseur de pagination invalide")
+
+def _content_row(content: ContentResponse, request: ContentRequest, source: Optional[str] = None) -> dict:
+    return {
+        "cible": request.cible.value,
+        "prospect_type": request.prospect_type.value,
+        "generation_date": _to_date(request.date),
+        "theme_general": content.theme_general,
+        "theme_hebdo": content.theme_hebdo,
+        "texte": content.texte,
+        "used": content.used,
+        "model": content.model,
+        "prompt_version": content.prompt_version,
+        "source": source,
+    }
+
+def _copy_rows(db: Session, rows: List[dict]) -> List[int]:
+    """COPY FROM STDIN avec des ids réservés à l'avance sur la séquence"""
+    ids = list(db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('generated_contents', 'id')) FROM generate_series(1, :n)"),
+        {"n": len(rows)}
+    ).scalars())
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for content_id, row in zip(ids, rows):
+        writer.writerow([
+            content_id,
+            *("\\N" if row[column] is None else row[column] for column in COPY_COLUMNS[1:])
+        ])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY generated_contents ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    finally:
+        cursor.close()
+    return ids
+
+def save_content_signatures(db: Session, items: Sequence[Tuple[int, str]]) -> None:
+    """Signature MinHash et bandes LSH de chaque (id, texte), dans la transaction en cours"""
+    signatures = []
+    bands = []
+    for content_id, texte in items:
+        signature = minhash_signature(texte)
+        if signature is None:
+            continue
+        signatures.append({"content_id": content_id, "signature": signature_to_bytes(signature)})
+        bands.extend(
+            {"band": band, "band_hash": band_hash, "content_id": content_id}
+            for band, band_hash in enumerate(signature_bands(signature))
+        )
+    if signatures:
+        db.execute(insert(ContentSignature), signatures)
+        db.execute(insert(ContentSignatureBand), bands)
+
+def _near_duplicates(db: Session, signature, min_similarity: float, limit: int,
+                     exclude_id: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Contenus partageant une bande LSH, filtrés sur la similarité estimée"""
+    # Une égalité par bande (OR) : chaque branche est une recherche sur la clé primaire
+    candidates = select(ContentSignatureBand.content_id).where(or_(*(
+        and_(ContentSignatureBand.band == band, ContentSignatureBand.band_hash == band_hash)
+        for band, band_hash in enumerate(signature_bands(signature))
+    )))
+    if exclude_id is not None:
+        candidates = candidates.where(ContentSignatureBand.content_id != exclude_id)
+
+    rows = db.execute(
+        select(ContentSignature.content_id, ContentSignature.signature)
+        .where(ContentSignature.content_id.in_(candidates.limit(NEAR_DUPLICATE_MAX_CANDIDATES).scalar_subquery()))
+    ).all()
+    matches = [
+        (row.content_id, similarity(signature, signature_from_bytes(row.signature)))
+        for row in rows
+    ]
+    matches = [match for match in matches if match[1] >= min_similarity]
+    matches.sort(key=lambda match: (-match[1], -match[0]))
+    return matches[:limit]
+
+class DBContentRepository(SessionBoundRepository, ContentRepositoryInterface):
     """Repository PostgreSQL (Single Responsibility)"""
 
-    def __init__(self, db: Session):
-        self.db = db
+    def __init__(self, db: Union[Session, AsyncSession]):
+        super().__init__(db)
 
+    @timed("db.save_content")
     async def save_content(self, content: ContentResponse, request: ContentRequest = None) -> bool:
         """Sauvegarde le contenu généré en base"""
-        try:
-            db_content = GeneratedContent(
-                cible=request.cible.value if request else "Unknown",
-                prospect_type=request.prospect_type.value if request else "Unknown",
-                generation_date=request.date if request else date.today(),
-                theme_general=content.theme_general,
-                theme_hebdo=content.theme_hebdo,
-                texte=content.texte,
-                used=content.used
-            )
+        def _save(db: Session) -> bool:
+            try:
+                db_content = GeneratedContent(
+                    cible=request.cible.value if request else "Unknown",
+                    prospect_type=request.prospect_type.value if request else "Unknown",
+                    generation_date=_to_date(request.date) if request else date.today(),
+                    theme_general=content.theme_general,
+                    theme_hebdo=content.theme_hebdo,
+                    texte=content.texte,
+                    used=content.used,
+                    model=content.model,
+                    prompt_version=content.prompt_version
+                )
 
-            self.db.add(db_content)
-            self.db.commit()
-            self.db.refresh(db_content)
-            return True
+                db.add(db_content)
+                db.flush()
+                save_content_signatures(db, [(db_content.id, db_content.texte)])
+                record_inserted(db, [(db_content.cible, db_content.prospect_type, db_content.generation_date, db_content.used)])
+                db.commit()
+                return True
+
+            except Exception as e:
+                db.rollback()
+                print(f"Erreur sauvegarde PostgreSQL: {str(e)}")
+                return False
 
-        except Exception as e:
-            self.db.rollback()
-            print(f"Erreur sauvegarde PostgreSQL: {str(e)}")
-            return False
+        return await self._run(_save)
 
+    @timed("db.save_content_with_request")
     async def save_content_with_request(self, content: ContentResponse, request: ContentRequest) -> bool:
         """Sauvegarde le contenu généré avec les informations de la requête"""
-        try:
-            db_content = GeneratedContent(
-                cible=request.cible.value,
-                prospect_type=request.prospect_type.value,
-                generation_date=request.date,
-                theme_general=content.theme_general,
-                theme_hebdo=content.theme_hebdo,
-                texte=content.texte,
-                used=content.used
-            )
+        def _save(db: Session) -> bool:
+            try:
+                db_content = GeneratedContent(
+                    cible=request.cible.value,
+                    prospect_type=request.prospect_type.value,
+                    generation_date=_to_date(request.date),
+                    theme_general=content.theme_general,
+                    theme_hebdo=content.theme_hebdo,
+                    texte=content.texte,
+                    used=content.used,
+                    model=content.model,
+                    prompt_version=content.prompt_version
+                )
+
+                db.add(db_content)
+                db.flush()
+                save_content_signatures(db, [(db_content.id, db_content.texte)])
+                record_inserted(db, [(db_content.cible, db_content.prospect_type, db_content.generation_date, db_content.used)])
+                db.commit()
+                return True
+
+            except Exception as e:
+                db.rollback()
+                print(f"Erreur sauvegarde PostgreSQL avec requête: {str(e)}")
+                return False
+
+        return await self._run(_save)
+
+    @timed("db.save_many")
+    async def save_many(self, items: List[Tuple[ContentResponse, ContentRequest]],
+                        before_commit: Optional[Callable[[Session], None]] = None,
+                        source: Optional[str] = None) -> List[int]:
+        """
+        Sauvegarde plusieurs contenus dans une seule transaction et retourne leurs ids.
 
-            self.db.add(db_content)
-            self.db.commit()
-            self.db.refresh(db_content)
-            return True
+        Un INSERT multi-lignes ... RETURNING id ; au-delà de BULK_COPY_THRESHOLD
+        lignes sur PostgreSQL (psycopg2), les ids sont réservés sur la séquence
+        puis les lignes chargées par COPY. Les signatures de quasi-doublons
+        sont écrites dans la même transaction, ainsi que `before_commit`
+        (ex: progression d'une ingestion). `source` marque l'origine des
+        lignes (POOL_SOURCE pour le stock pré-généré).
+        """
+        if not items:
+            return []
+
+        rows = [_content_row(content, request, source) for content, request in items]
+
+        def _save(db: Session) -> List[int]:
+            try:
+                if len(rows) >= BULK_COPY_THRESHOLD and db.get_bind().dialect.driver == "psycopg2":
+                    ids = _copy_rows(db, rows)
+                else:
+                    ids = list(db.execute(
+                        insert(GeneratedContent).returning(GeneratedContent.id, sort_by_parameter_order=True),
+                        rows
+                    ).scalars())
+                save_content_signatures(db, [(content_id, row["texte"]) for content_id, row in zip(ids, rows)])
+                record_inserted(db, [(row["cible"], row["prospect_type"], row["generation_date"], row["used"]) for row in rows])
+                if before_commit is not None:
+                    before_commit(db)
+                db.commit()
+                return ids
 
-        except Exception as e:
-            self.db.rollback()
-            print(f"Erreur sauvegarde PostgreSQL avec requête: {str(e)}")
-            return False
-        
+            except Exception as e:
+                db.rollback()
+                print(f"Erreur sauvegarde PostgreSQL (lot): {str(e)}")
+                return []
+
+        return await self._run(_save)
+
+    @timed("db.get_unused_content")
     async def get_unused_content(self) -> List[ContentResponse]:
         """Récupère le contenu non utilisé"""
-        try:
-            contents = self.db.query(GeneratedContent).filter(
-                GeneratedContent.used == 0
-            ).all()
+        def _get(db: Session) -> List[ContentResponse]:
+            try:
+                contents = db.query(GeneratedContent).filter(
+                    GeneratedContent.used == 0
+                ).all()
 
-            return [
-                ContentResponse(
-                    theme_general=content.theme_general,
-                    theme_hebdo=content.theme_hebdo,
-                    texte=content.texte,
-                    used=content.used
-                ) for content in contents
-            ]
-        except Exception:
-            return []
+                return [
+                    ContentResponse(
+                        theme_general=content.theme_general,
+                        theme_hebdo=content.theme_hebdo,
+                        texte=content.texte,
+                        cible=content.cible,
+                        prospect_type=content.prospect_type,
+                        generation_date=content.generation_date.date(),
+                        used=content.used
+                    ) for content in contents
+                ]
+            except Exception:
+                return []
 
-    async def get_all_content(self,
-                            cible: Optional[str] = None,
-                            prospect_type: Optional[str] = None,
-                            start_date: Optional[date] = None,
-                            end_date: Optional[date] = None) -> List[GeneratedContent]:
-        """Récupère tout le contenu avec filtres optionnels"""
-        query = self.db.query(GeneratedContent)
+        return await self._run(_get)
 
+    def _filtered_query(self, query,
+                        cible: Optional[str] = None,
+                        prospect_type: Optional[str] = None,
+                        start_date: Optional[date] = None,
+                        end_date: Optional[date] = None):
         if cible:
             query = query.filter(GeneratedContent.cible == cible)
         if prospect_type:
             query = query.filter(GeneratedContent.prospect_type == prospect_type)
+        # Bornes converties en datetime : même comparaison sous PostgreSQL et SQLite
+        # (qui comparerait une date ou une chaîne au texte stocké)
         if start_date:
-            query = query.filter(GeneratedContent.generation_date >= start_date)
+            query = query.filter(GeneratedContent.generation_date >= _to_datetime(start_date))
         if end_date:
-            query = query.filter(GeneratedContent.generation_date <= end_date)
+            query = query.filter(GeneratedContent.generation_date <= _to_datetime(end_date))
+        return query
 
-        return query.order_by(GeneratedContent.created_at.desc()).all()
+    @timed("db.get_content_page")
+    async def get_content_page(self,
+                               cible: Optional[str] = None,
+                               prospect_type: Optional[str] = None,
+                               start_date: Optional[date] = None,
+                               end_date: Optional[date] = None,
+                               limit: int = 100,
+                               offset: int = 0,
+                               cursor: Optional[str] = None,
+                               fields: Optional[Sequence[str]] = None) -> Tuple[list, Optional[str]]:
+        """
+        Page de contenus triée par (created_at, id) décroissants, calculée en SQL.
+
+        Avec `cursor`, la page démarre après la dernière ligne de la page
+        précédente (pagination par clé) et `offset` est ignoré. `fields`
+        restreint les colonnes lues (ex: sans `texte` pour les listes).
+        Retourne (lignes, curseur suivant).
+        """
+        def _page(db: Session) -> Tuple[list, Optional[str]]:
+            columns = [getattr(GeneratedContent, field) for field in dict.fromkeys(["id", "created_at", *(fields or CONTENT_FIELDS)])]
+            query = self._filtered_query(db.query(*columns), cible, prospect_type, start_date, end_date).order_by(
+                GeneratedContent.created_at.desc(),
+                GeneratedContent.id.desc()
+            )
 
+            if cursor:
+                cursor_created_at, cursor_id = decode_cursor(cursor)
+                query = query.filter(
+                    tuple_(GeneratedContent.created_at, GeneratedContent.id) < tuple_(cursor_created_at, cursor_id)
+                )
+            elif offset:
+                query = query.offset(offset)
+
+            rows = query.limit(limit).all()
+
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if len(rows) == limit else None
+            return rows, next_cursor
+
+        return await self._run(_page)
+
+    @timed("db.count_content")
+    async def count_content(self,
+                            cible: Optional[str] = None,
+                            prospect_type: Optional[str] = None,
+                            start_date: Optional[date] = None,
+                            end_date: Optional[date] = None,
+                            mode: str = "cached") -> Optional[int]:
+        """
+        Nombre de contenus correspondant aux filtres.
+
+        - `exact` : COUNT(*) à chaque appel
+        - `cached` : COUNT(*) mis en cache `COUNT_CACHE_TTL` secondes
+        - `estimate` : estimation du planificateur PostgreSQL (sans parcours)
+        - `none` : pas de total
+        """
+        if mode == "none":
+            return None
+
+        key = (cible, prospect_type, start_date, end_date)
+        if mode == "cached":
+            cached = _cached_count(key)
+            if cached is not None:
+                return cached
+
+        def _count(db: Session) -> int:
+            query = self._filtered_query(db.query(GeneratedContent.id), cible, prospect_type, start_date, end_date)
+
+            if mode == "estimate" and db.get_bind().dialect.name == "postgresql":
+                # Valeurs littérales (échappées par le dialecte) : aucun paramètre à transmettre,
+                # quel que soit le style du pilote (pyformat psycopg2, $n asyncpg)
+                compiled = query.statement.compile(
+                    dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}
+                )
+                plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return int(plan[0]["Plan"]["Plan Rows"])
+
+            return query.order_by(None).with_entities(func.count(GeneratedContent.id)).scalar()
+
+        total = await self._run(_count)
+        if mode == "cached":
+            _store_count(key, total)
+        return total
+
+    def stream_content(self,
+                       cible: Optional[str] = None,
+                       prospect_type: Optional[str] = None,
+                       start_date: Optional[date] = None,
+                       end_date: Optional[date] = None,
+                       chunk_size: int = 1000,
+                       fields: Optional[Sequence[str]] = None) -> Iterator:
+        """
+        Parcourt les contenus filtrés via un curseur côté serveur, par lots de
+        `chunk_size` lignes : la mémoire reste bornée quel que soit le volume.
+
+        Itérateur synchrone, à consommer hors de la boucle d'événements avec
+        une session synchrone.
+        """
+        columns = [getattr(GeneratedContent, field) for field in (fields or CONTENT_FIELDS)]
+        query = self._filtered_query(self.db.query(*columns), cible, prospect_type, start_date, end_date)
+        return iter(query.order_by(GeneratedContent.created_at.desc()).yield_per(chunk_size))
+
+    @timed("db.get_all_content")
+    async def get_all_content(self,
+                            cible: Optional[str] = None,
+                            prospect_type: Optional[str] = None,
+                            start_date: Optional[date] = None,
+                            end_date: Optional[date] = None) -> List[GeneratedContent]:
+        """Récupère tout le contenu avec filtres optionnels"""
+        def _get(db: Session) -> List[GeneratedContent]:
+            query = self._filtered_query(db.query(GeneratedContent), cible, prospect_type, start_date, end_date)
+            return query.order_by(GeneratedContent.created_at.desc()).all()
+
+        return await self._run(_get)
+
+    @timed("db.find_generated_content")
+    async def find_generated_content(self,
+                                     cible: str,
+                                     prospect_type: str,
+                                     start_date: date,
+                                     end_date: date,
+                                     model: str,
+                                     prompt_version: str) -> Optional[ContentResponse]:
+        """Retourne le contenu le plus récent généré pour la même clé de cache (end_date exclue)"""
+        def _find(db: Session) -> Optional[GeneratedContent]:
+            return db.query(GeneratedContent).filter(
+                GeneratedContent.cible == cible,
+                GeneratedContent.prospect_type == prospect_type,
+                GeneratedContent.generation_date >= start_date,
+                GeneratedContent.generation_date < end_date,
+                GeneratedContent.model == model,
+                GeneratedContent.prompt_version == prompt_version
+            ).order_by(GeneratedContent.created_at.desc()).first()
+
+        content = await self._run(_find)
+        if content is None:
+            return None
+        return ContentResponse(
+            theme_general=content.theme_general,
+            theme_hebdo=content.theme_hebdo,
+            texte=content.texte,
+            cible=content.cible,
+            prospect_type=content.prospect_type,
+            generation_date=content.generation_date.date(),
+            used=content.used,
+            model=content.model,
+            prompt_version=content.prompt_version
+        )
+
+    @timed("db.mark_as_used")
     async def mark_as_used(self, content_id: int) -> bool:
-        """Marque un contenu comme utilisé"""
-        try:
-            content = self.db.query(GeneratedContent).filter(
-                GeneratedContent.id == content_id
-            ).first()
-
-            if content:
-                content.used = 1
-                self.db.commit()
+        """Marque un contenu comme utilisé (un seul UPDATE) et met à jour la table de synthèse"""
+        def _mark(db: Session) -> bool:
+            try:
+                changed = db.execute(
+                    update(GeneratedContent)
+                    .where(GeneratedContent.id == content_id, GeneratedContent.used == 0)
+                    .values(used=1)
+                    .returning(GeneratedContent.cible, GeneratedContent.prospect_type, GeneratedContent.generation_date)
+                ).all()
+                if not changed:
+                    # Déjà utilisé (True) ou inexistant (False)
+                    return db.get(GeneratedContent, content_id) is not None
+                record_marked_used(db, changed)
+                db.commit()
                 return True
-            return False
-        except Exception:
-            self.db.rollback()
-            return False
+            except Exception:
+                db.rollback()
+                return False
+
+        return await self._run(_mark)
+
+    @timed("db.claim_unused_content")
+    async def claim_unused_content(self,
+                                   cible: Optional[str] = None,
+                                   prospect_type: Optional[str] = None,
+                                   start_date: Optional[date] = None,
+                                   end_date: Optional[date] = None,
+                                   limit: int = 1,
+                                   source: Optional[str] = None) -> list:
+        """
+        Réserve atomiquement jusqu'à `limit` contenus non utilisés.
+
+        Un seul UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED)
+        RETURNING : des publieurs concurrents ne peuvent jamais obtenir la même
+        ligne et ne s'attendent pas mutuellement. Avec `source`, seuls les
+        contenus de cette origine sont réservés (stock pré-généré).
+        """
+        def _claim(db: Session) -> list:
+            candidates = self._filtered_query(
+                # Prédicats littéraux : ils doivent correspondre à ceux des index partiels
+                select(GeneratedContent.id).where(GeneratedContent.used == literal_column("0")),
+                cible, prospect_type, start_date, end_date
+            )
+            if source is not None:
+                candidates = candidates.where(
+                    GeneratedContent.source == bindparam("source", source, literal_execute=True)
+                )
+            candidates = candidates.order_by(
+                GeneratedContent.created_at,
+                GeneratedContent.id
+            ).limit(limit).with_for_update(skip_locked=True)
+
+            try:
+                rows = db.execute(
+                    update(GeneratedContent)
+                    .where(GeneratedContent.id.in_(candidates.scalar_subquery()))
+                    .values(used=1)
+                    .returning(*[getattr(GeneratedContent, field)
+                                 for field in (*CONTENT_FIELDS, "model", "prompt_version")]),
+                    execution_options={"synchronize_session": False}
+                ).all()
+                record_marked_used(db, [(row.cible, row.prospect_type, row.generation_date) for row in rows])
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            return sorted(rows, key=lambda row: (row.created_at, row.id))
+
+        return await self._run(_claim)
+
+    @timed("db.count_unused_content")
+    async def count_unused_content(self,
+                                   start_date: date,
+                                   end_date: date,
+                                   source: Optional[str] = None) -> list:
+        """Contenus non utilisés par (cible, prospect_type, generation_date), éventuellement d'une seule origine"""
+        def _count(db: Session) -> list:
+            query = self._filtered_query(
+                select(GeneratedContent.cible, GeneratedContent.prospect_type, GeneratedContent.generation_date,
+                       func.count()).where(GeneratedContent.used == literal_column("0")),
+                start_date=start_date, end_date=end_date
+            )
+            if source is not None:
+                query = query.where(GeneratedContent.source == bindparam("source", source, literal_execute=True))
+            return db.execute(query.group_by(
+                GeneratedContent.cible, GeneratedContent.prospect_type, GeneratedContent.generation_date
+            )).all()
+
+        return await self._run(_count)
+
+    @timed("db.search_content")
+    async def search_content(self,
+                             query: str,
+                             cible: Optional[str] = None,
+                             prospect_type: Optional[str] = None,
+                             start_date: Optional[date] = None,
+                             end_date: Optional[date] = None,
+                             limit: int = 20) -> list:
+        """
+        Recherche plein texte dans theme_general, theme_hebdo et texte.
+
+        PostgreSQL : `websearch_to_tsquery` (syntaxe "expression", OR, -exclu)
+        sur l'index GIN, résultats triés par pertinence. Autres bases : tous
+        les mots doivent apparaître (LIKE), sans score.
+        """
+        def _search(db: Session) -> list:
+            columns = [getattr(GeneratedContent, field) for field in CONTENT_FIELDS]
+            if db.get_bind().dialect.name == "postgresql":
+                ts_query = func.websearch_to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), query)
+                rank = func.ts_rank(SEARCH_DOCUMENT, ts_query).label("rank")
+                statement = select(*columns, rank).where(SEARCH_DOCUMENT.op("@@")(ts_query)).order_by(
+                    rank.desc(), GeneratedContent.created_at.desc()
+                )
+            else:
+                statement = select(*columns, literal_column("NULL").label("rank"))
+                for term in query.split():
+                    pattern = f"%{term}%"
+                    statement = statement.where(or_(
+                        GeneratedContent.theme_general.ilike(pattern),
+                        GeneratedContent.theme_hebdo.ilike(pattern),
+                        GeneratedContent.texte.ilike(pattern)
+                    ))
+                statement = statement.order_by(GeneratedContent.created_at.desc(), GeneratedContent.id.desc())
+
+            statement = self._filtered_query(statement, cible, prospect_type, start_date, end_date)
+            return db.execute(statement.limit(limit)).all()
+
+        return await self._run(_search)
+
+    @timed("db.find_near_duplicates")
+    async def find_near_duplicates(self,
+                                   texte: str,
+                                   min_similarity: float = NEAR_DUPLICATE_MIN_SIMILARITY,
+                                   limit: int = 5) -> List[Tuple[int, float]]:
+        """(id, similarité) des contenus déjà stockés proches de `texte`, du plus proche au moins proche"""
+        signature = minhash_signature(texte)
+        if signature is None:
+            return []
+        return await self._run(_near_duplicates, signature, min_similarity, limit)
+
+    @timed("db.find_near_duplicates_of")
+    async def find_near_duplicates_of(self,
+                                      content_id: int,
+                                      min_similarity: float = NEAR_DUPLICATE_MIN_SIMILARITY,
+                                      limit: int = 5) -> Optional[List[Tuple[int, float]]]:
+        """Quasi-doublons d'un contenu stocké ; None s'il n'a pas de signature"""
+        def _find(db: Session) -> Optional[List[Tuple[int, float]]]:
+            stored = db.get(ContentSignature, content_id)
+            if stored is None:
+                return None
+            return _near_duplicates(db, signature_from_bytes(stored.signature), min_similarity, limit, content_id)
+
+        return await self._run(_find)
+
+    @timed("db.backfill_signatures")
+    async def backfill_signatures(self, batch_size: int = 1000) -> int:
+        """Calcule les signatures manquantes (contenus antérieurs à la détection), par lots ; retourne le nombre traité"""
+        def _backfill(db: Session) -> int:
+            total = 0
+            last_id = 0
+            while True:
+                rows = db.execute(
+                    select(GeneratedContent.id, GeneratedContent.texte)
+                    .outerjoin(ContentSignature, ContentSignature.content_id == GeneratedContent.id)
+                    .where(ContentSignature.content_id.is_(None), GeneratedContent.id > last_id)
+                    .order_by(GeneratedContent.id)
+                    .limit(batch_size)
+                ).all()
+                if not rows:
+                    return total
+                save_content_signatures(db, [(row.id, row.texte) for row in rows])
+                db.commit()
+                total += len(rows)
+                last_id = rows[-1].id
+
+        return await self._run(_backfill)
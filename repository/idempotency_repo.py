@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Union
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.models import IdempotencyKey
+from repository.session_runner import SessionBoundRepository
+from services.metrics import timed
+
+
+class DBIdempotencyRepository(SessionBoundRepository):
+    """Stockage des clés d'idempotence et des réponses à rejouer (Single Responsibility)"""
+
+    def __init__(self, db: Union[Session, AsyncSession]):
+        super().__init__(db)
+
+    @timed("db.reserve_idempotency_key")
+    async def reserve(self, key: str, request_hash: str, ttl: float,
+                      pending_timeout: float) -> Tuple[str, Optional[IdempotencyKey]]:
+        """
+        Réserve la clé pour cette requête ; retourne ("reserved", None) ou
+        ("existing", ligne) si elle est déjà prise.
+
+        Une clé expirée, ou restée `pending` au-delà de `pending_timeout`
+        (processus arrêté en pleine génération), est libérée puis réservée.
+        """
+        def _reserve(db: Session) -> Tuple[str, Optional[IdempotencyKey]]:
+            now = datetime.utcnow()
+            try:
+                db.execute(
+                    delete(IdempotencyKey).where(
+                        IdempotencyKey.key == key,
+                        (IdempotencyKey.expires_at <= now) | (
+                            (IdempotencyKey.status == "pending")
+                            & (IdempotencyKey.created_at <= now - timedelta(seconds=pending_timeout))
+                        )
+                    )
+                )
+                # La clé primaire départage deux réservations simultanées
+                db.add(IdempotencyKey(
+                    key=key,
+                    request_hash=request_hash,
+                    status="pending",
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=ttl)
+                ))
+                db.commit()
+                return "reserved", None
+
+            except IntegrityError:
+                db.rollback()
+                return "existing", db.get(IdempotencyKey, key, populate_existing=True)
+
+            except Exception:
+                db.rollback()
+                raise
+
+        return await self._run(_reserve)
+
+    @timed("db.complete_idempotency_key")
+    async def complete(self, key: str, response: str) -> None:
+        """Enregistre la réponse (JSON) à rejouer pour cette clé"""
+        def _complete(db: Session) -> None:
+            try:
+                db.execute(
+                    update(IdempotencyKey)
+                    .where(IdempotencyKey.key == key)
+                    .values(status="completed", response=response)
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+        await self._run(_complete)
+
+    @timed("db.release_idempotency_key")
+    async def release(self, key: str) -> None:
+        """Libère une clé dont la génération a échoué : le client peut réessayer avec la même clé"""
+        def _release(db: Session) -> None:
+            try:
+                db.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.key == key, IdempotencyKey.status == "pending")
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
+        await self._run(_release)
+
+    @timed("db.purge_idempotency_keys")
+    async def purge_expired(self) -> int:
+        """Supprime les clés expirées ; retourne le nombre de lignes supprimées"""
+        def _purge(db: Session) -> int:
+            try:
+                result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+                db.commit()
+                return result.rowcount
+            except Exception:
+                db.rollback()
+                raise
+
+        return await self._run(_purge)
@@ -0,0 +1,277 @@
+from datetime import date, timedelta
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.models import GeneratedContent, GenerationJob, GenerationJobItem
+from models.schemas import ContentRequest, ContentResponse, GenerationJobRequest, GenerationJobStatus
+from repository.conn_repo import save_content_signatures
+from repository.session_runner import SessionBoundRepository
+from repository.stats_repo import record_inserted
+from services.metrics import timed
+
+
+def job_weeks(start_date: date, end_date: date) -> List[date]:
+    """Lundis des semaines ISO couvertes par l'intervalle"""
+    monday = start_date - timedelta(days=start_date.weekday())
+    weeks = []
+    while monday <= end_date:
+        weeks.append(monday)
+        monday += timedelta(days=7)
+    return weeks
+
+
+class DBJobRepository(SessionBoundRepository):
+    """Persistance des jobs de génération en masse (Single Responsibility)"""
+
+    def __init__(self, db: Union[Session, AsyncSession]):
+        super().__init__(db)
+
+    @timed("db.create_job")
+    async def create_job(self, job_request: GenerationJobRequest) -> int:
+        """Crée le job et sa matrice cible × prospect_type × semaine ; retourne son id"""
+        weeks = job_weeks(job_request.start_date, job_request.end_date)
+        matrix = [
+            (cible.value, prospect_type.value, week)
+            for week in weeks
+            for cible in dict.fromkeys(job_request.cibles)
+            for prospect_type in dict.fromkeys(job_request.prospect_types)
+        ]
+
+        def _create(db: Session) -> int:
+            try:
+                job = GenerationJob(
+                    status="pending",
+                    start_date=job_request.start_date,
+                    end_date=job_request.end_date,
+                    total_items=len(matrix),
+                    completed_items=0,
+                    failed_items=0
+                )
+                db.add(job)
+                db.flush()
+
+                db.add_all([
+                    GenerationJobItem(
+                        job_id=job.id,
+                        cible=cible,
+                        prospect_type=prospect_type,
+                        generation_date=week,
+                        status="pending",
+                        attempts=0
+                    ) for cible, prospect_type, week in matrix
+                ])
+                db.commit()
+                return job.id
+
+            except Exception:
+                db.rollback()
+                raise
+
+        return await self._run(_create)
+
+    @timed("db.get_job_status")
+    async def get_job_status(self, job_id: int) -> Optional[GenerationJobStatus]:
+        def _status(db: Session) -> Optional[GenerationJobStatus]:
+            job = db.get(GenerationJob, job_id, populate_existing=True)
+            if job is None:
+                return None
+            return GenerationJobStatus(
+                job_id=job.id,
+                status=job.status,
+                start_date=job.start_date,
+                end_date=job.end_date,
+                total_items=job.total_items,
+                completed_items=job.completed_items,
+                failed_items=job.failed_items,
+                pending_items=job.total_items - job.completed_items - job.failed_items,
+                error=job.error
+            )
+
+        return await self._run(_status)
+
+    @timed("db.get_resumable_job_ids")
+    async def get_resumable_job_ids(self) -> List[int]:
+        """Jobs interrompus (redémarrage) ou pas encore démarrés"""
+        def _ids(db: Session) -> List[int]:
+            rows = db.query(GenerationJob.id).filter(
+                GenerationJob.status.in_(["pending", "running"])
+            ).order_by(GenerationJob.id).all()
+            return [row.id for row in rows]
+
+        return await self._run(_ids)
+
+    @timed("db.start_job")
+    async def start_job(self, job_id: int) -> Optional[List[Tuple[int, ContentRequest, int]]]:
+        """
+        Passe le job en cours et retourne ses éléments restants (id, requête, tentatives).
+
+        None si le job n'est plus en attente ni en cours (déjà terminé) :
+        l'appelant doit tenir le verrou du job.
+        """
+        def _start(db: Session) -> Optional[List[Tuple[int, ContentRequest, int]]]:
+            started = db.query(GenerationJob).filter(
+                GenerationJob.id == job_id,
+                GenerationJob.status.in_(["pending", "running"])
+            ).update({"status": "running"}, synchronize_session=False)
+            db.commit()
+            if not started:
+                return None
+
+            items = db.query(GenerationJobItem).filter(
+                GenerationJobItem.job_id == job_id,
+                GenerationJobItem.status == "pending"
+            ).order_by(GenerationJobItem.id).all()
+
+            return [
+                (
+                    item.id,
+                    ContentRequest(
+                        cible=item.cible,
+                        prospect_type=item.prospect_type,
+                        date=item.generation_date
+                    ),
+                    item.attempts
+                ) for item in items
+            ]
+
+        return await self._run(_start)
+
+    @timed("db.complete_item")
+    async def complete_item(self, job_id: int, item_id: int, content: ContentResponse, request: ContentRequest) -> int:
+        """Sauvegarde le contenu et valide l'élément dans une seule transaction"""
+        def _complete(db: Session) -> int:
+            try:
+                db_content = GeneratedContent(
+                    cible=request.cible.value,
+                    prospect_type=request.prospect_type.value,
+                    generation_date=date.fromisoformat(request.date),
+                    theme_general=content.theme_general,
+                    theme_hebdo=content.theme_hebdo,
+                    texte=content.texte,
+                    used=content.used,
+                    model=content.model,
+                    prompt_version=content.prompt_version
+                )
+                db.add(db_content)
+                db.flush()
+                save_content_signatures(db, [(db_content.id, db_content.texte)])
+                record_inserted(db, [(db_content.cible, db_content.prospect_type, db_content.generation_date, db_content.used)])
+
+                db.query(GenerationJobItem).filter(GenerationJobItem.id == item_id).update(
+                    {"status": "done", "content_id": db_content.id, "error": None}, synchronize_session=False
+                )
+                db.query(GenerationJob).filter(GenerationJob.id == job_id).update(
+                    {"completed_items": GenerationJob.completed_items + 1}, synchronize_session=False
+                )
+                db.commit()
+                return db_content.id
+
+            except Exception:
+                db.rollback()
+                raise
+
+        return await self._run(_complete)
+
+    @timed("db.fail_item")
+    async def fail_item(self, job_id: int, item_id: int, error: str, final: bool) -> None:
+        """Enregistre un échec ; l'élément reste en attente tant qu'il reste des tentatives"""
+        def _fail(db: Session) -> None:
+            try:
+                db.query(GenerationJobItem).filter(GenerationJobItem.id == item_id).update(
+                    {
+                        "status": "failed" if final else "pending",
+                        "attempts": GenerationJobItem.attempts + 1,
+                        "error": error[:1000]
+                    },
+                    synchronize_session=False
+                )
+                if final:
+                    db.query(GenerationJob).filter(GenerationJob.id == job_id).update(
+                        {"failed_items": GenerationJob.failed_items + 1}, synchronize_session=False
+                    )
+                db.commit()
+
+            except Exception:
+                db.rollback()
+                raise
+
+        await self._run(_fail)
+
+    @timed("db.finish_job")
+    async def finish_job(self, job_id: int) -> Optional[str]:
+        """
+        Statut final du job après le passage des workers.
+
+        Des éléments encore en attente (échec non enregistré) laissent le job
+        `pending` : il sera repris à la prochaine recherche des jobs
+        (services.generation_jobs.JOB_RESCAN_INTERVAL) ou au prochain démarrage.
+        """
+        def _finish(db: Session) -> Optional[str]:
+            job = db.get(GenerationJob, job_id, populate_existing=True)
+            if job is None:
+                return None
+            remaining = db.query(GenerationJobItem).filter(
+                GenerationJobItem.job_id == job_id,
+                GenerationJobItem.status == "pending"
+            ).count()
+            job.error = None
+            if remaining:
+                job.status = "pending"
+                job.error = f"{remaining} éléments non terminés, repris automatiquement"
+            elif job.completed_items == 0 and job.failed_items > 0:
+                job.status = "failed"
+            else:
+                job.status = "completed"
+            db.commit()
+            return job.status
+
+        return await self._run(_finish)
+
+    @timed("db.get_job_results")
+    async def get_job_results(self, job_id: int, limit: int, offset: int) -> List[dict]:
+        """Résultats partiels : éléments terminés et leur contenu"""
+        def _results(db: Session) -> List[dict]:
+            rows = db.query(GenerationJobItem, GeneratedContent).join(
+                GeneratedContent, GeneratedContent.id == GenerationJobItem.content_id
+            ).filter(
+                GenerationJobItem.job_id == job_id,
+                GenerationJobItem.status == "done"
+            ).order_by(GenerationJobItem.id).offset(offset).limit(limit).all()
+
+            return [
+                {
+                    "item_id": item.id,
+                    "content_id": content.id,
+                    "cible": content.cible,
+                    "prospect_type": content.prospect_type,
+                    "generation_date": content.generation_date,
+                    "theme_general": content.theme_general,
+                    "theme_hebdo": content.theme_hebdo,
+                    "texte": content.texte,
+                    "used": content.used
+                } for item, content in rows
+            ]
+
+        return await self._run(_results)
+
+    @timed("db.get_job_failures")
+    async def get_job_failures(self, job_id: int) -> List[dict]:
+        def _failures(db: Session) -> List[dict]:
+            items = db.query(GenerationJobItem).filter(
+                GenerationJobItem.job_id == job_id,
+                GenerationJobItem.status == "failed"
+            ).order_by(GenerationJobItem.id).all()
+            return [
+                {
+                    "item_id": item.id,
+                    "cible": item.cible,
+                    "prospect_type": item.prospect_type,
+                    "generation_date": item.generation_date,
+                    "attempts": item.attempts,
+                    "error": item.error
+                } for item in items
+            ]
+
+        return await self._run(_failures)
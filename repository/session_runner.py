@@ -0,0 +1,28 @@
+from typing import Callable, TypeVar, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+T = TypeVar("T")
+
+
+class SessionBoundRepository:
+    """
+    Base des repositories SQLAlchemy, compatibles session synchrone ou asynchrone.
+
+    Les requêtes sont écrites une seule fois avec l'API `Session` ; avec une
+    `AsyncSession` elles passent par `run_sync` et ne bloquent plus la boucle
+    d'événements.
+    """
+
+    def __init__(self, db: Union[Session, AsyncSession]):
+        self.db = db
+
+    @property
+    def is_async(self) -> bool:
+        return isinstance(self.db, AsyncSession)
+
+    async def _run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(fn, *args, **kwargs)
+        return fn(self.db, *args, **kwargs)
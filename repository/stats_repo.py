@@ -0,0 +1,171 @@
+"""
+Table de synthèse `content_stats` : nombre de contenus par cible, type de
+prospect, semaine ISO et `used`.
+
+Elle est mise à jour dans la transaction de chaque écriture sur
+`generated_contents` (insertion, `mark_as_used`, réservation) par un UPSERT
+additif : les statistiques se lisent sans parcourir la table des contenus.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from database.models import ContentStat, GeneratedContent
+from repository.session_runner import SessionBoundRepository
+from services.metrics import timed
+
+StatKey = Tuple[str, str, date, int]
+
+
+def week_start(value: Union[date, datetime, str]) -> date:
+    """Lundi de la semaine ISO"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return value - timedelta(days=value.weekday())
+
+
+def stat_key(cible: str, prospect_type: str, generation_date, used: Optional[int]) -> StatKey:
+    return cible, prospect_type, week_start(generation_date), used or 0
+
+
+def _upsert_statement(db: Session, rows: List[dict]):
+    """INSERT ... ON CONFLICT DO UPDATE count = count + excluded.count (PostgreSQL, SQLite)"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    statement = dialect_insert(ContentStat).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=[ContentStat.cible, ContentStat.prospect_type, ContentStat.week_start, ContentStat.used],
+        set_={"count": ContentStat.count + statement.excluded.count}
+    )
+
+
+def apply_stat_deltas(db: Session, deltas: Dict[StatKey, int]) -> None:
+    """Ajoute les variations aux compteurs, dans la transaction en cours"""
+    # Ordre fixe : deux transactions concurrentes verrouillent les lignes dans le même ordre
+    rows = [
+        {"cible": key[0], "prospect_type": key[1], "week_start": key[2], "used": key[3], "count": delta}
+        for key, delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+
+    statement = _upsert_statement(db, rows)
+    if statement is not None:
+        db.execute(statement)
+        return
+
+    for row in rows:
+        result = db.execute(
+            update(ContentStat)
+            .where(
+                ContentStat.cible == row["cible"],
+                ContentStat.prospect_type == row["prospect_type"],
+                ContentStat.week_start == row["week_start"],
+                ContentStat.used == row["used"]
+            )
+            .values(count=ContentStat.count + row["count"])
+        )
+        if result.rowcount == 0:
+            db.execute(insert(ContentStat).values(**row))
+
+
+def record_inserted(db: Session, rows: Iterable[Tuple[str, str, object, Optional[int]]]) -> None:
+    """Compte des contenus insérés : (cible, prospect_type, generation_date, used)"""
+    apply_stat_deltas(db, Counter(stat_key(*row) for row in rows))
+
+
+def record_marked_used(db: Session, rows: Iterable[Tuple[str, str, object]]) -> None:
+    """Contenus passés de used = 0 à used = 1 : (cible, prospect_type, generation_date)"""
+    deltas: Dict[StatKey, int] = Counter()
+    for cible, prospect_type, generation_date in rows:
+        deltas[stat_key(cible, prospect_type, generation_date, 0)] -= 1
+        deltas[stat_key(cible, prospect_type, generation_date, 1)] += 1
+    apply_stat_deltas(db, deltas)
+
+
+class DBStatsRepository(SessionBoundRepository):
+    """Lecture et reconstruction de la table de synthèse (Single Responsibility)"""
+
+    def __init__(self, db: Union[Session, AsyncSession]):
+        super().__init__(db)
+
+    @timed("db.get_stats")
+    async def get_stats(self,
+                        cible: Optional[str] = None,
+                        prospect_type: Optional[str] = None,
+                        start_date: Optional[date] = None,
+                        end_date: Optional[date] = None,
+                        used: Optional[int] = None) -> list:
+        """Lignes (cible, prospect_type, week_start, used, count) non nulles, par semaine croissante"""
+        def _get(db: Session) -> list:
+            query = select(
+                ContentStat.cible, ContentStat.prospect_type, ContentStat.week_start, ContentStat.used, ContentStat.count
+            ).where(ContentStat.count > 0)
+            if cible:
+                query = query.where(ContentStat.cible == cible)
+            if prospect_type:
+                query = query.where(ContentStat.prospect_type == prospect_type)
+            # Semaines qui recoupent l'intervalle demandé
+            if start_date:
+                query = query.where(ContentStat.week_start >= week_start(start_date))
+            if end_date:
+                query = query.where(ContentStat.week_start <= end_date)
+            if used is not None:
+                query = query.where(ContentStat.used == used)
+            return db.execute(query.order_by(
+                ContentStat.week_start, ContentStat.cible, ContentStat.prospect_type, ContentStat.used
+            )).all()
+
+        return await self._run(_get)
+
+    @timed("db.rebuild_stats")
+    async def rebuild(self) -> int:
+        """
+        Recalcule toute la table depuis generated_contents (un seul parcours).
+
+        À lancer une fois sur une base existante, ou après une écriture faite
+        en dehors des repositories ; retourne le nombre de lignes de synthèse.
+        """
+        def _rebuild(db: Session) -> int:
+            try:
+                grouped = db.execute(
+                    select(
+                        GeneratedContent.cible,
+                        GeneratedContent.prospect_type,
+                        GeneratedContent.generation_date,
+                        GeneratedContent.used,
+                        func.count()
+                    ).group_by(
+                        GeneratedContent.cible,
+                        GeneratedContent.prospect_type,
+                        GeneratedContent.generation_date,
+                        GeneratedContent.used
+                    )
+                ).all()
+                # Regroupement par semaine en Python : même calcul de semaine que les écritures
+                deltas: Dict[StatKey, int] = Counter()
+                for cible, prospect_type, generation_date, used_value, count in grouped:
+                    deltas[stat_key(cible, prospect_type, generation_date, used_value)] += count
+
+                db.execute(delete(ContentStat))
+                apply_stat_deltas(db, deltas)
+                db.commit()
+                return len(deltas)
+
+            except Exception:
+                db.rollback()
+                raise
+
+        return await self._run(_rebuild)
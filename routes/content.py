@@ -1,31 +1,65 @@
+import asyncio
+import itertools
 from datetime import date, datetime
-import random
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import StreamingResponse
-from database.connexion import get_db
-from models.schemas import CibleEnum, ContentRequest, ContentResponse, ProspectTypeEnum
-from repository.conn_repo import DBContentRepository
+from fastapi import APIRouter, HTTPException, Depends, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+import os
+from database.connexion import DBSession, SessionLocal, get_session, session_scope
+from models.schemas import CacheControlEnum, ContentClaimRequest, CountModeEnum, ContentRequest, ExportFormatEnum, ContentResponse
+from repository.conn_repo import CONTENT_FIELDS, DBContentRepository
 from services.content_ai import ContentGeneratorInterface, ContentGeneratorFactory
+from services.editorial_batch import build_weekly_requests, generate_batch
+from services.generation_cache import GENERATION_CACHE_DB, CachedContentGenerator, get_generation_cache
+from services.generator_registry import CONTENT_GENERATOR, get_generator_registry
+from services.idempotency import IdempotencyConflictError, IdempotentRequest, request_fingerprint
+from services.minhash import NEAR_DUPLICATE_MIN_SIMILARITY
+from services.near_duplicates import DeduplicatingContentGenerator
 from repository.content_repo import ContentRepositoryInterface, InMemoryContentRepository
-from sqlalchemy.orm import Session
+from repository.idempotency_repo import DBIdempotencyRepository
+from repository.stats_repo import DBStatsRepository
 
 from services.excel_extract import ExcelExtractService
+from services.content_export import EXPORT_MEDIA_TYPES, ContentExportService
+from services.content_stream import stream_generation
+from services.content_stats import summarize
+from services.content_pool import CONTENT_POOL_ENABLED, fetch_from_pool
 
 router = APIRouter(prefix="/api/v1", tags=["Content Generation"])
 
+# Taille des lots lus depuis la base pour les exports
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
 # Dependency Injection
 def get_content_generator() -> ContentGeneratorInterface:
+    return ContentGeneratorFactory.create_generator(CONTENT_GENERATOR)
+
+def get_streaming_generator() -> ContentGeneratorInterface:
+    # Le mode flux nécessite un backend capable de streamer (le routeur ne l'est pas)
+    generator = ContentGeneratorFactory.create_generator(CONTENT_GENERATOR)
+    if hasattr(generator, "stream_completion"):
+        return generator
     return ContentGeneratorFactory.create_generator("openai")
 
-def get_content_repository(db: Session = Depends(get_db)) -> ContentRepositoryInterface:
+def get_content_repository(db: DBSession = Depends(get_session)) -> ContentRepositoryInterface:
     return DBContentRepository(db)
 
+async def save_generated_content(content: ContentResponse, request: ContentRequest) -> None:
+    # Session dédiée : la sauvegarde peut survivre à la requête qui a lancé la génération
+    async with session_scope() as db:
+        await DBContentRepository(db).save_content_with_request(content, request)
+
 @router.post("/generate-content", response_model=ContentResponse)
 async def generate_editorial_content(
     request: ContentRequest,
+    cache_control: CacheControlEnum = Query(CacheControlEnum.DEFAULT, description="`refresh` force une nouvelle génération"),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", min_length=1, max_length=255,
+        description="Les nouvelles tentatives avec la même clé reçoivent la réponse enregistrée"
+    ),
     generator: ContentGeneratorInterface = Depends(get_content_generator),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ):
     """
     Génère du contenu éditorial personnalisé via IA
@@ -33,148 +67,413 @@ async def generate_editorial_content(
     - **cible**: Canal marketing (LinkedIn, Facebook, Instagram, TikTok, Mail)
     - **prospect_type**: Maturité commerciale (Peu qualifié, Qualifié, Hautement qualifié)
     - **date**: Date de génération du contenu
+    - **cache_control**: `default` réutilise un contenu de la même semaine, `refresh` régénère
+    - **Idempotency-Key** (en-tête): rejoue la réponse d'une requête déjà traitée
+      (`Idempotent-Replayed: true`) ; 409 si elle est encore en cours, 422 si la
+      clé a servi pour un autre corps
+
+    Avec `CONTENT_POOL_ENABLED`, un contenu pré-généré de la même semaine est
+    réservé et retourné (`used` = 1) ; la génération n'a lieu que si le stock
+    est vide. Un contenu quasi identique à un contenu déjà stocké est régénéré
+    (`NEAR_DUPLICATE_REGENERATIONS`). Les requêtes identiques simultanées
+    partagent une seule génération.
 
     Retourne un contenu éditorial avec thème général, thème hebdomadaire et texte.
     """
+    idempotent = None
+    if idempotency_key:
+        idempotent = IdempotentRequest(
+            DBIdempotencyRepository(db),
+            idempotency_key,
+            request_fingerprint(request, cache_control=cache_control.value)
+        )
+        try:
+            replay = await idempotent.begin()
+        except IdempotencyConflictError as e:
+            if e.reason == "mismatch":
+                raise HTTPException(status_code=422, detail=str(e))
+            raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+        if replay is not None:
+            return Response(content=replay, media_type="application/json", headers={"Idempotent-Replayed": "true"})
+
     try:
-        repository = DBContentRepository(db)
-        # Générer le contenu via IA
-        content = await generator.generate_content(request)
-        # Sauvegarder le contenu généré avec les infos de la requête
-        await repository.save_content_with_request(content, request)
+        content = None
+        if CONTENT_POOL_ENABLED and cache_control != CacheControlEnum.REFRESH:
+            # Contenu pré-généré de la semaine, réservé pour cet appel
+            content = await fetch_from_pool(DBContentRepository(db), request)
 
-        return content
+        if content is None:
+            cached_generator = CachedContentGenerator(
+                DeduplicatingContentGenerator(generator),
+                get_generation_cache(),
+                DBContentRepository(db) if GENERATION_CACHE_DB else None,
+                # Sauvegarder le contenu généré avec les infos de la requête
+                persist=save_generated_content
+            )
+            # Générer le contenu via IA (ou le relire depuis le cache)
+            content, _ = await cached_generator.generate_with_cache(
+                request,
+                refresh=cache_control == CacheControlEnum.REFRESH
+            )
+    except asyncio.CancelledError:
+        if idempotent is not None:
+            await idempotent.abort()
+        raise
     except Exception as e:
+        # Clé libérée : une nouvelle tentative pourra relancer la génération
+        if idempotent is not None:
+            await idempotent.abort()
         raise HTTPException(
             status_code=500,
             detail=f"Erreur lors de la génération du contenu: {str(e)}"
         )
 
+    if idempotent is not None:
+        try:
+            if content.fallback:
+                # Contenu de secours jamais rejoué (comme pour le cache) : une nouvelle tentative régénère
+                await idempotent.abort()
+            else:
+                await idempotent.complete(content)
+        except Exception as e:
+            # Contenu déjà sauvegardé : la clé n'est pas libérée, une nouvelle tentative
+            # ne paie pas une seconde génération (409 jusqu'à IDEMPOTENCY_PENDING_TIMEOUT)
+            print(f"Erreur enregistrement clé d'idempotence {idempotency_key}: {str(e)}")
+
+    return content
+
+@router.post("/generate-content/stream")
+async def generate_editorial_content_stream(
+    request: ContentRequest,
+    generator: ContentGeneratorInterface = Depends(get_streaming_generator)
+):
+    """
+    Variante en flux (Server-Sent Events) de /generate-content
+
+    - `delta` : texte reçu pour le champ en cours (`theme_general`, `theme_hebdo`, `texte`)
+    - `field` : champ complet
+    - `done` : contenu final, sauvegardé en base (`id`, null si la génération
+      a été partagée avec une requête identique ou servie par le cache)
+    - `error` : échec de la génération, suivi d'un `done` avec le contenu de secours
+    """
+    if not hasattr(generator, "stream_completion"):
+        raise HTTPException(status_code=501, detail="Ce générateur ne supporte pas le mode flux")
+
+    return StreamingResponse(
+        stream_generation(generator, request),
+        media_type="text/event-stream",
+        # Désactive la mise en tampon des proxys (nginx) pour livrer chaque événement
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/generate-content-hebdo", response_model=List[ContentResponse])
 async def generate_editorial_batch(
     date_: date,
+    max_parallelism: Optional[int] = Query(None, ge=1, le=20, description="Générations simultanées"),
     generator: ContentGeneratorInterface = Depends(get_content_generator),
-    db: Session = Depends(get_db)
+    db: DBSession = Depends(get_session)
 ):
     """
     Génère automatiquement du contenu éditorial pour tous les canaux définis
 
     - Génère un contenu pour chaque **cible** (LinkedIn, Facebook, Instagram, TikTok, Mail)
     - Le **prospect_type** est choisi aléatoirement pour chaque cible
-    - Tous les contenus sont sauvegardés en base
+    - Les générations tournent en parallèle (**max_parallelism** simultanées)
+    - Tous les contenus sont sauvegardés en base dans une seule transaction
 
     Retourne une liste de contenus générés.
     """
     try:
         repository = DBContentRepository(db)
-        results = []
 
-        for cible in CibleEnum:
-            prospect_type = random.choice(list(ProspectTypeEnum))
+        results = await generate_batch(generator, build_weekly_requests(date_), max_parallelism)
+        await repository.save_many(results)
 
-            request = ContentRequest(
-                cible=cible,
-                prospect_type=prospect_type,
-                date=date_
-            )
+        return [content for content, _ in results]
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la génération de contenu hebdo : {str(e)}"
+        )
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Compteurs du cache de génération (hits, misses, complétions économisées)"""
+    return get_generation_cache().stats()
 
-            content = await generator.generate_content(request)
-            await repository.save_content_with_request(content, request)
-            results.append(content)
+@router.get("/generators/stats")
+async def get_generator_stats():
+    """Backends instanciés et statistiques glissantes du routeur (latence moyenne, taux d'erreur)"""
+    registry = get_generator_registry()
+    instances = registry.instances()
+    router = instances.get("router")
+    return {
+        "default": CONTENT_GENERATOR,
+        "registered": registry.names(),
+        "instantiated": list(instances),
+        "router": router.snapshot() if router is not None else None
+    }
+
+@router.get("/stats")
+async def get_content_stats(
+    cible: Optional[str] = Query(None),
+    prospect_type: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None, description="Semaines à partir de celle de cette date"),
+    end_date: Optional[date] = Query(None, description="Semaines commençant au plus tard à cette date"),
+    used: Optional[int] = Query(None, ge=0, le=1, description="0 : disponibles, 1 : utilisés"),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Nombre de contenus par cible × type de prospect × semaine ISO × used
 
-        return results
+    Lu depuis la table de synthèse `content_stats`, tenue à jour à chaque
+    insertion et à chaque passage à `used = 1` : aucun parcours de
+    `generated_contents`.
+    """
+    try:
+        rows = await DBStatsRepository(db).get_stats(
+            cible=cible, prospect_type=prospect_type, start_date=start_date, end_date=end_date, used=used
+        )
+        return summarize(rows)
 
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Erreur lors de la génération de contenu hebdo : {str(e)}"
+            detail=f"Erreur lors du calcul des statistiques: {str(e)}"
         )
+
 @router.get("/getall-contents")
 async def get_all_contents(
     cible: Optional[str] = Query(None),
     prospect_type: Optional[str] = Query(None),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    limit: int = Query(100, le=1000),
+    limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Curseur `next_cursor` de la page précédente (remplace offset)"),
+    fields: Optional[str] = Query(None, description="Colonnes à retourner, séparées par des virgules (ex: id,cible,theme_hebdo)"),
+    count: CountModeEnum = Query(CountModeEnum.CACHED, description="Calcul du total : exact, cached, estimate ou none"),
+    db: DBSession = Depends(get_session)
 ):
     """Récupère tous les contenus avec pagination et filtres"""
+    selected_fields = None
+    if fields:
+        selected_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in selected_fields if field not in CONTENT_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Colonnes inconnues: {', '.join(unknown)} (disponibles: {', '.join(CONTENT_FIELDS)})"
+            )
+
     try:
         repository = DBContentRepository(db)
-        contents = await repository.get_all_content(
-            cible=cible,
-            prospect_type=prospect_type,
-            start_date=start_date,
-            end_date=end_date
-        )
+        filters = dict(cible=cible, prospect_type=prospect_type, start_date=start_date, end_date=end_date)
 
-        # Pagination
-        total = len(contents)
-        paginated_contents = contents[offset:offset + limit]
+        contents, next_cursor = await repository.get_content_page(
+            **filters,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+            fields=selected_fields
+        )
+        total = await repository.count_content(**filters, mode=count.value)
 
         return {
             "total": total,
             "limit": limit,
             "offset": offset,
+            "next_cursor": next_cursor,
             "contents": [
-                {
-                    "id": content.id,
-                    "cible": content.cible,
-                    "prospect_type": content.prospect_type,
-                    "generation_date": content.generation_date,
-                    "theme_general": content.theme_general,
-                    "theme_hebdo": content.theme_hebdo,
-                    "texte": content.texte,
-                    "used": content.used,
-                    "created_at": content.created_at
-                } for content in paginated_contents
+                {field: getattr(content, field) for field in (selected_fields or CONTENT_FIELDS)}
+                for content in contents
             ]
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erreur lors de la récupération: {str(e)}"
         )
 
-@router.get("/extract-excel")
-async def extract_content_to_excel(
-    cible: Optional[str] = Query(None, description="Filtrer par cible"),
-    prospect_type: Optional[str] = Query(None, description="Filtrer par type de prospect"),
-    start_date: Optional[date] = Query(None, description="Date de début"),
-    end_date: Optional[date] = Query(None, description="Date de fin"),
-    db: Session = Depends(get_db)
+@router.get("/contents/search")
+async def search_contents(
+    q: str = Query(..., min_length=2, description="Mots recherchés (\"expression exacte\", OR, -exclu)"),
+    cible: Optional[str] = Query(None),
+    prospect_type: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: DBSession = Depends(get_session)
 ):
     """
-    Exporte les contenus générés vers un fichier Excel
+    Recherche plein texte dans les contenus générés (thèmes et texte)
+
+    Sur PostgreSQL, la recherche utilise l'index GIN (configuration `french` :
+    pluriels et conjugaisons sont rapprochés) et les résultats sont triés par
+    pertinence (`rank`).
+    """
+    try:
+        rows = await DBContentRepository(db).search_content(
+            q, cible=cible, prospect_type=prospect_type, start_date=start_date, end_date=end_date, limit=limit
+        )
+        return {
+            "query": q,
+            "count": len(rows),
+            "contents": [{**{field: getattr(row, field) for field in CONTENT_FIELDS}, "rank": row.rank} for row in rows]
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la recherche: {str(e)}"
+        )
+
+@router.get("/contents/{content_id}/near-duplicates")
+async def get_near_duplicates(
+    content_id: int,
+    min_similarity: float = Query(NEAR_DUPLICATE_MIN_SIMILARITY, gt=0, le=1, description="Similarité minimale (Jaccard estimée)"),
+    limit: int = Query(10, ge=1, le=100),
+    db: DBSession = Depends(get_session)
+):
+    """Contenus quasi identiques à un contenu donné, du plus proche au moins proche"""
+    try:
+        matches = await DBContentRepository(db).find_near_duplicates_of(content_id, min_similarity, limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la recherche de quasi-doublons: {str(e)}"
+        )
+
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Contenu introuvable ou sans signature (voir --backfill)")
+    return {
+        "content_id": content_id,
+        "near_duplicates": [{"id": match_id, "similarity": round(score, 3)} for match_id, score in matches]
+    }
+
+@router.post("/contents/claim")
+async def claim_unused_contents(
+    claim: ContentClaimRequest,
+    db: DBSession = Depends(get_session)
+):
+    """
+    Réserve atomiquement des contenus non utilisés pour publication
+
+    - **cible** / **prospect_type**: Filtres optionnels
+    - **start_date** / **end_date**: Fenêtre de dates de génération
+    - **limit**: Nombre de contenus à réserver (1 à 100)
+
+    Les contenus retournés sont marqués `used = 1` dans la même instruction :
+    deux publieurs concurrents ne reçoivent jamais le même contenu.
     """
     try:
         repository = DBContentRepository(db)
+        rows = await repository.claim_unused_content(
+            cible=claim.cible.value if claim.cible else None,
+            prospect_type=claim.prospect_type.value if claim.prospect_type else None,
+            start_date=claim.start_date,
+            end_date=claim.end_date,
+            limit=claim.limit
+        )
+
+        return {
+            "claimed": len(rows),
+            "contents": [{field: getattr(row, field) for field in CONTENT_FIELDS} for row in rows]
+        }
 
-        # Récupérer les contenus avec filtres
-        contents = await repository.get_all_content(
-            cible=cible,
-            prospect_type=prospect_type,
-            start_date=start_date,
-            end_date=end_date
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la réservation: {str(e)}"
         )
 
-        if not contents:
+async def _export_contents(export_format: ExportFormatEnum, filters: dict) -> StreamingResponse:
+    """Export commun : mêmes filtres que get_all_content, quel que soit le format"""
+    filename = f"contenus_editoriaux_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format.value}"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+    if export_format in (ExportFormatEnum.CSV, ExportFormatEnum.NDJSON):
+        # Flux ligne à ligne depuis le curseur serveur ; le premier paquet est lu
+        # avant d'envoyer les en-têtes pour répondre 404 sans contenu, comme les autres formats
+        stream = ContentExportService.stream_rows(export_format, SessionLocal, EXPORT_CHUNK_SIZE, **filters)
+        first_chunk = await run_in_threadpool(next, stream, None)
+        if first_chunk is None:
             raise HTTPException(status_code=404, detail="Aucun contenu trouvé")
+        return StreamingResponse(
+            itertools.chain([first_chunk], stream),
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+            headers=headers
+        )
 
-        # Générer le fichier Excel
-        excel_file = ExcelExtractService.extract_to_excel(contents)
+    # Générer le fichier hors de la boucle d'événements
+    export_file, total = await run_in_threadpool(
+        ContentExportService.build_export, export_format, SessionLocal, EXPORT_CHUNK_SIZE, **filters
+    )
 
-        # Nom du fichier avec timestamp
-        filename = f"contenus_editoriaux_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    if total == 0:
+        export_file.close()
+        raise HTTPException(status_code=404, detail="Aucun contenu trouvé")
 
-        return StreamingResponse(
-            excel_file,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
+    return StreamingResponse(
+        ExcelExtractService.iter_file(export_file),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers=headers
+    )
+
+@router.get("/export")
+async def export_contents(
+    format: ExportFormatEnum = Query(ExportFormatEnum.XLSX, description="xlsx, csv, ndjson ou parquet"),
+    cible: Optional[str] = Query(None, description="Filtrer par cible"),
+    prospect_type: Optional[str] = Query(None, description="Filtrer par type de prospect"),
+    start_date: Optional[date] = Query(None, description="Date de début"),
+    end_date: Optional[date] = Query(None, description="Date de fin")
+):
+    """
+    Exporte les contenus générés au format demandé (404 si aucun contenu, quel que soit le format)
+
+    - **csv** / **ndjson** : envoyés ligne à ligne depuis le curseur de la base
+    - **parquet** : écrit par lots colonnes (nécessite pyarrow)
+    - **xlsx** : classeur avec une feuille par cible et des statistiques
+    """
+    try:
+        return await _export_contents(
+            format,
+            dict(cible=cible, prospect_type=prospect_type, start_date=start_date, end_date=end_date)
+        )
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de l'export {format.value}: {str(e)}"
+        )
+
+@router.get("/extract-excel")
+async def extract_content_to_excel(
+    cible: Optional[str] = Query(None, description="Filtrer par cible"),
+    prospect_type: Optional[str] = Query(None, description="Filtrer par type de prospect"),
+    start_date: Optional[date] = Query(None, description="Date de début"),
+    end_date: Optional[date] = Query(None, description="Date de fin")
+):
+    """
+    Exporte les contenus générés vers un fichier Excel
+
+    Équivalent de `/export?format=xlsx`.
+    """
+    try:
+        return await _export_contents(
+            ExportFormatEnum.XLSX,
+            dict(cible=cible, prospect_type=prospect_type, start_date=start_date, end_date=end_date)
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
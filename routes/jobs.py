@@ -0,0 +1,76 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from database.connexion import DBSession, get_session
+from models.schemas import GenerationJobRequest, GenerationJobStatus
+from repository.job_repo import DBJobRepository, job_weeks
+from services.generation_jobs import JOB_MAX_ITEMS, GenerationJobRunner, get_job_runner
+
+router = APIRouter(prefix="/api/v1/jobs", tags=["Generation Jobs"])
+
+@router.post("", response_model=GenerationJobStatus, status_code=202)
+async def create_generation_job(
+    job_request: GenerationJobRequest,
+    runner: GenerationJobRunner = Depends(get_job_runner),
+    db: DBSession = Depends(get_session)
+):
+    """
+    Lance une génération en masse en arrière-plan
+
+    - **start_date** / **end_date**: Semaines à couvrir
+    - **cibles**: Canaux (tous par défaut)
+    - **prospect_types**: Types de prospects (tous par défaut)
+
+    Retourne immédiatement l'identifiant du job à suivre via `GET /api/v1/jobs/{job_id}`.
+    """
+    total_items = (
+        len(job_weeks(job_request.start_date, job_request.end_date))
+        * len(set(job_request.cibles))
+        * len(set(job_request.prospect_types))
+    )
+    if total_items == 0:
+        raise HTTPException(status_code=422, detail="La matrice de génération est vide")
+    if total_items > JOB_MAX_ITEMS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Job trop volumineux : {total_items} générations (maximum {JOB_MAX_ITEMS})"
+        )
+
+    try:
+        repository = DBJobRepository(db)
+        job_id = await repository.create_job(job_request)
+        runner.submit(job_id)
+        return await repository.get_job_status(job_id)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la création du job: {str(e)}"
+        )
+
+@router.get("/{job_id}", response_model=GenerationJobStatus)
+async def get_generation_job(job_id: int, db: DBSession = Depends(get_session)):
+    """Progression d'un job de génération"""
+    status = await DBJobRepository(db).get_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return status
+
+@router.get("/{job_id}/results")
+async def get_generation_job_results(
+    job_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: DBSession = Depends(get_session)
+):
+    """Résultats (éventuellement partiels) et échecs d'un job"""
+    repository = DBJobRepository(db)
+    status = await repository.get_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+
+    return {
+        "job": status,
+        "limit": limit,
+        "offset": offset,
+        "results": await repository.get_job_results(job_id, limit, offset),
+        "failures": await repository.get_job_failures(job_id)
+    }
@@ -1,10 +1,27 @@
 from abc import ABC, abstractmethod
 import random
 from models.schemas import CibleEnum, ContentRequest, ContentResponse, ProspectTypeEnum
-from openai import OpenAI
-import json
-import os, re
+import openai
+from openai import AsyncOpenAI
+import os
+import time
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
+from services.openai_client import (
+    OPENAI_TIMEOUT,
+    build_async_openai_client,
+    get_async_openai_client,
+    get_openai_semaphore,
+)
+from services.metrics import CONTENT_FALLBACKS, record_stage, record_token_usage, timed, trace_stage
+from services.openai_resilience import CircuitOpenError, get_openai_caller
+from services.prompt_templates import get_prompt_registry
+from services.response_parser import (
+    OPENAI_STRUCTURED_OUTPUTS,
+    STRUCTURED_RESPONSE_FORMAT,
+    MalformedCompletionError,
+    parse_generated_fields,
+)
 
 load_dotenv()
 class ContentGeneratorInterface(ABC):
@@ -14,62 +31,175 @@ class ContentGeneratorInterface(ABC):
     async def generate_content(self, request: ContentRequest) -> ContentResponse:
         pass
 
+    def prompt_version_for(self, request: ContentRequest) -> str:
+        """Version du prompt utilisée pour cette requête (clé du cache de génération)"""
+        return getattr(self, "prompt_version", "")
+
+    def fallback_content(self, request: ContentRequest) -> ContentResponse:
+        """Contenu de secours en cas d'erreur de génération (`fallback` = True)"""
+        return ContentResponse(
+            theme_general=f"Contenu {request.cible.value} pour {request.prospect_type.value}",
+            theme_hebdo=f"Focus hebdomadaire du {request.date}",
+            texte=f"Contenu générique pour {request.cible.value} - {request.prospect_type.value}",
+            cible=request.cible.value,
+            prospect_type=request.prospect_type.value,
+            generation_date=request.date,
+            used=0,
+            fallback=True
+        )
+
 class OpenAIContentGenerator(ContentGeneratorInterface):
     """Générateur de contenu utilisant OpenAI (Single Responsibility)"""
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, client: Optional[AsyncOpenAI] = None, timeout: float = OPENAI_TIMEOUT):
         print("Initialisation du générateur de contenu OpenAI")
-        self.client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
+        # Le client HTTP est partagé : une clé explicite impose un client dédié
+        if client is not None:
+            self.client = client
+        elif api_key:
+            self.client = build_async_openai_client(api_key)
+        else:
+            self.client = get_async_openai_client()
+        self.timeout = timeout
+        self.model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        # Templates compilés une fois par processus ; la version suit leur contenu
+        self.prompts = get_prompt_registry()
+        # Reprises, limite de débit et disjoncteur partagés par le worker
+        self.caller = get_openai_caller()
+        # Les reprises du SDK sont désactivées : elles ignoreraient le limiteur partagé
+        self._chat_client = self.client.with_options(max_retries=0) if self.caller.enabled else self.client
 
+    @timed("generate_content")
     async def generate_content(self, request: ContentRequest) -> ContentResponse:
         """Génère du contenu éditorial via OpenAI"""
 
-        prompt = self._build_prompt(request)
-
         try:
             if not self.client.api_key:
                 raise ValueError("Clé API OpenAI non configurée")
 
-            response = self.client.chat.completions.create(
-                model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Tu es un expert en marketing digital et création de contenu éditorial. Réponds uniquement en JSON valide."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=500
-            )
+            with trace_stage("prompt_build"):
+                body = self.build_completion_body(request)
 
-            content_text = response.choices[0].message.content.strip()
-            # Nettoyage du texte pour enlever les balises de code
-            if content_text.startswith("```"):
-                content_text = re.sub(r"^```(?:json)?\s*", "", content_text)
-                content_text = re.sub(r"\s*```$", "", content_text)
-
-            content_json = json.loads(content_text)
-
-            return ContentResponse(
-                theme_general=content_json["theme_general"],
-                theme_hebdo=content_json["theme_hebdo"],
-                cible=request.cible.value,
-                prospect_type=request.prospect_type.value,
-                generation_date=request.date if isinstance(request.date, str) else request.date.isoformat(),
-                texte=content_json["texte"],
-                used=0
-            )
+            estimated_tokens = self._estimate_tokens(body)
+            raw = await self.caller.call(lambda: self._create_completion(body), estimated_tokens)
+            response = raw.parse()
+            record_token_usage(self.model, response.usage)
+            self.caller.limiter.record_usage(estimated_tokens, response.usage.total_tokens if response.usage else None)
+
+            message = response.choices[0].message
+            with trace_stage("json_parse"):
+                return self.parse_completion(request, message.content, message.refusal)
 
-        except json.JSONDecodeError as e:
-            print(f"Erreur JSON: {str(e)}")
-            return self._get_fallback_content(request)
+        except MalformedCompletionError as e:
+            print(str(e))
+            return self._fallback(request, "invalid_json")
+        except openai.RateLimitError as e:
+            print(f"Limite de débit OpenAI: {str(e)}")
+            return self._fallback(request, "rate_limited")
+        except CircuitOpenError as e:
+            print(str(e))
+            return self._fallback(request, "circuit_open")
         except Exception as e:
             print(f"Erreur OpenAI: {str(e)}")
-            return self._get_fallback_content(request)
+            return self._fallback(request, "openai_error")
+
+    async def stream_completion(self, request: ContentRequest) -> AsyncIterator[str]:
+        """Complétion en mode stream : retourne les deltas de texte au fil de l'eau"""
+        if not self.client.api_key:
+            raise ValueError("Clé API OpenAI non configurée")
+
+        with trace_stage("prompt_build"):
+            body = self.build_completion_body(request)
+
+        start = time.perf_counter()
+        # Le sémaphore reste pris pendant toute la lecture du flux
+        raw = await self.caller.call(
+            lambda: self._create_completion(body, stream=True, stream_options={"include_usage": True}),
+            self._estimate_tokens(body)
+        )
+        stream = None
+        try:
+            first_token = True
+            with trace_stage("openai_stream"):
+                stream = raw.parse()
+                async for chunk in stream:
+                    # Le dernier chunk ne porte que l'usage
+                    if chunk.usage is not None:
+                        record_token_usage(self.model, chunk.usage)
+                    if not chunk.choices:
+                        continue
+                    text = chunk.choices[0].delta.content
+                    if text:
+                        if first_token:
+                            record_stage("openai_first_token", time.perf_counter() - start)
+                            first_token = False
+                        yield text
+        finally:
+            # Ferme la connexion si le client a abandonné le flux en cours de route
+            if stream is not None:
+                await stream.close()
+            get_openai_semaphore().release()
+
+    async def _create_completion(self, body: dict, **options):
+        """Une tentative d'appel, bornée par le sémaphore ; retourne la réponse brute (en-têtes inclus)"""
+        semaphore = get_openai_semaphore()
+        with trace_stage("openai_queue"):
+            await semaphore.acquire()
+        try:
+            with trace_stage("openai_call"):
+                raw = await self._chat_client.chat.completions.with_raw_response.create(
+                    **body, **options, timeout=self.timeout
+                )
+        except BaseException:
+            semaphore.release()
+            raise
+        if not options.get("stream"):
+            semaphore.release()
+        return raw
+
+    @staticmethod
+    def _estimate_tokens(body: dict) -> int:
+        """Estimation grossière (≈ 4 caractères par token) réservée sur le seau tokens/minute"""
+        prompt_chars = sum(len(message["content"]) for message in body["messages"])
+        return prompt_chars // 4 + body.get("max_tokens", 0)
+
+    def _fallback(self, request: ContentRequest, reason: str) -> ContentResponse:
+        CONTENT_FALLBACKS.inc(reason=reason)
+        with trace_stage("fallback"):
+            return self.fallback_content(request)
+
+    def prompt_version_for(self, request: ContentRequest) -> str:
+        return self.prompts.version_for(request)
+
+    def build_completion_body(self, request: ContentRequest) -> dict:
+        """Corps de la requête chat.completions (partagé avec le mode batch)"""
+        messages, _ = self.prompts.render(request)
+        body = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.7,
+            "max_tokens": 500
+        }
+        if OPENAI_STRUCTURED_OUTPUTS:
+            body["response_format"] = STRUCTURED_RESPONSE_FORMAT
+        return body
+
+    def parse_completion(self, request: ContentRequest, content_text: Optional[str],
+                         refusal: Optional[str] = None) -> ContentResponse:
+        """Convertit la réponse brute du modèle en ContentResponse (MalformedCompletionError si invalide)"""
+        fields = parse_generated_fields(content_text, refusal)
+
+        return ContentResponse(
+            theme_general=fields.theme_general,
+            theme_hebdo=fields.theme_hebdo,
+            cible=request.cible,
+            prospect_type=request.prospect_type,
+            generation_date=request.date,
+            texte=fields.texte,
+            used=0,
+            model=self.model,
+            prompt_version=self.prompt_version_for(request)
+        )
 
     # def _build_prompt(self, request: ContentRequest) -> str:
     #     """Construit le prompt pour OpenAI"""
@@ -89,52 +219,18 @@ class OpenAIContentGenerator(ContentGeneratorInterface):
     # Le contenu doit être pertinent pour {request.prospect_type.value} sur {request.cible.value}.
     # """
     def _build_prompt(self, request: ContentRequest) -> str:
-        """Construit le prompt pour OpenAI avec détection automatique du contexte local + tendances populaires"""
-        return f"""
-      Tu es un expert en marketing digital, en communication éditoriale et en veille contextuelle mondiale et locale.
-
-      Ta mission est de générer un contenu éditorial pour :
-      - Cible : {request.cible.value}
-      - Type de prospect : {request.prospect_type.value}
-      - Date de référence : {request.date}
-
-      Tu dois détecter automatiquement :
-      - le **contexte local** (pays ou région d’où l’API semble utilisée),
-      - et/ou les **tendances populaires au niveau mondial** à ce moment-là.
-
-      Le `theme_hebdo` doit refléter **un fait marquant** ou **un sujet populaire cette semaine-là**, comme :
-      - une fête ou journée spéciale (locale ou internationale),
-      - une actualité virale ou buzz sur les réseaux sociaux,
-      - une tendance dans la culture, la tech, l’économie ou l’environnement.
-
-      Ta réponse doit être un **JSON strictement valide** contenant :
-      {{
-        "theme_general": "ligne éditoriale principale adaptée à {request.cible.value}",
-        "theme_hebdo": "focus éditorial spécifique pour la semaine du {request.date}, basé sur un contexte local ou une tendance populaire actuelle",
-        "texte": "contenu à publier, engageant et adapté à un public {request.prospect_type.value} sur {request.cible.value}"
-      }}
-
-      ⚠️ Réponds uniquement avec ce JSON. N’invente aucun fait. Si rien de pertinent n’existe, propose un thème intemporel ou inspirant.
-      """
-    def _get_fallback_content(self, request: ContentRequest) -> ContentResponse:
-        """Contenu de secours en cas d'erreur OpenAI"""
-        return ContentResponse(
-            theme_general=f"Contenu {request.cible.value} pour {request.prospect_type.value}",
-            theme_hebdo=f"Focus hebdomadaire du {request.date}",
-            texte=f"Contenu générique pour {request.cible.value} - {request.prospect_type.value}",
-            used=0
-        )
-    def generate_for_request(self, request: ContentRequest) -> dict:
-        prompt = self._build_prompt(request)
-        response = self.client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-        )
-        result = response.choices[0].message.content
-        return eval(result)  # ou json.loads si le JSON est sûr
+        """Prompt utilisateur rendu depuis les templates de `prompts/`"""
+        messages, _ = self.prompts.render(request)
+        return messages[-1]["content"]
+
+    async def generate_for_request(self, request: ContentRequest) -> dict:
+        body = self.build_completion_body(request)
+        async with get_openai_semaphore():
+            response = await self.client.chat.completions.create(**body, timeout=self.timeout)
+        message = response.choices[0].message
+        return parse_generated_fields(message.content, message.refusal).model_dump()
 
-    def generate_for_all_targets(self, date_: str):
+    async def generate_for_all_targets(self, date_: str):
         results = []
         for cible in CibleEnum:
             prospect_type = random.choice(list(ProspectTypeEnum))
@@ -143,7 +239,7 @@ class OpenAIContentGenerator(ContentGeneratorInterface):
                 prospect_type=prospect_type,
                 date=request.date if isinstance(request.date, str) else date_.isoformat()
             )
-            result_data = self.generate_for_request(request)
+            result_data = await self.generate_for_request(request)
             db_obj = ContentResponse(
                 cible=cible.value,
                 prospect_type=prospect_type.value,
@@ -161,7 +257,7 @@ class ContentGeneratorFactory:
 
     @staticmethod
     def create_generator(generator_type: str = "openai") -> ContentGeneratorInterface:
-        if generator_type == "openai":
-            return OpenAIContentGenerator()
-        else:
-            raise ValueError(f"Type de générateur non supporté: {generator_type}")
+        """Instance partagée du registre : `openai`, `template`, `router` ou backend enregistré"""
+        from services.generator_registry import get_generator_registry
+
+        return get_generator_registry().get(generator_type)
@@ -0,0 +1,160 @@
+import csv
+import io
+import itertools
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from typing import IO, Callable, Iterable, Iterator, Tuple
+
+from sqlalchemy.orm import Session
+
+from models.schemas import ExportFormatEnum
+from repository.conn_repo import CONTENT_FIELDS, DBContentRepository
+from services.excel_extract import EXCEL_SPOOL_MAX_SIZE, ExcelExtractService
+
+# Lignes par écriture (CSV / NDJSON) et par row group (Parquet)
+EXPORT_FLUSH_ROWS = int(os.getenv("EXPORT_FLUSH_ROWS", "500"))
+PARQUET_BATCH_SIZE = int(os.getenv("PARQUET_BATCH_SIZE", "10000"))
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormatEnum.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ExportFormatEnum.CSV: "text/csv; charset=utf-8",
+    ExportFormatEnum.NDJSON: "application/x-ndjson",
+    ExportFormatEnum.PARQUET: "application/vnd.apache.parquet",
+}
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class ContentExportService:
+    """Export des contenus en CSV, NDJSON, Parquet ou Excel (Single Responsibility)"""
+
+    @staticmethod
+    def iter_csv(rows: Iterable) -> Iterator[bytes]:
+        """CSV ligne à ligne, envoyé par paquets de EXPORT_FLUSH_ROWS lignes"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM pour qu'Excel détecte l'UTF-8
+        buffer.write("\ufeff")
+        writer.writerow(CONTENT_FIELDS)
+
+        for count, row in enumerate(rows, start=1):
+            writer.writerow([_json_value(value) for value in row])
+            if count % EXPORT_FLUSH_ROWS == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def iter_ndjson(rows: Iterable) -> Iterator[bytes]:
+        """Un objet JSON par ligne"""
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(
+                {field: _json_value(value) for field, value in zip(CONTENT_FIELDS, row)},
+                ensure_ascii=False
+            ))
+            if len(lines) >= EXPORT_FLUSH_ROWS:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    @staticmethod
+    def write_parquet(rows: Iterable, output: IO[bytes], batch_size: int = PARQUET_BATCH_SIZE) -> int:
+        """Écrit les lignes par row groups de `batch_size` (dépendance optionnelle pyarrow)"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("L'export Parquet nécessite le paquet optionnel pyarrow (pip install pyarrow)")
+
+        schema = pa.schema([
+            ("id", pa.int64()),
+            ("cible", pa.string()),
+            ("prospect_type", pa.string()),
+            ("generation_date", pa.timestamp("us")),
+            ("theme_general", pa.string()),
+            ("theme_hebdo", pa.string()),
+            ("texte", pa.string()),
+            ("used", pa.int32()),
+            ("created_at", pa.timestamp("us")),
+        ])
+
+        total = 0
+        columns = [[] for _ in CONTENT_FIELDS]
+        with pq.ParquetWriter(output, schema, compression="zstd") as writer:
+            for row in rows:
+                for column, value in zip(columns, row):
+                    column.append(value)
+                total += 1
+                if len(columns[0]) >= batch_size:
+                    writer.write_batch(pa.record_batch(columns, schema=schema))
+                    columns = [[] for _ in CONTENT_FIELDS]
+            if columns[0]:
+                writer.write_batch(pa.record_batch(columns, schema=schema))
+        return total
+
+    @staticmethod
+    def build_file(export_format: ExportFormatEnum, rows: Iterable) -> Tuple[IO[bytes], int]:
+        """Formats non streamables (fichier complet requis) : xlsx et parquet"""
+        if export_format == ExportFormatEnum.XLSX:
+            return ExcelExtractService.build_excel_file(rows)
+
+        output = tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_MAX_SIZE)
+        try:
+            total = ContentExportService.write_parquet(rows, output)
+        except Exception:
+            output.close()
+            raise
+        output.seek(0)
+        return output, total
+
+    @staticmethod
+    def build_export(export_format: ExportFormatEnum,
+                     session_factory: Callable[[], Session],
+                     chunk_size: int,
+                     **filters) -> Tuple[IO[bytes], int]:
+        """Lit les lignes avec une session synchrone dédiée et construit le fichier"""
+        db = session_factory()
+        try:
+            rows = DBContentRepository(db).stream_content(**filters, chunk_size=chunk_size)
+            return ContentExportService.build_file(export_format, rows)
+        finally:
+            db.close()
+
+    @staticmethod
+    def stream_rows(export_format: ExportFormatEnum,
+                    session_factory: Callable[[], Session],
+                    chunk_size: int,
+                    **filters) -> Iterator[bytes]:
+        """
+        Flux CSV / NDJSON lu directement depuis le curseur serveur.
+
+        La session est ouverte par le générateur lui-même : elle doit survivre
+        à la fin de la route, pendant l'envoi de la réponse. Sans aucun contenu,
+        le flux est vide (pas même l'en-tête CSV) : la route répond alors 404,
+        comme pour xlsx et Parquet.
+        """
+        db = session_factory()
+        try:
+            rows = iter(DBContentRepository(db).stream_content(**filters, chunk_size=chunk_size))
+            first = next(rows, None)
+            if first is None:
+                return
+            rows = itertools.chain([first], rows)
+            if export_format == ExportFormatEnum.CSV:
+                yield from ContentExportService.iter_csv(rows)
+            else:
+                yield from ContentExportService.iter_ndjson(rows)
+        finally:
+            db.close()
@@ -0,0 +1,263 @@
+"""
+Stock de contenus pré-générés par (cible, prospect_type, semaine).
+
+Un planificateur asyncio, lancé dans chaque réplica mais actif seulement sur le
+leader (verrou consultatif PostgreSQL), maintient CONTENT_POOL_TARGET contenus
+non utilisés pour chaque combinaison de la semaine courante et des
+CONTENT_POOL_WEEKS_AHEAD suivantes. Les manquants sont générés et sauvegardés
+comme un lot hebdomadaire (`generate_batch` + `save_many`), marqués
+`source = POOL_SOURCE`.
+
+/generate-content réserve alors un contenu du stock (un UPDATE ... SKIP LOCKED)
+au lieu d'appeler OpenAI, et ne génère qu'en cas de stock vide. Seules les
+lignes du stock sont réservées et comptées : les contenus de secours et les
+générations à la demande restent aux publieurs (/contents/claim).
+
+Remplissage ponctuel (cron, déploiement) :
+    python -m services.content_pool --refill
+"""
+import argparse
+import asyncio
+import json
+import os
+from datetime import date, timedelta
+from typing import AsyncContextManager, Callable, Dict, List, Optional, Tuple
+
+from database.connexion import DBSession, session_scope
+from database.models import POOL_SOURCE
+from models.schemas import CibleEnum, ContentRequest, ContentResponse, ProspectTypeEnum
+from repository.conn_repo import DBContentRepository
+from repository.stats_repo import week_start
+from services.content_ai import ContentGeneratorInterface, ContentGeneratorFactory
+from services.editorial_batch import generate_batch
+from services.generator_registry import CONTENT_GENERATOR
+from services.leader_lock import AdvisoryLeaderLock
+from services.metrics import REGISTRY, Counter, GaugeCallback
+from services.near_duplicates import DeduplicatingContentGenerator
+
+# Configuration du stock de contenus pré-générés
+CONTENT_POOL_ENABLED = os.getenv("CONTENT_POOL_ENABLED", "false").lower() in ("1", "true", "yes")
+CONTENT_POOL_TARGET = int(os.getenv("CONTENT_POOL_TARGET", "3"))
+CONTENT_POOL_WEEKS_AHEAD = int(os.getenv("CONTENT_POOL_WEEKS_AHEAD", "1"))
+CONTENT_POOL_INTERVAL = float(os.getenv("CONTENT_POOL_INTERVAL", "300"))
+# Générations au plus par passage (borne le coût d'un premier remplissage)
+CONTENT_POOL_MAX_PER_RUN = int(os.getenv("CONTENT_POOL_MAX_PER_RUN", "50"))
+CONTENT_POOL_MAX_PARALLELISM = int(os.getenv("CONTENT_POOL_MAX_PARALLELISM", "5"))
+
+CONTENT_POOL_LOCK_NAME = "content_pool_scheduler"
+
+# hit : contenu servi depuis le stock ; miss : stock vide, génération à la demande
+POOL_FETCHES = REGISTRY.register(Counter(
+    "content_pool_fetch_total", "Requêtes /generate-content servies par le stock, par résultat", ("outcome",)
+))
+POOL_GENERATED = REGISTRY.register(Counter(
+    "content_pool_generated_total", "Contenus générés pour le stock", ("cible",)
+))
+
+PoolKey = Tuple[str, str, date]
+
+
+def pool_weeks(today: date, weeks_ahead: int = CONTENT_POOL_WEEKS_AHEAD) -> List[date]:
+    """Lundis de la semaine courante et des `weeks_ahead` suivantes"""
+    monday = week_start(today)
+    return [monday + timedelta(weeks=offset) for offset in range(weeks_ahead + 1)]
+
+
+async def fetch_from_pool(repository: DBContentRepository, request: ContentRequest) -> Optional[ContentResponse]:
+    """Réserve un contenu du stock pour la semaine de la requête (used = 1), ou None"""
+    monday = week_start(request.date)
+    rows = await repository.claim_unused_content(
+        cible=request.cible.value,
+        prospect_type=request.prospect_type.value,
+        start_date=monday,
+        end_date=monday + timedelta(days=6),
+        limit=1,
+        source=POOL_SOURCE
+    )
+    if not rows:
+        POOL_FETCHES.inc(outcome="miss")
+        return None
+
+    POOL_FETCHES.inc(outcome="hit")
+    row = rows[0]
+    return ContentResponse(
+        theme_general=row.theme_general,
+        theme_hebdo=row.theme_hebdo,
+        texte=row.texte,
+        cible=row.cible,
+        prospect_type=row.prospect_type,
+        generation_date=row.generation_date.date(),
+        used=row.used,
+        model=row.model,
+        prompt_version=row.prompt_version
+    )
+
+
+class ContentPoolScheduler:
+    """Maintient le stock de contenus non utilisés à son niveau cible (Single Responsibility)"""
+
+    def __init__(
+        self,
+        session_scope: Callable[[], AsyncContextManager[DBSession]] = session_scope,
+        generator: Optional[ContentGeneratorInterface] = None,
+        target: int = CONTENT_POOL_TARGET,
+        weeks_ahead: int = CONTENT_POOL_WEEKS_AHEAD,
+        interval: float = CONTENT_POOL_INTERVAL,
+        max_per_run: int = CONTENT_POOL_MAX_PER_RUN,
+        max_parallelism: int = CONTENT_POOL_MAX_PARALLELISM,
+        leader_lock: Optional[AdvisoryLeaderLock] = None
+    ):
+        self.session_scope = session_scope
+        self._generator = generator
+        self.target = target
+        self.weeks_ahead = weeks_ahead
+        self.interval = interval
+        self.max_per_run = max_per_run
+        self.max_parallelism = max_parallelism
+        self.leader_lock = leader_lock or AdvisoryLeaderLock(CONTENT_POOL_LOCK_NAME)
+        self._task: Optional[asyncio.Task] = None
+        self.last_levels: Dict[PoolKey, int] = {}
+
+    @property
+    def generator(self) -> ContentGeneratorInterface:
+        if self._generator is None:
+            # Pas de cache de génération : chaque contenu du stock doit être différent
+            self._generator = DeduplicatingContentGenerator(
+                ContentGeneratorFactory.create_generator(CONTENT_GENERATOR), self.session_scope
+            )
+        return self._generator
+
+    async def pool_levels(self, today: date) -> Dict[PoolKey, int]:
+        """Contenus du stock non utilisés par (cible, prospect_type, semaine), zéros compris"""
+        weeks = pool_weeks(today, self.weeks_ahead)
+        async with self.session_scope() as db:
+            # Index partiel ix_generated_contents_pool : au plus `target` lignes par combinaison
+            rows = await DBContentRepository(db).count_unused_content(
+                start_date=weeks[0], end_date=weeks[-1] + timedelta(days=7), source=POOL_SOURCE
+            )
+
+        levels = {
+            (cible.value, prospect_type.value, week): 0
+            for week in weeks for cible in CibleEnum for prospect_type in ProspectTypeEnum
+        }
+        for cible, prospect_type, generation_date, count in rows:
+            key = (cible, prospect_type, week_start(generation_date))
+            if key in levels:
+                levels[key] += count
+        return levels
+
+    def build_requests(self, levels: Dict[PoolKey, int]) -> List[ContentRequest]:
+        """Requêtes des contenus manquants, semaines les plus proches d'abord"""
+        missing = sorted(
+            (week, cible, prospect_type, self.target - count)
+            for (cible, prospect_type, week), count in levels.items() if count < self.target
+        )
+        requests = []
+        # Une génération par combinaison et par tour : le stock se remplit uniformément
+        while missing and len(requests) < self.max_per_run:
+            remaining = []
+            for week, cible, prospect_type, deficit in missing:
+                if len(requests) >= self.max_per_run:
+                    break
+                requests.append(ContentRequest(cible=cible, prospect_type=prospect_type, date=week))
+                if deficit > 1:
+                    remaining.append((week, cible, prospect_type, deficit - 1))
+            missing = remaining
+        return requests
+
+    async def refill(self, today: Optional[date] = None) -> int:
+        """Un passage de remplissage ; retourne le nombre de contenus ajoutés"""
+        self.last_levels = await self.pool_levels(today or date.today())
+        requests = self.build_requests(self.last_levels)
+        if not requests:
+            return 0
+
+        results = await generate_batch(self.generator, requests, self.max_parallelism)
+        # Un contenu de secours ne doit pas être servi depuis le stock
+        results = [(content, request) for content, request in results if not content.fallback]
+        if not results:
+            return 0
+
+        async with self.session_scope() as db:
+            await DBContentRepository(db).save_many(results, source=POOL_SOURCE)
+        for _, request in results:
+            POOL_GENERATED.inc(cible=request.cible.value)
+            key = (request.cible.value, request.prospect_type.value, week_start(request.date))
+            self.last_levels[key] = self.last_levels.get(key, 0) + 1
+        return len(results)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if await self.leader_lock.acquire():
+                    added = await self.refill()
+                    if added:
+                        print(f"Stock de contenus : {added} contenus générés")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erreur remplissage du stock de contenus: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def shutdown(self) -> None:
+        """Arrête le planificateur et libère le leadership pour un autre réplica"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.leader_lock.release()
+
+
+_pool_scheduler: Optional[ContentPoolScheduler] = None
+
+
+def get_pool_scheduler() -> ContentPoolScheduler:
+    """Planificateur partagé par tout le processus"""
+    global _pool_scheduler
+    if _pool_scheduler is None:
+        _pool_scheduler = ContentPoolScheduler()
+    return _pool_scheduler
+
+
+def _collect_pool_levels():
+    if _pool_scheduler is None:
+        return
+    yield ("leader",), int(_pool_scheduler.leader_lock.is_leader)
+    if _pool_scheduler.last_levels:
+        yield ("min_unused",), min(_pool_scheduler.last_levels.values())
+        yield ("total_unused",), sum(_pool_scheduler.last_levels.values())
+
+
+REGISTRY.register(GaugeCallback(
+    "content_pool", "Leadership et niveau du stock de contenus (dernier passage)", ("field",), _collect_pool_levels
+))
+
+
+async def _main(args) -> None:
+    scheduler = ContentPoolScheduler(target=args.target or CONTENT_POOL_TARGET)
+    # Même verrou que les réplicas : pas de remplissage concurrent du leader
+    if not await scheduler.leader_lock.acquire():
+        print(json.dumps({"generated": 0, "leader": False}))
+        return
+    try:
+        added = await scheduler.refill()
+    finally:
+        await scheduler.leader_lock.release()
+    print(json.dumps({
+        "generated": added,
+        "min_unused": min(scheduler.last_levels.values()) if scheduler.last_levels else 0,
+    }))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stock de contenus pré-générés")
+    parser.add_argument("--refill", action="store_true", help="Lancer un passage de remplissage")
+    parser.add_argument("--target", type=int, default=None, help="Contenus non utilisés visés par combinaison")
+    args = parser.parse_args()
+    if not args.refill:
+        parser.error("--refill est requis")
+    asyncio.run(_main(args))
@@ -0,0 +1,61 @@
+"""
+Statistiques servies depuis la table de synthèse `content_stats`.
+
+Reconstruction (base existante ou écriture faite hors des repositories) :
+    python -m services.content_stats --rebuild
+"""
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+from database.connexion import session_scope
+from repository.stats_repo import DBStatsRepository
+
+
+def summarize(rows: List) -> Dict:
+    """Lignes détaillées et totaux par cible, type de prospect et état"""
+    by_cible: Dict[str, int] = defaultdict(int)
+    by_prospect_type: Dict[str, int] = defaultdict(int)
+    used = unused = 0
+    for row in rows:
+        by_cible[row.cible] += row.count
+        by_prospect_type[row.prospect_type] += row.count
+        if row.used:
+            used += row.count
+        else:
+            unused += row.count
+
+    return {
+        "total": used + unused,
+        "used": used,
+        "unused": unused,
+        "by_cible": dict(by_cible),
+        "by_prospect_type": dict(by_prospect_type),
+        "rows": [
+            {
+                "cible": row.cible,
+                "prospect_type": row.prospect_type,
+                "week_start": row.week_start.isoformat(),
+                "used": row.used,
+                "count": row.count,
+            }
+            for row in rows
+        ],
+    }
+
+
+async def _main(args) -> None:
+    async with session_scope() as db:
+        total = await DBStatsRepository(db).rebuild()
+    print(json.dumps({"rebuilt_rows": total}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Table de synthèse des statistiques de contenus")
+    parser.add_argument("--rebuild", action="store_true", help="Recalculer content_stats depuis generated_contents")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.error("--rebuild est requis")
+    asyncio.run(_main(args))
@@ -0,0 +1,293 @@
+"""
+Génération en flux (Server-Sent Events).
+
+Les deltas de `chat.completions` en mode `stream=True` alimentent un parseur
+JSON incrémental : le texte de chaque champ est relayé au fur et à mesure puis
+le champ complet est émis dès que sa chaîne se ferme. À la fin du flux, le
+`ContentResponse` assemblé passe par le même chemin que `/generate-content`
+(quasi-doublons, génération partagée, cache) puis est sauvegardé.
+"""
+import asyncio
+import json
+from typing import AsyncContextManager, AsyncIterator, Callable, List, Optional, Tuple
+
+from database.connexion import DBSession, session_scope
+from models.schemas import ContentRequest, ContentResponse
+from repository.conn_repo import DBContentRepository
+from services.content_ai import ContentGeneratorInterface, OpenAIContentGenerator
+from services.generation_cache import CachedContentGenerator, get_generation_cache
+from services.metrics import CONTENT_FALLBACKS
+from services.near_duplicates import DeduplicatingContentGenerator
+
+STREAMED_FIELDS = ("theme_general", "theme_hebdo", "texte")
+
+# États du parseur
+_BEFORE_OBJECT, _EXPECT_KEY, _IN_KEY, _EXPECT_COLON, _EXPECT_VALUE, _IN_STRING, _IN_OTHER, _DONE = range(8)
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class IncrementalJSONFieldParser:
+    """
+    Parseur JSON incrémental des champs texte de premier niveau (Single Responsibility)
+
+    `feed(chunk)` retourne une liste d'événements :
+    - ("delta", champ, texte) : nouveau texte décodé pour le champ en cours ;
+    - ("field", champ, valeur) : champ complet.
+
+    Tout ce qui précède la première accolade (balises ``` comprises) est ignoré,
+    de même que les valeurs non textuelles.
+    """
+
+    def __init__(self, fields: Tuple[str, ...] = STREAMED_FIELDS):
+        self.fields = fields
+        self.values = {}
+        self._state = _BEFORE_OBJECT
+        self._key: List[str] = []
+        self._current_key: Optional[str] = None
+        self._raw: List[str] = []
+        self._escape: Optional[str] = None
+        self._high_surrogate: Optional[str] = None
+        # Valeurs non textuelles : profondeur d'imbrication et chaîne en cours
+        self._depth = 0
+        self._other_in_string = False
+        self._other_escape = False
+
+    @property
+    def complete(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, str]]:
+        events: List[Tuple[str, str, str]] = []
+        delta: List[str] = []
+
+        for char in chunk:
+            state = self._state
+
+            if state == _IN_STRING:
+                if self._escape is not None:
+                    self._raw.append(char)
+                    decoded = self._consume_escape(char)
+                    if decoded:
+                        delta.append(decoded)
+                elif char == "\\":
+                    self._raw.append(char)
+                    self._escape = ""
+                elif char == '"':
+                    if delta:
+                        events.append(("delta", self._current_key, "".join(delta)))
+                        delta = []
+                    self._finish_string(events)
+                else:
+                    self._raw.append(char)
+                    delta.append(char)
+
+            elif state == _BEFORE_OBJECT:
+                if char == "{":
+                    self._state = _EXPECT_KEY
+
+            elif state == _EXPECT_KEY:
+                if char == '"':
+                    self._key = []
+                    self._state = _IN_KEY
+                elif char == "}":
+                    self._state = _DONE
+
+            elif state == _IN_KEY:
+                if self._escape is not None:
+                    self._key.append(char)
+                    self._escape = None
+                elif char == "\\":
+                    self._key.append(char)
+                    self._escape = ""
+                elif char == '"':
+                    self._current_key = json.loads('"' + "".join(self._key) + '"')
+                    self._state = _EXPECT_COLON
+                else:
+                    self._key.append(char)
+
+            elif state == _EXPECT_COLON:
+                if char == ":":
+                    self._state = _EXPECT_VALUE
+
+            elif state == _EXPECT_VALUE:
+                if char == '"':
+                    self._raw = []
+                    self._state = _IN_STRING
+                elif not char.isspace():
+                    self._depth = 0
+                    self._other_in_string = False
+                    self._state = _IN_OTHER
+                    self._consume_other(char)
+
+            elif state == _IN_OTHER:
+                self._consume_other(char)
+
+        if delta and self._state == _IN_STRING:
+            events.append(("delta", self._current_key, "".join(delta)))
+
+        # Seuls les champs attendus sont relayés
+        return [event for event in events if event[1] in self.fields]
+
+    def _consume_escape(self, char: str) -> str:
+        """Décode une séquence d'échappement ; retourne le texte prêt à émettre"""
+        if self._escape == "":
+            if char != "u":
+                self._escape = None
+                return _ESCAPES.get(char, char)
+            self._escape = "u"
+            return ""
+
+        self._escape += char
+        if len(self._escape) < 5:
+            return ""
+
+        code_unit = chr(int(self._escape[1:], 16))
+        self._escape = None
+        # Les paires de substitution arrivent en deux séquences \uXXXX
+        if "\ud800" <= code_unit <= "\udbff":
+            self._high_surrogate = code_unit
+            return ""
+        if self._high_surrogate is not None and "\udc00" <= code_unit <= "\udfff":
+            pair = (self._high_surrogate + code_unit).encode("utf-16", "surrogatepass").decode("utf-16")
+            self._high_surrogate = None
+            return pair
+        return code_unit
+
+    def _finish_string(self, events: List[Tuple[str, str, str]]) -> None:
+        value = json.loads('"' + "".join(self._raw) + '"')
+        self.values[self._current_key] = value
+        events.append(("field", self._current_key, value))
+        self._raw = []
+        self._high_surrogate = None
+        self._state = _EXPECT_KEY
+
+    def _consume_other(self, char: str) -> None:
+        """Ignore un nombre, un booléen ou une valeur imbriquée"""
+        if self._other_in_string:
+            if self._other_escape:
+                self._other_escape = False
+            elif char == "\\":
+                self._other_escape = True
+            elif char == '"':
+                self._other_in_string = False
+        elif char == '"':
+            self._other_in_string = True
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            if self._depth == 0:
+                # Accolade fermante de l'objet principal
+                self._state = _DONE
+            else:
+                self._depth -= 1
+        elif char == "," and self._depth == 0:
+            self._state = _EXPECT_KEY
+
+
+def sse_event(event: str, data) -> bytes:
+    """Formate un événement Server-Sent Events (données JSON sur une ligne)"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n".encode("utf-8")
+
+
+class StreamingRelayGenerator(ContentGeneratorInterface):
+    """
+    Générateur qui relaie les événements de la complétion en flux (Adapter)
+
+    Placé sous DeduplicatingContentGenerator et CachedContentGenerator : la
+    génération en flux est partagée et vérifiée comme celle de
+    /generate-content. Seul le premier appel est diffusé ; une régénération
+    (quasi-doublon) passe par la complétion classique.
+    """
+
+    def __init__(self, generator: OpenAIContentGenerator, events: "asyncio.Queue[Optional[bytes]]"):
+        self.generator = generator
+        self.events = events
+        # Même clé de cache que /generate-content
+        self.model = generator.model
+        self._streamed = False
+
+    def prompt_version_for(self, request: ContentRequest) -> str:
+        return self.generator.prompt_version_for(request)
+
+    def fallback_content(self, request: ContentRequest) -> ContentResponse:
+        return self.generator.fallback_content(request)
+
+    async def generate_content(self, request: ContentRequest) -> ContentResponse:
+        if self._streamed:
+            return await self.generator.generate_content(request)
+        self._streamed = True
+
+        parser = IncrementalJSONFieldParser()
+        chunks: List[str] = []
+        try:
+            async for text in self.generator.stream_completion(request):
+                chunks.append(text)
+                for event, field, value in parser.feed(text):
+                    self.events.put_nowait(
+                        sse_event(event, {"field": field, ("text" if event == "delta" else "value"): value})
+                    )
+            return self.generator.parse_completion(request, "".join(chunks))
+        except Exception as e:
+            print(f"Erreur génération en flux: {str(e)}")
+            CONTENT_FALLBACKS.inc(reason="stream_error")
+            self.events.put_nowait(sse_event("error", {"detail": str(e)}))
+            return self.fallback_content(request)
+
+
+async def stream_generation(
+    generator: OpenAIContentGenerator,
+    request: ContentRequest,
+    session_scope: Callable[[], AsyncContextManager[DBSession]] = session_scope
+) -> AsyncIterator[bytes]:
+    """
+    Flux SSE d'une génération : `delta` et `field` pendant la complétion, puis
+    `done` avec le contenu sauvegardé (ou `error` suivi du contenu de secours).
+
+    Une requête identique déjà en cours (flux ou /generate-content) ou en
+    cache est partagée : seuls les `field` puis `done` sont émis, avec `id`
+    null (aucune nouvelle ligne). Après un quasi-doublon, `done` porte le
+    contenu régénéré. Comme pour /generate-content, la génération partagée
+    continue si le client se déconnecte. Les sessions sont ouvertes par la
+    génération : elle survit à la fermeture des dépendances de la route.
+    """
+    events: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+    saved_ids: List[int] = []
+
+    async def persist(content: ContentResponse, request: ContentRequest) -> None:
+        try:
+            async with session_scope() as db:
+                saved_ids.extend(await DBContentRepository(db).save_many([(content, request)]))
+        except Exception as e:
+            print(f"Erreur sauvegarde génération en flux: {str(e)}")
+
+    relay = StreamingRelayGenerator(generator, events)
+    cached_generator = CachedContentGenerator(
+        DeduplicatingContentGenerator(relay, session_scope), get_generation_cache(), persist=persist
+    )
+    generation = asyncio.ensure_future(cached_generator.generate_with_cache(request))
+    # Fin des événements relayés (génération terminée, partagée ou servie par le cache)
+    generation.add_done_callback(lambda _: events.put_nowait(None))
+
+    try:
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+
+        try:
+            content, shared = generation.result()
+        except Exception as e:
+            print(f"Erreur génération en flux: {str(e)}")
+            CONTENT_FALLBACKS.inc(reason="stream_error")
+            yield sse_event("error", {"detail": str(e)})
+            content, shared = generator.fallback_content(request), False
+    finally:
+        # Client déconnecté : la génération partagée (protégée par shield) continue
+        generation.cancel()
+
+    if shared:
+        for field in STREAMED_FIELDS:
+            yield sse_event("field", {"field": field, "value": getattr(content, field)})
+
+    yield sse_event("done", {"id": saved_ids[0] if saved_ids else None, **content.model_dump(mode="json")})
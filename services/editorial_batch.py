@@ -0,0 +1,55 @@
+import asyncio
+import os
+import random
+from datetime import date
+from typing import List, Optional, Tuple
+
+from models.schemas import CibleEnum, ContentRequest, ContentResponse, ProspectTypeEnum
+from services.content_ai import ContentGeneratorInterface
+
+# Nombre maximal de générations simultanées pour un lot hebdomadaire
+HEBDO_MAX_PARALLELISM = int(os.getenv("HEBDO_MAX_PARALLELISM", "5"))
+
+
+def build_weekly_requests(date_: date) -> List[ContentRequest]:
+    """Une requête par cible, avec un type de prospect choisi aléatoirement"""
+    return [
+        ContentRequest(
+            cible=cible,
+            prospect_type=random.choice(list(ProspectTypeEnum)),
+            date=date_
+        )
+        for cible in CibleEnum
+    ]
+
+
+async def generate_batch(
+    generator: ContentGeneratorInterface,
+    requests: List[ContentRequest],
+    max_parallelism: Optional[int] = None
+) -> List[Tuple[ContentResponse, ContentRequest]]:
+    """
+    Génère les contenus d'un lot en parallèle (Single Responsibility)
+
+    Le parallélisme est borné par `max_parallelism`. Un échec sur un élément
+    n'interrompt pas les autres : il est simplement écarté du résultat.
+    Retourne des paires (contenu, requête) prêtes pour `save_many`.
+    """
+    semaphore = asyncio.Semaphore(max_parallelism or HEBDO_MAX_PARALLELISM)
+
+    async def generate_one(request: ContentRequest) -> ContentResponse:
+        async with semaphore:
+            return await generator.generate_content(request)
+
+    outcomes = await asyncio.gather(
+        *(generate_one(request) for request in requests),
+        return_exceptions=True
+    )
+
+    results = []
+    for request, outcome in zip(requests, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"Erreur génération {request.cible.value}: {str(outcome)}")
+            continue
+        results.append((outcome, request))
+    return results
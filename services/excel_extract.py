@@ -1,66 +1,116 @@
-import pandas as pd
+import os
+import tempfile
 from io import BytesIO
-from typing import List
+from typing import IO, Iterable, Iterator, List, Tuple
+from openpyxl import Workbook
 from database.models import GeneratedContent
-from datetime import datetime
+from services.metrics import timed
+
+# Taille au-delà de laquelle le fichier en cours de construction passe sur disque
+EXCEL_SPOOL_MAX_SIZE = int(os.getenv("EXCEL_SPOOL_MAX_SIZE", str(8 * 1024 * 1024)))
+EXCEL_STREAM_CHUNK_SIZE = 64 * 1024
+
+EXCEL_HEADERS = [
+    'ID', 'Cible', 'Type Prospect', 'Date Génération', 'Thème Général',
+    'Thème Hebdomadaire', 'Texte', 'Utilisé', 'Créé le'
+]
 
 class ExcelExtractService:
     """Service d'extraction Excel (Single Responsibility)"""
 
     @staticmethod
-    def extract_to_excel(contents: List[GeneratedContent]) -> BytesIO:
-        """Extrait les contenus vers un fichier Excel"""
+    def _excel_row(content) -> list:
+        return [
+            content.id,
+            content.cible,
+            content.prospect_type,
+            content.generation_date.strftime('%Y-%m-%d'),
+            content.theme_general,
+            content.theme_hebdo,
+            content.texte,
+            'Oui' if content.used == 1 else 'Non',
+            content.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        ]
+
+    @staticmethod
+    @timed("excel_render")
+    def write_excel(contents: Iterable, output: IO[bytes]) -> int:
+        """
+        Écrit les contenus dans un classeur openpyxl en mode write-only.
+
+        Un seul passage sur `contents` (qui peut être un curseur) alimente la
+        feuille principale, les feuilles par cible et les statistiques : les
+        lignes ne sont jamais conservées en mémoire. Retourne le nombre de lignes.
+        """
+        workbook = Workbook(write_only=True)
+
+        # Feuille principale avec tous les contenus
+        main_sheet = workbook.create_sheet('Tous les contenus')
+        main_sheet.append(EXCEL_HEADERS)
+
+        cible_sheets = {}
+        total = used = 0
+        prospect_types = set()
 
-        # Préparer les données
-        data = []
         for content in contents:
-            data.append({
-                'ID': content.id,
-                'Cible': content.cible,
-                'Type Prospect': content.prospect_type,
-                'Date Génération': content.generation_date.strftime('%Y-%m-%d'),
-                'Thème Général': content.theme_general,
-                'Thème Hebdomadaire': content.theme_hebdo,
-                'Texte': content.texte,
-                'Utilisé': 'Oui' if content.used == 1 else 'Non',
-                'Créé le': content.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            })
-
-        # Créer le DataFrame
-        df = pd.DataFrame(data)
-
-        # Créer le fichier Excel en mémoire
-        output = BytesIO()
+            row = ExcelExtractService._excel_row(content)
+            main_sheet.append(row)
+
+            # Feuille par cible, créée à la première occurrence
+            sheet = cible_sheets.get(content.cible)
+            if sheet is None:
+                sheet = workbook.create_sheet(f'Contenu {content.cible}'[:31])  # Limite Excel
+                sheet.append(EXCEL_HEADERS)
+                cible_sheets[content.cible] = sheet
+            sheet.append(row)
 
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # Feuille principale avec tous les contenus
-            df.to_excel(writer, sheet_name='Tous les contenus', index=False)
-
-            # Feuille par cible
-            for cible in df['Cible'].unique():
-                cible_df = df[df['Cible'] == cible]
-                sheet_name = f'Contenu {cible}'[:31]  # Limite Excel
-                cible_df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-            # Feuille statistiques
-            stats_data = {
-                'Métrique': [
-                    'Total contenus',
-                    'Contenus utilisés',
-                    'Contenus non utilisés',
-                    'Nombre de cibles',
-                    'Nombre de types prospects'
-                ],
-                'Valeur': [
-                    len(df),
-                    len(df[df['Utilisé'] == 'Oui']),
-                    len(df[df['Utilisé'] == 'Non']),
-                    df['Cible'].nunique(),
-                    df['Type Prospect'].nunique()
-                ]
-            }
-            stats_df = pd.DataFrame(stats_data)
-            stats_df.to_excel(writer, sheet_name='Statistiques', index=False)
+            total += 1
+            used += 1 if content.used == 1 else 0
+            prospect_types.add(content.prospect_type)
 
+        # Feuille statistiques
+        stats_sheet = workbook.create_sheet('Statistiques')
+        stats_sheet.append(['Métrique', 'Valeur'])
+        for row in [
+            ('Total contenus', total),
+            ('Contenus utilisés', used),
+            ('Contenus non utilisés', total - used),
+            ('Nombre de cibles', len(cible_sheets)),
+            ('Nombre de types prospects', len(prospect_types))
+        ]:
+            stats_sheet.append(list(row))
+
+        workbook.save(output)
+        return total
+
+    @staticmethod
+    def build_excel_file(contents: Iterable) -> Tuple[IO[bytes], int]:
+        """Construit le classeur dans un fichier temporaire (mémoire puis disque)"""
+        output = tempfile.SpooledTemporaryFile(max_size=EXCEL_SPOOL_MAX_SIZE)
+        try:
+            total = ExcelExtractService.write_excel(contents, output)
+        except Exception:
+            output.close()
+            raise
+        output.seek(0)
+        return output, total
+
+    @staticmethod
+    def iter_file(output: IO[bytes], chunk_size: int = EXCEL_STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Envoie le fichier par blocs puis le libère"""
+        try:
+            while True:
+                chunk = output.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            output.close()
+
+    @staticmethod
+    def extract_to_excel(contents: List[GeneratedContent]) -> BytesIO:
+        """Extrait les contenus vers un fichier Excel"""
+        output = BytesIO()
+        ExcelExtractService.write_excel(contents, output)
         output.seek(0)
         return output
@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from models.schemas import ContentRequest, ContentResponse
+from services.content_ai import ContentGeneratorInterface
+
+# Configuration du cache de génération
+GENERATION_CACHE_TTL = float(os.getenv("GENERATION_CACHE_TTL", "3600"))
+GENERATION_CACHE_MAX_SIZE = int(os.getenv("GENERATION_CACHE_MAX_SIZE", "1024"))
+GENERATION_CACHE_DB = os.getenv("GENERATION_CACHE_DB", "false").lower() in ("1", "true", "yes")
+
+
+def _request_date(request: ContentRequest) -> date:
+    if isinstance(request.date, str):
+        return date.fromisoformat(request.date)
+    return request.date
+
+
+def iso_week_bounds(day: date) -> Tuple[date, date]:
+    """Retourne le lundi et le dimanche de la semaine ISO de `day`"""
+    monday = day - timedelta(days=day.weekday())
+    return monday, monday + timedelta(days=6)
+
+
+def generation_cache_key(request: ContentRequest, model: str, prompt_version: str) -> str:
+    """Clé adressée par contenu : (cible, prospect_type, semaine ISO, modèle, version du prompt)"""
+    year, week, _ = _request_date(request).isocalendar()
+    raw = "|".join([
+        request.cible.value,
+        request.prospect_type.value,
+        f"{year}-W{week:02d}",
+        model,
+        prompt_version,
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Cache en mémoire TTL + LRU des contenus générés (Single Responsibility)"""
+
+    def __init__(self, max_size: int = GENERATION_CACHE_MAX_SIZE, ttl: float = GENERATION_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, ContentResponse]]" = OrderedDict()
+        # Générations en cours, partagées par les requêtes identiques simultanées
+        self._in_flight: "Dict[str, asyncio.Task[Tuple[ContentResponse, bool]]]" = {}
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def get(self, key: str) -> Optional[ContentResponse]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, content = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return content
+
+    def set(self, key: str, content: ContentResponse) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, content)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def in_flight(self, key: str) -> "Optional[asyncio.Task[Tuple[ContentResponse, bool]]]":
+        return self._in_flight.get(key)
+
+    def start_flight(self, key: str,
+                     load: Awaitable[Tuple[ContentResponse, bool]]) -> "asyncio.Task[Tuple[ContentResponse, bool]]":
+        """Lance `load` dans une tâche que les requêtes identiques suivantes attendront"""
+        task = asyncio.ensure_future(load)
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._end_flight(key, done))
+        return task
+
+    def _end_flight(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Marque l'exception comme lue si toutes les requêtes en attente ont été annulées
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            # Chaque hit est une complétion OpenAI économisée
+            "completions_saved": hits + self.coalesced,
+        }
+
+
+class CachedContentGenerator(ContentGeneratorInterface):
+    """Décorateur de générateur ajoutant le cache mémoire et PostgreSQL (Open/Closed)"""
+
+    def __init__(self, generator: ContentGeneratorInterface, cache: GenerationCache, repository=None,
+                 persist: Optional[Callable[[ContentResponse, ContentRequest], Awaitable[object]]] = None):
+        self.generator = generator
+        self.cache = cache
+        # Niveau PostgreSQL optionnel : réutilise les lignes de generated_contents
+        self.repository = repository
+        # Sauvegarde d'un contenu généré, faite dans la génération partagée :
+        # une seule ligne, même si le client qui l'a lancée s'est déconnecté
+        self.persist = persist
+
+    async def generate_content(self, request: ContentRequest) -> ContentResponse:
+        content, _ = await self.generate_with_cache(request)
+        return content
+
+    async def generate_with_cache(self, request: ContentRequest, refresh: bool = False) -> Tuple[ContentResponse, bool]:
+        """
+        Retourne (contenu, hit) ; `refresh` force une nouvelle génération.
+
+        Les requêtes identiques arrivant pendant une génération attendent son
+        résultat au lieu d'en lancer une autre (hit = True : pas de nouvelle
+        sauvegarde). La génération partagée continue si le client qui l'a
+        lancée se déconnecte.
+        """
+        model = getattr(self.generator, "model", type(self.generator).__name__)
+        prompt_version = self.generator.prompt_version_for(request)
+        key = generation_cache_key(request, model, prompt_version)
+
+        if not refresh:
+            content = self.cache.get(key)
+            if content is not None:
+                self.cache.memory_hits += 1
+                return content, True
+
+        flight = self.cache.in_flight(key)
+        if flight is not None:
+            self.cache.coalesced += 1
+            content, _ = await asyncio.shield(flight)
+            return content, True
+
+        flight = self.cache.start_flight(key, self._load(request, key, model, prompt_version, refresh))
+        return await asyncio.shield(flight)
+
+    async def _load(self, request: ContentRequest, key: str, model: str, prompt_version: str,
+                    refresh: bool) -> Tuple[ContentResponse, bool]:
+        if refresh:
+            self.cache.refreshes += 1
+            self.cache.invalidate(key)
+        elif self.repository is not None:
+            monday, sunday = iso_week_bounds(_request_date(request))
+            content = await self.repository.find_generated_content(
+                cible=request.cible.value,
+                prospect_type=request.prospect_type.value,
+                start_date=monday,
+                end_date=sunday + timedelta(days=1),
+                model=model,
+                prompt_version=prompt_version
+            )
+            if content is not None:
+                self.cache.db_hits += 1
+                self.cache.set(key, content)
+                return content, True
+
+        self.cache.misses += 1
+        content = await self.generator.generate_content(request)
+        if self.persist is not None:
+            await self.persist(content, request)
+        # Un contenu de secours ne doit jamais être servi depuis le cache
+        if not content.fallback:
+            self.cache.set(key, content)
+        return content, False
+
+
+_generation_cache: Optional[GenerationCache] = None
+
+
+def get_generation_cache() -> GenerationCache:
+    """Cache partagé par tout le processus"""
+    global _generation_cache
+    if _generation_cache is None:
+        _generation_cache = GenerationCache()
+    return _generation_cache
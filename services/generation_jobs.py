@@ -0,0 +1,225 @@
+import asyncio
+import os
+import time
+from typing import AsyncContextManager, Callable, Dict, Optional, Set
+
+from database.connexion import DBSession, session_scope
+from models.schemas import ContentResponse
+from repository.job_repo import DBJobRepository
+from services.content_ai import ContentGeneratorInterface, ContentGeneratorFactory
+from services.generator_registry import CONTENT_GENERATOR
+from services.leader_lock import AdvisoryLeaderLock
+from services.near_duplicates import DeduplicatingContentGenerator
+
+# Configuration du pool de workers
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_REQUESTS_PER_MINUTE = float(os.getenv("JOB_MAX_REQUESTS_PER_MINUTE", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_MAX_ITEMS = int(os.getenv("JOB_MAX_ITEMS", "5000"))
+# Intervalle (secondes) de recherche des jobs reprenables ; 0 = seulement au démarrage
+JOB_RESCAN_INTERVAL = float(os.getenv("JOB_RESCAN_INTERVAL", "60"))
+
+
+class RateLimiter:
+    """Espace les démarrages d'appels pour respecter un débit par minute"""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class GenerationJobRunner:
+    """
+    Pool de workers asyncio qui draine les jobs de génération (Single Responsibility)
+
+    Chaque job est exécuté sous un verrou consultatif PostgreSQL qui lui est
+    propre : au démarrage, tous les réplicas tentent de reprendre les jobs en
+    attente ou interrompus, mais un seul obtient le verrou d'un job donné. Le
+    verrou est libéré à la fin du job, ou par PostgreSQL si le processus
+    s'arrête. Les jobs en attente sont recherchés de nouveau toutes les
+    JOB_RESCAN_INTERVAL secondes : un job laissé par un autre réplica, ou
+    resté `pending` après un passage incomplet, est repris sans redémarrage.
+    """
+
+    def __init__(
+        self,
+        session_scope: Callable[[], AsyncContextManager[DBSession]] = session_scope,
+        generator: Optional[ContentGeneratorInterface] = None,
+        workers: int = JOB_WORKERS,
+        requests_per_minute: float = JOB_MAX_REQUESTS_PER_MINUTE,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        rescan_interval: float = JOB_RESCAN_INTERVAL
+    ):
+        self.session_scope = session_scope
+        self._generator = generator
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.rescan_interval = rescan_interval
+        self._tasks: Dict[int, asyncio.Task] = {}
+        # Jobs dont le verrou est tenu ailleurs (message affiché une seule fois)
+        self._held_elsewhere: Set[int] = set()
+        self._rescan_task: Optional[asyncio.Task] = None
+
+    @property
+    def generator(self) -> ContentGeneratorInterface:
+        if self._generator is None:
+            self._generator = DeduplicatingContentGenerator(
+                ContentGeneratorFactory.create_generator(CONTENT_GENERATOR), self.session_scope
+            )
+        return self._generator
+
+    def submit(self, job_id: int) -> None:
+        """Planifie l'exécution du job s'il ne tourne pas déjà"""
+        task = self._tasks.get(job_id)
+        if task is not None and not task.done():
+            return
+        self._tasks[job_id] = asyncio.create_task(self.run_job(job_id))
+
+    async def resume_pending_jobs(self) -> None:
+        """Reprend les jobs en attente ou interrompus qui ne tournent pas déjà ici"""
+        async with self.session_scope() as db:
+            job_ids = await DBJobRepository(db).get_resumable_job_ids()
+
+        for job_id in job_ids:
+            task = self._tasks.get(job_id)
+            if task is not None and not task.done():
+                continue
+            if job_id not in self._held_elsewhere:
+                print(f"Reprise du job de génération {job_id}")
+            self.submit(job_id)
+
+    async def _rescan(self) -> None:
+        while True:
+            await asyncio.sleep(self.rescan_interval)
+            try:
+                await self.resume_pending_jobs()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Erreur recherche des jobs de génération: {str(e)}")
+
+    def start(self) -> None:
+        """Lance la recherche périodique des jobs reprenables"""
+        if self.rescan_interval <= 0:
+            return
+        if self._rescan_task is None or self._rescan_task.done():
+            self._rescan_task = asyncio.create_task(self._rescan())
+
+    async def run_job(self, job_id: int) -> None:
+        lock = AdvisoryLeaderLock(f"generation_job:{job_id}")
+        try:
+            if not await lock.acquire():
+                if job_id not in self._held_elsewhere:
+                    print(f"Job de génération {job_id} déjà pris par un autre réplica")
+                    self._held_elsewhere.add(job_id)
+                return
+            self._held_elsewhere.discard(job_id)
+            await self._run_job(job_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Erreur job de génération {job_id}: {str(e)}")
+        finally:
+            await lock.release()
+
+    async def _run_job(self, job_id: int) -> None:
+        async with self.session_scope() as db:
+            items = await DBJobRepository(db).start_job(job_id)
+        if items is None:
+            # Terminé entre-temps par le réplica qui tenait le verrou
+            return
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item_id, request, attempts in items:
+            queue.put_nowait((item_id, request, attempts, None))
+
+        workers = [
+            asyncio.create_task(self._worker(job_id, queue))
+            for _ in range(min(self.workers, len(items)) or 1)
+        ]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        async with self.session_scope() as db:
+            status = await DBJobRepository(db).finish_job(job_id)
+        print(f"Job de génération {job_id} : {status}")
+
+    async def _worker(self, job_id: int, queue: asyncio.Queue) -> None:
+        while True:
+            item_id, request, attempts, content = await queue.get()
+            try:
+                await self._process_item(job_id, queue, item_id, request, attempts, content)
+            except Exception as e:
+                print(f"Erreur job {job_id} élément {item_id}: {str(e)}")
+            finally:
+                queue.task_done()
+
+    async def _process_item(self, job_id: int, queue: asyncio.Queue, item_id: int, request, attempts: int,
+                            content: Optional[ContentResponse] = None) -> None:
+        if content is None:
+            try:
+                await self.rate_limiter.acquire()
+                content = await self.generator.generate_content(request)
+                if content.fallback:
+                    raise RuntimeError("Contenu de secours retourné par le générateur")
+            except Exception as e:
+                await self._record_failure(job_id, queue, item_id, request, attempts, str(e))
+                return
+
+        try:
+            async with self.session_scope() as db:
+                await DBJobRepository(db).complete_item(job_id, item_id, content, request)
+        except Exception as e:
+            # Le contenu déjà généré (et payé) est conservé : seule la sauvegarde est retentée
+            await self._record_failure(job_id, queue, item_id, request, attempts, f"Sauvegarde : {str(e)}", content)
+
+    async def _record_failure(self, job_id: int, queue: asyncio.Queue, item_id: int, request, attempts: int,
+                              error: str, content: Optional[ContentResponse] = None) -> None:
+        """Remet l'élément en file tant qu'il reste des tentatives, sinon le marque en échec"""
+        final = attempts + 1 >= self.max_attempts
+        if not final:
+            queue.put_nowait((item_id, request, attempts + 1, content))
+        try:
+            async with self.session_scope() as db:
+                await DBJobRepository(db).fail_item(job_id, item_id, error, final)
+        except Exception as e:
+            # L'élément reste en attente en base : finish_job laisse alors le job reprenable
+            print(f"Erreur job {job_id} élément {item_id}: {error} ; échec non enregistré : {str(e)}")
+
+    async def shutdown(self) -> None:
+        """Annule les jobs en cours ; ils reprendront au prochain démarrage"""
+        if self._rescan_task is not None:
+            self._rescan_task.cancel()
+            await asyncio.gather(self._rescan_task, return_exceptions=True)
+            self._rescan_task = None
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+
+_job_runner: Optional[GenerationJobRunner] = None
+
+
+def get_job_runner() -> GenerationJobRunner:
+    """Runner partagé par tout le processus"""
+    global _job_runner
+    if _job_runner is None:
+        _job_runner = GenerationJobRunner()
+    return _job_runner
@@ -0,0 +1,248 @@
+"""
+Registre des générateurs de contenu et routage entre backends.
+
+Chaque backend est construit une seule fois puis réutilisé pendant toute la
+vie du processus (client HTTP et pool de connexions compris). Le routeur
+envoie chaque requête au backend sain le plus rapide d'après une fenêtre
+glissante de latences et d'erreurs.
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from datetime import date, datetime
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from models.schemas import ContentRequest, ContentResponse
+from services.content_ai import ContentGeneratorInterface, OpenAIContentGenerator
+from services.metrics import REGISTRY, GaugeCallback, timed
+
+# Backend par défaut des routes et des jobs, et backends candidats du routeur.
+# `template` n'est candidat que sur demande explicite : il répond en quelques
+# microsecondes et le routeur lui enverrait presque toutes les requêtes
+CONTENT_GENERATOR = os.getenv("CONTENT_GENERATOR", "openai")
+GENERATOR_ROUTER_BACKENDS = [
+    name.strip() for name in os.getenv("GENERATOR_ROUTER_BACKENDS", "openai").split(",") if name.strip()
+]
+GENERATOR_STATS_WINDOW = int(os.getenv("GENERATOR_STATS_WINDOW", "50"))
+# Au-delà de ce taux d'erreur sur la fenêtre, un backend n'est plus choisi (sauf s'il est le seul)
+GENERATOR_MAX_ERROR_RATE = float(os.getenv("GENERATOR_MAX_ERROR_RATE", "0.5"))
+# Part des requêtes envoyées à un autre backend pour garder ses statistiques à jour
+GENERATOR_ROUTER_EXPLORE = float(os.getenv("GENERATOR_ROUTER_EXPLORE", "0.05"))
+
+
+class TemplateContentGenerator(ContentGeneratorInterface):
+    """Générateur local déterministe, sans appel réseau (tests, mode hors ligne, charge)"""
+
+    PROMPT_VERSION = "template-v1"
+
+    THEMES_GENERAUX = [
+        "Inspirer confiance par l'expertise",
+        "Raconter les coulisses de la marque",
+        "Valoriser les résultats clients",
+        "Éduquer avec des conseils concrets",
+        "Créer de la proximité avec la communauté",
+    ]
+    THEMES_HEBDO = [
+        "Retour sur un cas client marquant",
+        "Trois astuces pour gagner du temps",
+        "Question de la semaine à la communauté",
+        "Zoom sur une tendance du secteur",
+        "Les erreurs fréquentes à éviter",
+    ]
+
+    def __init__(self):
+        self.model = "template"
+        self.prompt_version = self.PROMPT_VERSION
+
+    async def generate_content(self, request: ContentRequest) -> ContentResponse:
+        request_date = request.date if isinstance(request.date, (date, datetime)) else date.fromisoformat(str(request.date))
+        seed = f"{request.cible.value}|{request.prospect_type.value}|{request_date.isoformat()}"
+        digest = int(hashlib.sha256(seed.encode("utf-8")).hexdigest(), 16)
+        theme_general = self.THEMES_GENERAUX[digest % len(self.THEMES_GENERAUX)]
+        theme_hebdo = self.THEMES_HEBDO[(digest // len(self.THEMES_GENERAUX)) % len(self.THEMES_HEBDO)]
+
+        return ContentResponse(
+            theme_general=theme_general,
+            theme_hebdo=f"{theme_hebdo} (semaine {request_date.isocalendar()[1]})",
+            texte=(
+                f"{theme_hebdo} : un contenu {request.cible.value} pensé pour un public "
+                f"{request.prospect_type.value.lower()}, autour du thème « {theme_general.lower()} »."
+            ),
+            cible=request.cible.value,
+            prospect_type=request.prospect_type.value,
+            generation_date=request_date,
+            used=0,
+            model=self.model,
+            prompt_version=self.prompt_version
+        )
+
+
+class BackendStats:
+    """Latences et erreurs des `window` derniers appels d'un backend"""
+
+    def __init__(self, window: int = GENERATOR_STATS_WINDOW):
+        self._samples: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    @property
+    def calls(self) -> int:
+        return len(self._samples)
+
+    @property
+    def error_rate(self) -> float:
+        samples = list(self._samples)
+        return sum(1 for _, ok in samples if not ok) / len(samples) if samples else 0.0
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        latencies = [latency for latency, ok in list(self._samples) if ok]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def snapshot(self) -> dict:
+        mean_latency = self.mean_latency
+        return {
+            "calls": self.calls,
+            "error_rate": round(self.error_rate, 4),
+            "mean_latency_ms": round(mean_latency * 1000, 1) if mean_latency is not None else None,
+        }
+
+
+class LatencyRouter(ContentGeneratorInterface):
+    """Route chaque requête vers le backend sain le plus rapide, avec repli sur les suivants (Open/Closed)"""
+
+    def __init__(self, backends: Dict[str, ContentGeneratorInterface],
+                 max_error_rate: float = GENERATOR_MAX_ERROR_RATE,
+                 explore: float = GENERATOR_ROUTER_EXPLORE):
+        if not backends:
+            raise ValueError("Le routeur nécessite au moins un backend")
+        self.backends = backends
+        self.stats = {name: BackendStats() for name in backends}
+        self.max_error_rate = max_error_rate
+        self.explore = explore
+        self.model = "router"
+
+    def prompt_version_for(self, request: ContentRequest) -> str:
+        return "+".join(
+            f"{name}:{backend.prompt_version_for(request)}" for name, backend in self.backends.items()
+        )
+
+    def ranked_backends(self) -> List[str]:
+        """Backends sains d'abord, puis par latence moyenne (les backends jamais mesurés en tête)"""
+        def score(name: str):
+            stats = self.stats[name]
+            unhealthy = stats.calls > 0 and stats.error_rate > self.max_error_rate
+            mean_latency = stats.mean_latency
+            return (unhealthy, mean_latency if mean_latency is not None else -1.0)
+
+        ranked = sorted(self.backends, key=score)
+        if len(ranked) > 1 and random.random() < self.explore:
+            # Exploration : un autre backend passe en tête pour rafraîchir ses mesures
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    @timed("router")
+    async def generate_content(self, request: ContentRequest) -> ContentResponse:
+        content = None
+        for name in self.ranked_backends():
+            start = time.perf_counter()
+            try:
+                content = await self.backends[name].generate_content(request)
+            except Exception as e:
+                print(f"Erreur backend {name}: {str(e)}")
+                self.stats[name].record(time.perf_counter() - start, False)
+                continue
+
+            # Un contenu de secours compte comme un échec : on tente le backend suivant
+            ok = not content.fallback
+            self.stats[name].record(time.perf_counter() - start, ok)
+            if ok:
+                return content
+
+        if content is None:
+            raise RuntimeError("Aucun backend de génération disponible")
+        return content
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+
+class GeneratorRegistry:
+    """Backends enregistrés par nom, instanciés une seule fois (Single Responsibility)"""
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[[], ContentGeneratorInterface]] = {}
+        self._instances: Dict[str, ContentGeneratorInterface] = {}
+        # Réentrant : le routeur récupère ses backends pendant sa propre construction
+        self._lock = threading.RLock()
+
+    def register(self, name: str, builder: Callable[[], ContentGeneratorInterface]) -> None:
+        with self._lock:
+            self._builders[name] = builder
+            self._instances.pop(name, None)
+
+    def names(self) -> List[str]:
+        return list(self._builders)
+
+    def get(self, name: str) -> ContentGeneratorInterface:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                builder = self._builders.get(name)
+                if builder is None:
+                    raise ValueError(f"Type de générateur non supporté: {name}")
+                instance = self._instances[name] = builder()
+        return instance
+
+    def instances(self) -> Dict[str, ContentGeneratorInterface]:
+        return dict(self._instances)
+
+
+def _build_router() -> LatencyRouter:
+    registry = get_generator_registry()
+    if "template" in GENERATOR_ROUTER_BACKENDS:
+        print("Routeur : le backend template (contenu de démonstration) est candidat et sera sauvegardé comme les autres")
+    return LatencyRouter({
+        name: registry.get(name) for name in GENERATOR_ROUTER_BACKENDS if name != "router"
+    })
+
+
+_registry: Optional[GeneratorRegistry] = None
+
+
+def get_generator_registry() -> GeneratorRegistry:
+    """Registre partagé par tout le processus, avec les backends intégrés"""
+    global _registry
+    if _registry is None:
+        registry = GeneratorRegistry()
+        registry.register("openai", OpenAIContentGenerator)
+        registry.register("template", TemplateContentGenerator)
+        registry.register("router", _build_router)
+        _registry = registry
+    return _registry
+
+
+def _collect_router_stats():
+    router = get_generator_registry().instances().get("router")
+    if router is None:
+        return
+    for name, stats in router.stats.items():
+        yield (name, "error_rate"), stats.error_rate
+        mean_latency = stats.mean_latency
+        if mean_latency is not None:
+            yield (name, "mean_latency_seconds"), mean_latency
+
+
+REGISTRY.register(GaugeCallback(
+    "generator_router", "Statistiques glissantes des backends du routeur", ("backend", "field"), _collect_router_stats
+))
@@ -0,0 +1,111 @@
+"""
+En-tête `Idempotency-Key` de /generate-content.
+
+La première requête portant une clé réserve une ligne `idempotency_keys`
+(`pending`), puis y enregistre sa réponse : les nouvelles tentatives du client
+avec la même clé reçoivent cette réponse sans nouvel appel OpenAI ni nouvelle
+ligne dans generated_contents. Une clé réutilisée avec un autre corps est
+refusée (422), une clé dont la génération est encore en cours aussi (409).
+
+Purge des clés expirées :
+    python -m services.idempotency --purge
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from typing import Optional
+
+from database.connexion import session_scope
+from models.schemas import ContentRequest, ContentResponse
+from repository.idempotency_repo import DBIdempotencyRepository
+from services.metrics import REGISTRY, Counter
+
+# Durée de conservation des réponses (secondes)
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400"))
+# Au-delà, une clé restée `pending` est considérée abandonnée et peut être reprise
+IDEMPOTENCY_PENDING_TIMEOUT = float(os.getenv("IDEMPOTENCY_PENDING_TIMEOUT", "120"))
+
+# reserved : première requête ; replayed : réponse rejouée ; in_progress, mismatch : refusées
+IDEMPOTENCY_REQUESTS = REGISTRY.register(Counter(
+    "idempotency_requests_total", "Requêtes portant un en-tête Idempotency-Key, par résultat", ("outcome",)
+))
+
+
+class IdempotencyConflictError(Exception):
+    """Clé inutilisable pour cette requête ; `reason` vaut in_progress ou mismatch"""
+
+    def __init__(self, reason: str):
+        messages = {
+            "in_progress": "Une requête avec cette clé d'idempotence est en cours",
+            "mismatch": "Cette clé d'idempotence a déjà servi pour une requête différente",
+        }
+        super().__init__(messages[reason])
+        self.reason = reason
+
+
+def request_fingerprint(request: ContentRequest, **params) -> str:
+    """Empreinte du corps et des paramètres de la requête"""
+    raw = json.dumps(
+        {"body": request.model_dump(mode="json"), "params": params},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class IdempotentRequest:
+    """Cycle de vie d'une clé d'idempotence pour une requête (Single Responsibility)"""
+
+    def __init__(self, repository: DBIdempotencyRepository, key: str, fingerprint: str,
+                 ttl: float = IDEMPOTENCY_KEY_TTL, pending_timeout: float = IDEMPOTENCY_PENDING_TIMEOUT):
+        self.repository = repository
+        self.key = key
+        self.fingerprint = fingerprint
+        self.ttl = ttl
+        self.pending_timeout = pending_timeout
+
+    async def begin(self) -> Optional[str]:
+        """
+        Réserve la clé ; retourne la réponse JSON enregistrée si la requête a
+        déjà abouti (rejeu), None si elle doit être traitée.
+        """
+        state, record = await self.repository.reserve(self.key, self.fingerprint, self.ttl, self.pending_timeout)
+        if state == "reserved":
+            IDEMPOTENCY_REQUESTS.inc(outcome="reserved")
+            return None
+        if record is None:
+            # Clé supprimée entre la réservation concurrente et la relecture
+            IDEMPOTENCY_REQUESTS.inc(outcome="in_progress")
+            raise IdempotencyConflictError("in_progress")
+        if record.request_hash != self.fingerprint:
+            IDEMPOTENCY_REQUESTS.inc(outcome="mismatch")
+            raise IdempotencyConflictError("mismatch")
+        if record.status != "completed":
+            IDEMPOTENCY_REQUESTS.inc(outcome="in_progress")
+            raise IdempotencyConflictError("in_progress")
+
+        IDEMPOTENCY_REQUESTS.inc(outcome="replayed")
+        return record.response
+
+    async def complete(self, content: ContentResponse) -> None:
+        # Même sérialisation que la réponse initiale (champs exclus compris)
+        await self.repository.complete(self.key, content.model_dump_json())
+
+    async def abort(self) -> None:
+        await self.repository.release(self.key)
+
+
+async def _main(args) -> None:
+    async with session_scope() as db:
+        deleted = await DBIdempotencyRepository(db).purge_expired()
+    print(json.dumps({"purged_keys": deleted}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clés d'idempotence de /generate-content")
+    parser.add_argument("--purge", action="store_true", help="Supprimer les clés expirées")
+    args = parser.parse_args()
+    if not args.purge:
+        parser.error("--purge est requis")
+    asyncio.run(_main(args))
@@ -0,0 +1,87 @@
+import asyncio
+import hashlib
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from database.connexion import engine as default_engine
+
+
+def advisory_lock_id(name: str) -> int:
+    """Identifiant bigint stable du verrou consultatif PostgreSQL"""
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+class AdvisoryLeaderLock:
+    """
+    Élection d'un leader entre réplicas via un verrou consultatif PostgreSQL (Single Responsibility)
+
+    Le verrou de session `pg_try_advisory_lock` est tenu par une connexion
+    dédiée, sortie du pool tant que le processus est leader : si le processus
+    s'arrête ou perd sa connexion, PostgreSQL libère le verrou et un autre
+    réplica le prend au tour suivant. Hors PostgreSQL (SQLite de
+    développement), le processus est toujours leader.
+    """
+
+    def __init__(self, name: str, engine: Engine = default_engine):
+        self.name = name
+        self.lock_id = advisory_lock_id(name)
+        self.engine = engine
+        self._connection: Optional[Connection] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._connection is not None or self.engine.dialect.name != "postgresql"
+
+    def _try_acquire(self) -> bool:
+        if self._connection is not None:
+            try:
+                # Connexion toujours vivante : le verrou est toujours tenu
+                self._connection.execute(text("SELECT 1"))
+                self._connection.commit()
+                return True
+            except Exception:
+                self._close()
+
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": self.lock_id}
+            ).scalar()
+            # Pas de transaction ouverte sur la connexion tenue (idle in transaction)
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    async def acquire(self) -> bool:
+        """Prend ou conserve le leadership ; False si un autre réplica le tient"""
+        if self.engine.dialect.name != "postgresql":
+            return True
+        return await asyncio.to_thread(self._try_acquire)
+
+    def _close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _release(self) -> None:
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": self.lock_id})
+            self._connection.commit()
+        finally:
+            self._close()
+
+    async def release(self) -> None:
+        await asyncio.to_thread(self._release)
@@ -0,0 +1,286 @@
+"""
+Métriques au format d'exposition Prometheus et traçage des étapes.
+
+Implémentation minimale sans dépendance : compteurs et histogrammes protégés
+par un verrou, jauges calculées à la lecture (pool SQLAlchemy, cache de
+génération). Une mesure coûte un `perf_counter` et une insertion dans une
+liste de buckets, ce qui permet de laisser l'instrumentation active en production.
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Bornes (secondes) des histogrammes de latence : de 1 ms à 2 min
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur monotone, éventuellement étiqueté"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def inc_values(self, key: LabelValues, amount: float = 1) -> None:
+        """Variante de `inc` pour les chemins chauds : étiquettes déjà ordonnées en tuple de str"""
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histogramme à buckets cumulés (compatible histogram_quantile)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # Par jeu d'étiquettes : [compteurs par bucket (+Inf en dernier), somme, total]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(series[0]), series[1], series[2]) for key, series in self._series.items()]
+        for key, bucket_counts, total_sum, total_count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {total_count}")
+        return lines
+
+
+class GaugeCallback:
+    """Jauges calculées au moment de l'exposition : `collect()` retourne (étiquettes, valeur)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 collect: Callable[[], Iterable[Tuple[LabelValues, float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            samples = list(self.collect())
+        except Exception as e:
+            print(f"Erreur collecte métrique {self.name}: {str(e)}")
+            samples = []
+        for key, value in samples:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Registre des métriques exposées sur /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "content_stage_duration_seconds",
+    "Durée de chaque étape (prompt, appel OpenAI, parsing, sauvegarde, rendu Excel...)",
+    ("stage",)
+))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "content_stage_errors_total", "Étapes terminées par une exception", ("stage",)
+))
+OPENAI_TOKENS = REGISTRY.register(Counter(
+    "openai_tokens_total", "Tokens consommés d'après le champ usage des complétions", ("model", "type")
+))
+CONTENT_FALLBACKS = REGISTRY.register(Counter(
+    "content_fallback_total", "Contenus de secours retournés à la place d'une génération", ("reason",)
+))
+
+
+# Hooks de traçage : hook(stage, durée en secondes, exception ou None)
+TraceHook = Callable[[str, float, Optional[BaseException]], None]
+_trace_hooks: List[TraceHook] = []
+
+
+def add_trace_hook(hook: TraceHook) -> None:
+    """Branche un traceur externe (OpenTelemetry, logs...) sur chaque étape mesurée"""
+    _trace_hooks.append(hook)
+
+
+def remove_trace_hook(hook: TraceHook) -> None:
+    if hook in _trace_hooks:
+        _trace_hooks.remove(hook)
+
+
+def record_stage(stage: str, duration: float, error: Optional[BaseException] = None) -> None:
+    STAGE_LATENCY.observe(duration, stage=stage)
+    if error is not None:
+        STAGE_ERRORS.inc(stage=stage)
+    for hook in _trace_hooks:
+        try:
+            hook(stage, duration, error)
+        except Exception as e:
+            print(f"Erreur hook de traçage: {str(e)}")
+
+
+class trace_stage:
+    """
+    Mesure la durée d'un bloc : `with trace_stage("openai_call"): ...`
+
+    Fonctionne aussi autour d'un `await` : la durée mesurée est le temps réel écoulé.
+    """
+
+    __slots__ = ("stage", "_start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if METRICS_ENABLED:
+            record_stage(self.stage, time.perf_counter() - self._start, exc)
+        return False
+
+
+def timed(stage: str):
+    """Décorateur équivalent à `trace_stage`, pour fonctions synchrones ou coroutines"""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with trace_stage(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace_stage(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_token_usage(model: str, usage) -> None:
+    """Comptabilise le champ `usage` d'une complétion (absent sur certains proxys)"""
+    if usage is None:
+        return
+    OPENAI_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, model=model, type="prompt")
+    OPENAI_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, model=model, type="completion")
+
+
+def _collect_db_pool():
+    from database.connexion import async_engine, engine
+
+    for name, pool in (("sync", engine.pool), ("async", async_engine.pool if async_engine is not None else None)):
+        if pool is None or not hasattr(pool, "checkedout"):
+            continue
+        yield (name, "size"), pool.size()
+        yield (name, "checked_out"), pool.checkedout()
+        yield (name, "checked_in"), pool.checkedin()
+        yield (name, "overflow"), pool.overflow()
+
+
+def _collect_generation_cache():
+    from services.generation_cache import get_generation_cache
+
+    stats = get_generation_cache().stats()
+    for field in ("size", "memory_hits", "db_hits", "misses", "refreshes", "evictions", "coalesced", "in_flight"):
+        yield (field,), stats[field]
+
+
+REGISTRY.register(GaugeCallback(
+    "db_pool_connections", "État du pool de connexions SQLAlchemy", ("engine", "state"), _collect_db_pool
+))
+REGISTRY.register(GaugeCallback(
+    "generation_cache", "Taille et compteurs du cache de génération", ("field",), _collect_generation_cache
+))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
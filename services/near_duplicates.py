@@ -0,0 +1,93 @@
+"""
+Garde-fou contre les quasi-doublons à la génération.
+
+Avant d'être retourné (donc sauvegardé), un contenu est comparé aux contenus
+déjà stockés via l'index MinHash/LSH ; s'il est trop proche de l'un d'eux, le
+générateur est relancé jusqu'à NEAR_DUPLICATE_REGENERATIONS fois.
+
+Signatures des contenus existants :
+    python -m services.near_duplicates --backfill
+"""
+import argparse
+import asyncio
+import json
+import os
+from typing import AsyncContextManager, Callable
+
+from database.connexion import DBSession, session_scope
+from models.schemas import ContentRequest, ContentResponse
+from repository.conn_repo import DBContentRepository
+from services.content_ai import ContentGeneratorInterface
+from services.metrics import REGISTRY, Counter
+from services.minhash import NEAR_DUPLICATE_MIN_SIMILARITY
+
+# Régénérations tentées quand le contenu est un quasi-doublon (0 : signalement seul)
+NEAR_DUPLICATE_REGENERATIONS = int(os.getenv("NEAR_DUPLICATE_REGENERATIONS", "1"))
+
+# regenerated : une nouvelle génération est lancée ; kept : le doublon est conservé (tentatives épuisées)
+NEAR_DUPLICATES = REGISTRY.register(Counter(
+    "content_near_duplicates_total", "Contenus générés quasi identiques à un contenu existant", ("action",)
+))
+
+
+class DeduplicatingContentGenerator(ContentGeneratorInterface):
+    """Décorateur de générateur qui régénère les quasi-doublons (Open/Closed)"""
+
+    def __init__(self, generator: ContentGeneratorInterface,
+                 session_scope: Callable[[], AsyncContextManager[DBSession]] = session_scope,
+                 max_regenerations: int = NEAR_DUPLICATE_REGENERATIONS,
+                 min_similarity: float = NEAR_DUPLICATE_MIN_SIMILARITY):
+        self.generator = generator
+        self.session_scope = session_scope
+        self.max_regenerations = max_regenerations
+        self.min_similarity = min_similarity
+        self.model = getattr(generator, "model", type(generator).__name__)
+
+    def prompt_version_for(self, request: ContentRequest) -> str:
+        return self.generator.prompt_version_for(request)
+
+    async def generate_content(self, request: ContentRequest) -> ContentResponse:
+        attempt = 0
+        while True:
+            content = await self.generator.generate_content(request)
+            if content.fallback:
+                return content
+
+            try:
+                async with self.session_scope() as db:
+                    duplicates = await DBContentRepository(db).find_near_duplicates(
+                        content.texte, self.min_similarity, limit=1
+                    )
+            except Exception as e:
+                # La détection ne doit jamais bloquer la génération
+                print(f"Erreur détection de quasi-doublons: {str(e)}")
+                return content
+
+            if not duplicates:
+                return content
+
+            duplicate_id, score = duplicates[0]
+            if attempt >= self.max_regenerations:
+                print(f"Quasi-doublon conservé (contenu {duplicate_id}, similarité {score:.2f})")
+                NEAR_DUPLICATES.inc(action="kept")
+                return content
+
+            print(f"Quasi-doublon du contenu {duplicate_id} (similarité {score:.2f}), régénération")
+            NEAR_DUPLICATES.inc(action="regenerated")
+            attempt += 1
+
+
+async def _main(args) -> None:
+    async with session_scope() as db:
+        total = await DBContentRepository(db).backfill_signatures(args.batch_size)
+    print(json.dumps({"backfilled": total}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Signatures de quasi-doublons des contenus existants")
+    parser.add_argument("--backfill", action="store_true", help="Calculer les signatures manquantes")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    if not args.backfill:
+        parser.error("--backfill est requis")
+    asyncio.run(_main(args))
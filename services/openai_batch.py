@@ -0,0 +1,230 @@
+"""
+Mode batch OpenAI pour les grosses générations non urgentes.
+
+Les requêtes sont sérialisées au format JSONL de l'API Batch, soumises,
+suivies jusqu'à leur fin puis ingérées dans `generated_contents` par
+morceaux, sans charger le fichier de sortie en mémoire. La progression est
+enregistrée avec chaque morceau (`openai_batch_ingestions`) : relancer
+`--ingest` reprend après les lignes déjà sauvegardées et n'insère rien pour un
+batch déjà ingéré.
+
+Usage :
+    python -m services.openai_batch --start 2025-07-01 --end 2025-09-30
+    python -m services.openai_batch --ingest batch_abc123
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from datetime import date
+from pathlib import Path
+from typing import AsyncContextManager, Callable, Iterable, List, Optional, Tuple
+
+from database.connexion import DBSession, session_scope
+from models.schemas import CibleEnum, ContentRequest, ContentResponse, ProspectTypeEnum
+from repository.batch_repo import DBBatchIngestionRepository, record_ingestion
+from repository.conn_repo import DBContentRepository
+from repository.job_repo import job_weeks
+from services.content_ai import OpenAIContentGenerator
+
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_INTERVAL = float(os.getenv("OPENAI_BATCH_POLL_INTERVAL", "30"))
+BATCH_INGEST_CHUNK_SIZE = int(os.getenv("OPENAI_BATCH_INGEST_CHUNK_SIZE", "500"))
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def encode_custom_id(index: int, request: ContentRequest) -> str:
+    """Identifiant autoportant : la requête est reconstruite à l'ingestion"""
+    return f"{index}|{request.cible.value}|{request.prospect_type.value}|{request.date}"
+
+
+def decode_custom_id(custom_id: str) -> ContentRequest:
+    _, cible, prospect_type, date_ = custom_id.split("|")
+    return ContentRequest(cible=cible, prospect_type=prospect_type, date=date_)
+
+
+def build_matrix_requests(start_date: date, end_date: date,
+                          cibles: Optional[List[CibleEnum]] = None,
+                          prospect_types: Optional[List[ProspectTypeEnum]] = None) -> Iterable[ContentRequest]:
+    """Matrice cible × prospect_type × semaine, générée paresseusement"""
+    for week in job_weeks(start_date, end_date):
+        for cible in cibles or list(CibleEnum):
+            for prospect_type in prospect_types or list(ProspectTypeEnum):
+                yield ContentRequest(cible=cible, prospect_type=prospect_type, date=week)
+
+
+class OpenAIBatchService:
+    """Soumission et ingestion des générations via l'API Batch (Single Responsibility)"""
+
+    def __init__(
+        self,
+        generator: Optional[OpenAIContentGenerator] = None,
+        session_scope: Callable[[], AsyncContextManager[DBSession]] = session_scope,
+        chunk_size: int = BATCH_INGEST_CHUNK_SIZE,
+        poll_interval: float = BATCH_POLL_INTERVAL
+    ):
+        self.generator = generator or OpenAIContentGenerator()
+        self.client = self.generator.client
+        self.session_scope = session_scope
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+
+    def write_batch_file(self, requests: Iterable[ContentRequest], path: Path) -> int:
+        """Écrit les requêtes au format JSONL de l'API Batch, ligne par ligne"""
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for index, request in enumerate(requests):
+                f.write(json.dumps({
+                    "custom_id": encode_custom_id(index, request),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self.generator.build_completion_body(request)
+                }, ensure_ascii=False))
+                f.write("\n")
+                count += 1
+        return count
+
+    async def submit(self, requests: Iterable[ContentRequest]) -> str:
+        """Téléverse le fichier JSONL et crée le batch ; retourne son identifiant"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "batch_input.jsonl"
+            count = self.write_batch_file(requests, path)
+            if count == 0:
+                raise ValueError("Aucune requête à soumettre")
+
+            input_file = await self.client.files.create(file=path, purpose="batch")
+
+        batch = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"source": "ai-content-generator-api", "requests": str(count)}
+        )
+        print(f"Batch OpenAI {batch.id} soumis ({count} requêtes)")
+        return batch.id
+
+    async def wait(self, batch_id: str):
+        """Attend que le batch atteigne un état terminal"""
+        while True:
+            batch = await self.client.batches.retrieve(batch_id)
+            if batch.status in BATCH_TERMINAL_STATUSES:
+                return batch
+            counts = batch.request_counts
+            if counts is not None:
+                print(f"Batch {batch_id} : {batch.status} ({counts.completed}/{counts.total})")
+            await asyncio.sleep(self.poll_interval)
+
+    def _parse_line(self, line: str) -> Optional[Tuple[ContentResponse, ContentRequest]]:
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            return None
+        request = decode_custom_id(record["custom_id"])
+        message = response["body"]["choices"][0]["message"]
+        return self.generator.parse_completion(request, message.get("content"), message.get("refusal")), request
+
+    async def _save_chunk(self, batch_id: str, chunk: List[Tuple[ContentResponse, ContentRequest]],
+                          lines: int, inserted: int, failed: int) -> List[int]:
+        """Sauvegarde le morceau et la progression de l'ingestion dans une seule transaction"""
+        async with self.session_scope() as db:
+            return await DBContentRepository(db).save_many(
+                chunk,
+                before_commit=lambda session: record_ingestion(session, batch_id, lines, inserted, failed)
+            )
+
+    async def ingest(self, batch) -> dict:
+        """Parse et insère le fichier de sortie en flux, par morceaux de `chunk_size`"""
+        if not batch.output_file_id:
+            return {"batch_id": batch.id, "status": batch.status, "inserted": 0, "failed": 0}
+
+        async with self.session_scope() as db:
+            progress = await DBBatchIngestionRepository(db).get_progress(batch.id)
+        if progress is not None and progress.completed_at is not None:
+            print(f"Batch {batch.id} déjà ingéré le {progress.completed_at.isoformat()}")
+            return {"batch_id": batch.id, "status": batch.status, "inserted": 0, "failed": 0,
+                    "already_ingested": progress.inserted}
+
+        # Reprise : les lignes déjà validées sont sautées
+        skip = progress.lines if progress is not None else 0
+        inserted = progress.inserted if progress is not None else 0
+        failed = progress.failed if progress is not None else 0
+        lines = 0
+        chunk: List[Tuple[ContentResponse, ContentRequest]] = []
+
+        async with self.client.files.with_streaming_response.content(batch.output_file_id) as response:
+            async for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                lines += 1
+                if lines <= skip:
+                    continue
+                try:
+                    item = self._parse_line(line)
+                except Exception as e:
+                    print(f"Erreur ingestion batch: {str(e)}")
+                    item = None
+
+                if item is None:
+                    failed += 1
+                    continue
+
+                chunk.append(item)
+                if len(chunk) >= self.chunk_size:
+                    if not await self._save_chunk(batch.id, chunk, lines, inserted + len(chunk), failed):
+                        return self._interrupted(batch, inserted, failed)
+                    inserted += len(chunk)
+                    chunk = []
+
+        if chunk:
+            if not await self._save_chunk(batch.id, chunk, lines, inserted + len(chunk), failed):
+                return self._interrupted(batch, inserted, failed)
+            inserted += len(chunk)
+
+        async with self.session_scope() as db:
+            await DBBatchIngestionRepository(db).save_progress(batch.id, lines, inserted, failed, completed=True)
+
+        # Les requêtes en erreur côté fournisseur sont listées dans le fichier d'erreurs
+        if batch.request_counts is not None and batch.request_counts.failed:
+            failed = max(failed, batch.request_counts.failed)
+
+        return {"batch_id": batch.id, "status": batch.status, "inserted": inserted, "failed": failed}
+
+    def _interrupted(self, batch, inserted: int, failed: int) -> dict:
+        """Échec de sauvegarde : la progression validée permet de reprendre sans doublons"""
+        print(f"Ingestion du batch {batch.id} interrompue ; relancer --ingest {batch.id} pour reprendre")
+        return {"batch_id": batch.id, "status": batch.status, "inserted": inserted, "failed": failed,
+                "interrupted": True}
+
+    async def run(self, requests: Iterable[ContentRequest]) -> dict:
+        """Soumission, attente puis ingestion"""
+        batch_id = await self.submit(requests)
+        batch = await self.wait(batch_id)
+        return await self.ingest(batch)
+
+
+async def _main(args) -> None:
+    service = OpenAIBatchService(poll_interval=args.poll_interval)
+    if args.ingest:
+        batch = await service.wait(args.ingest)
+        summary = await service.ingest(batch)
+    else:
+        requests = build_matrix_requests(date.fromisoformat(args.start), date.fromisoformat(args.end))
+        if args.submit_only:
+            summary = {"batch_id": await service.submit(requests)}
+        else:
+            summary = await service.run(requests)
+    print(json.dumps(summary, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Génération en masse via l'API Batch OpenAI")
+    parser.add_argument("--start", help="Date de début (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Date de fin (YYYY-MM-DD)")
+    parser.add_argument("--submit-only", action="store_true", help="Soumettre sans attendre la fin")
+    parser.add_argument("--ingest", metavar="BATCH_ID", help="Attendre et ingérer un batch existant")
+    parser.add_argument("--poll-interval", type=float, default=BATCH_POLL_INTERVAL)
+    args = parser.parse_args()
+    if not args.ingest and not (args.start and args.end):
+        parser.error("--start et --end sont requis (ou --ingest BATCH_ID)")
+    asyncio.run(_main(args))
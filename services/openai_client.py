@@ -0,0 +1,62 @@
+import asyncio
+import os
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+# Configuration du client HTTP partagé
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "32"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", str(OPENAI_MAX_CONCURRENCY)))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+_client: Optional[AsyncOpenAI] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def build_async_openai_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """Construit un client AsyncOpenAI avec pool de connexions et timeouts"""
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+        ),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+    )
+    return AsyncOpenAI(
+        api_key=api_key or os.getenv("OPENAI_API_KEY") or "",
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+        max_retries=OPENAI_MAX_RETRIES,
+        http_client=http_client,
+    )
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Retourne le client AsyncOpenAI partagé par tout le processus"""
+    global _client
+    if _client is None:
+        _client = build_async_openai_client()
+    return _client
+
+
+def get_openai_semaphore() -> asyncio.Semaphore:
+    """Sémaphore limitant le nombre d'appels OpenAI simultanés"""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    return _semaphore
+
+
+async def close_async_openai_client() -> None:
+    """Ferme proprement le client partagé (arrêt de l'application)"""
+    global _client, _semaphore
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _semaphore = None
@@ -0,0 +1,345 @@
+"""
+Limitation de débit adaptative, reprises et disjoncteur pour les appels OpenAI.
+
+Tout est partagé par les requêtes concurrentes d'un même worker :
+- deux seaux à jetons (requêtes / minute et tokens / minute) recalés sur les
+  en-têtes `x-ratelimit-*` renvoyés par le fournisseur ;
+- une pause commune après un 429 (`retry-after`) et une réduction temporaire
+  du débit, rétabli progressivement au fil des succès ;
+- des reprises à backoff exponentiel avec jitter ;
+- un disjoncteur qui coupe les appels après une série d'erreurs serveur.
+"""
+import asyncio
+import os
+import random
+import re
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import openai
+
+from services.metrics import REGISTRY, Counter, GaugeCallback, trace_stage
+
+T = TypeVar("T")
+
+OPENAI_RESILIENCE_ENABLED = os.getenv("OPENAI_RESILIENCE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+OPENAI_RPM_LIMIT = float(os.getenv("OPENAI_RPM_LIMIT", "500"))
+OPENAI_TPM_LIMIT = float(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+OPENAI_RETRY_MAX_ATTEMPTS = int(os.getenv("OPENAI_RETRY_MAX_ATTEMPTS", "5"))
+OPENAI_RETRY_BASE_DELAY = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "0.5"))
+OPENAI_RETRY_MAX_DELAY = float(os.getenv("OPENAI_RETRY_MAX_DELAY", "20"))
+OPENAI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("OPENAI_CIRCUIT_FAILURE_THRESHOLD", "10"))
+OPENAI_CIRCUIT_RESET_TIMEOUT = float(os.getenv("OPENAI_CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Débit minimal après réductions successives, part rétablie à chaque succès et
+# intervalle minimal entre deux réductions (une rafale de 429 ne compte qu'une fois)
+RATE_FLOOR_RATIO = 0.1
+RATE_DECREASE_FACTOR = 0.7
+RATE_RECOVERY_RATIO = 0.02
+RATE_DECREASE_INTERVAL = 1.0
+
+OPENAI_RETRIES = REGISTRY.register(Counter(
+    "openai_retries_total", "Appels OpenAI relancés après une erreur transitoire", ("reason",)
+))
+OPENAI_CIRCUIT_REJECTIONS = REGISTRY.register(Counter(
+    "openai_circuit_rejections_total", "Appels refusés sans tentative (disjoncteur ouvert)"
+))
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Convertit '20ms', '1.5s' ou '6m0s' (en-têtes x-ratelimit-reset-*) en secondes"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Délai imposé par le fournisseur (retry-after-ms, retry-after ou reset)"""
+    if headers is None:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return max(
+        parse_reset_duration(headers.get("x-ratelimit-reset-requests")) or 0.0,
+        parse_reset_duration(headers.get("x-ratelimit-reset-tokens")) or 0.0
+    ) or None
+
+
+class TokenBucket:
+    """Seau à jetons par minute ; une réservation peut rendre le niveau négatif"""
+
+    def __init__(self, per_minute: float):
+        self.limit = per_minute
+        self.per_minute = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+        self._slowed_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.per_minute, self.level + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Réserve `amount` jetons ; retourne l'attente (secondes) avant de les consommer"""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        self.level -= min(amount, self.per_minute)
+        return -self.level * 60.0 / self.per_minute if self.level < 0 else 0.0
+
+    def adjust(self, amount: float) -> None:
+        """Corrige une réservation (ex: tokens réellement consommés)"""
+        if self.enabled:
+            self.level = min(self.per_minute, self.level - amount)
+
+    def sync(self, limit: Optional[float], remaining: Optional[float]) -> None:
+        """Recale la capacité et le niveau sur les valeurs annoncées par le fournisseur"""
+        if limit and limit != self.limit:
+            ratio = self.per_minute / self.limit if self.limit else 1.0
+            self.limit = limit
+            self.per_minute = limit * ratio
+        if remaining is not None and self.enabled:
+            self._refill(time.monotonic())
+            self.level = min(self.level, remaining)
+
+    def slow_down(self) -> None:
+        now = time.monotonic()
+        if self.enabled and now - self._slowed_at >= RATE_DECREASE_INTERVAL:
+            self._slowed_at = now
+            self.per_minute = max(self.limit * RATE_FLOOR_RATIO, self.per_minute * RATE_DECREASE_FACTOR)
+            self.level = min(self.level, self.per_minute)
+
+    def recover(self) -> None:
+        if self.enabled and self.per_minute < self.limit:
+            self.per_minute = min(self.limit, self.per_minute + self.limit * RATE_RECOVERY_RATIO)
+
+
+class AdaptiveRateLimiter:
+    """Limiteur requêtes + tokens par minute, adapté aux en-têtes de réponse"""
+
+    def __init__(self, requests_per_minute: float = OPENAI_RPM_LIMIT, tokens_per_minute: float = OPENAI_TPM_LIMIT):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        while True:
+            now = time.monotonic()
+            if self.blocked_until > now:
+                # Pause commune imposée par un 429
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            wait = max(self.requests.reserve(1, now), self.tokens.reserve(estimated_tokens, now))
+            break
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        if actual_tokens is not None:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def update_from_headers(self, headers) -> None:
+        if headers is None:
+            return
+        self.requests.sync(_float_header(headers, "x-ratelimit-limit-requests"),
+                           _float_header(headers, "x-ratelimit-remaining-requests"))
+        self.tokens.sync(_float_header(headers, "x-ratelimit-limit-tokens"),
+                         _float_header(headers, "x-ratelimit-remaining-tokens"))
+        self.requests.recover()
+        self.tokens.recover()
+
+    def on_rate_limited(self, headers) -> float:
+        """Après un 429 : pause partagée et débit réduit ; retourne la pause"""
+        delay = retry_after_seconds(headers) or OPENAI_RETRY_BASE_DELAY
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        self.requests.slow_down()
+        self.tokens.slow_down()
+        return delay
+
+
+def _float_header(headers, name: str) -> Optional[float]:
+    try:
+        value = headers.get(name)
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class CircuitOpenError(Exception):
+    """Le disjoncteur est ouvert : l'appel n'a pas été tenté"""
+
+
+class CircuitBreaker:
+    """Disjoncteur fermé / ouvert / semi-ouvert sur les erreurs serveur"""
+
+    def __init__(self, failure_threshold: int = OPENAI_CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = OPENAI_CIRCUIT_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """Lève CircuitOpenError si l'appel est refusé ; True si l'appel est l'essai du semi-ouvert"""
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_running):
+            OPENAI_CIRCUIT_REJECTIONS.inc()
+            raise CircuitOpenError("Disjoncteur OpenAI ouvert : appels suspendus")
+        if state == "half_open":
+            # Un seul appel d'essai à la fois
+            self._trial_running = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                print(f"Disjoncteur OpenAI ouvert après {self.failures} erreurs")
+            self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Fin d'un appel d'essai sans verdict (erreur client, 429, annulation)"""
+        self._trial_running = False
+
+
+class RetryPolicy:
+    """Backoff exponentiel avec jitter complet, borné par `max_delay`"""
+
+    def __init__(self, max_attempts: int = OPENAI_RETRY_MAX_ATTEMPTS,
+                 base_delay: float = OPENAI_RETRY_BASE_DELAY,
+                 max_delay: float = OPENAI_RETRY_MAX_DELAY):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int, minimum: float = 0.0) -> float:
+        return max(minimum, random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+
+def _is_server_error(error: Exception) -> bool:
+    return isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError))
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    # insufficient_quota est aussi un 429, mais ne se résout pas en attendant
+    return isinstance(error, openai.RateLimitError) and getattr(error, "code", None) != "insufficient_quota"
+
+
+class ResilientOpenAICaller:
+    """Exécute un appel OpenAI derrière le limiteur, les reprises et le disjoncteur (Single Responsibility)"""
+
+    def __init__(self,
+                 limiter: Optional[AdaptiveRateLimiter] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 enabled: bool = OPENAI_RESILIENCE_ENABLED):
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.enabled = enabled
+
+    async def call(self, fn: Callable[[], Awaitable[T]], estimated_tokens: int = 0) -> T:
+        """
+        `fn` effectue une tentative et retourne la réponse brute (`with_raw_response`)
+        pour que ses en-têtes recalent le limiteur.
+        """
+        if not self.enabled:
+            return await fn()
+
+        attempt = 0
+        while True:
+            trial = self.breaker.before_call()
+            try:
+                with trace_stage("openai_rate_limit"):
+                    await self.limiter.acquire(estimated_tokens)
+                response = await fn()
+            except Exception as e:
+                backoff = self._on_error(e, trial)
+                attempt += 1
+                if backoff is None or attempt >= self.retry_policy.max_attempts:
+                    raise
+                OPENAI_RETRIES.inc(reason="rate_limit" if _is_rate_limit(e) else "server_error")
+                await asyncio.sleep(backoff(attempt))
+                continue
+            except BaseException:
+                # Annulation (client déconnecté, arrêt) : l'essai se termine sans verdict,
+                # sinon le disjoncteur resterait semi-ouvert et refuserait tout appel
+                if trial:
+                    self.breaker.release_trial()
+                raise
+
+            self.breaker.record_success()
+            self.limiter.update_from_headers(getattr(response, "headers", None))
+            return response
+
+    def _on_error(self, error: Exception, trial: bool = False) -> Optional[Callable[[int], float]]:
+        """Met à jour limiteur et disjoncteur ; retourne le calcul du délai si l'erreur est transitoire"""
+        if _is_rate_limit(error):
+            if trial:
+                self.breaker.release_trial()
+            pause = self.limiter.on_rate_limited(error.response.headers)
+            return lambda attempt: self.retry_policy.backoff(attempt, pause)
+        if _is_server_error(error):
+            self.breaker.record_failure()
+            return lambda attempt: self.retry_policy.backoff(attempt)
+        if trial:
+            self.breaker.release_trial()
+        return None
+
+
+_caller: Optional[ResilientOpenAICaller] = None
+
+
+def get_openai_caller() -> ResilientOpenAICaller:
+    """Limiteur, reprises et disjoncteur partagés par tout le processus"""
+    global _caller
+    if _caller is None:
+        _caller = ResilientOpenAICaller()
+    return _caller
+
+
+def _collect_resilience():
+    caller = get_openai_caller()
+    yield ("requests_per_minute",), caller.limiter.requests.per_minute
+    yield ("tokens_per_minute",), caller.limiter.tokens.per_minute
+    yield ("circuit_open",), 0 if caller.breaker.state == "closed" else 1
+
+
+REGISTRY.register(GaugeCallback(
+    "openai_limiter", "Débit courant du limiteur OpenAI et état du disjoncteur", ("field",), _collect_resilience
+))
@@ -0,0 +1,201 @@
+"""
+Templates de prompt versionnés (dossier `prompts/`).
+
+Les fichiers sont lus et compilés une seule fois : pour chaque couple
+(cible, prospect_type) et chaque variante, les parties fixes et les variables
+connues au chargement (`$cible`, `$prospect_type`) sont déjà assemblées ; le
+rendu d'une requête ne fait plus que concaténer les segments autour de `$date`.
+"""
+import hashlib
+import os
+import unicodedata
+import zlib
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Optional, Tuple
+
+from models.schemas import CibleEnum, ContentRequest, ProspectTypeEnum
+from services.metrics import REGISTRY, Counter
+
+PROMPT_TEMPLATES_DIR = Path(os.getenv("PROMPT_TEMPLATES_DIR", Path(__file__).resolve().parent.parent / "prompts"))
+# Répartition A/B des variantes : "default:90,concise:10" (variante absente = non servie)
+PROMPT_VARIANT_WEIGHTS = os.getenv("PROMPT_VARIANT_WEIGHTS", "")
+
+DEFAULT_KEY = "default"
+DEFAULT_VARIANT = "default"
+SYSTEM_TEMPLATE = "system.txt"
+
+PROMPT_RENDERS = REGISTRY.register(Counter(
+    "prompt_renders_total", "Prompts rendus par template et variante", ("template", "variant")
+))
+
+
+def prospect_slug(prospect_type: ProspectTypeEnum) -> str:
+    """'Hautement qualifié' -> 'hautement-qualifie' (nom de fichier)"""
+    ascii_value = unicodedata.normalize("NFKD", prospect_type.value).encode("ascii", "ignore").decode("ascii")
+    return ascii_value.lower().replace(" ", "-")
+
+
+def parse_variant_weights(value: str) -> Dict[str, int]:
+    weights = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition(":")
+        weights[name.strip()] = int(weight or 1)
+    return weights
+
+
+def compile_segments(text: str, static: Dict[str, str]) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Découpe le template en segments littéraux et variables dynamiques.
+
+    Les variables de `static` sont substituées dès la compilation ; le résultat
+    vérifie `render = literals[0] + v0 + literals[1] + v1 + ... + literals[-1]`.
+    """
+    literals: List[str] = []
+    variables: List[str] = []
+    current: List[str] = []
+    position = 0
+
+    for match in Template.pattern.finditer(text):
+        current.append(text[position:match.start()])
+        position = match.end()
+        if match.group("escaped") is not None:
+            current.append("$")
+            continue
+        name = match.group("named") or match.group("braced")
+        if name is None:
+            raise ValueError(f"Placeholder invalide dans un template de prompt : {match.group(0)!r}")
+        if name in static:
+            current.append(static[name])
+        else:
+            literals.append("".join(current))
+            variables.append(name)
+            current = []
+
+    current.append(text[position:])
+    literals.append("".join(current))
+    return tuple(literals), tuple(variables)
+
+
+class CompiledPrompt:
+    """Prompt précompilé pour un couple (cible, prospect_type) et une variante"""
+
+    __slots__ = ("key", "variant", "version", "literals", "variables", "label_values")
+
+    def __init__(self, key: str, variant: str, version: str, literals: Tuple[str, ...], variables: Tuple[str, ...]):
+        self.key = key
+        self.variant = variant
+        self.version = version
+        self.literals = literals
+        self.variables = variables
+        self.label_values = (key, variant)
+
+    def render(self, values: Dict[str, str]) -> str:
+        if not self.variables:
+            return self.literals[0]
+        if len(self.variables) == 1:
+            return self.literals[0] + values[self.variables[0]] + self.literals[1]
+        parts = [self.literals[0]]
+        for variable, literal in zip(self.variables, self.literals[1:]):
+            parts.append(values[variable])
+            parts.append(literal)
+        return "".join(parts)
+
+
+class PromptTemplateRegistry:
+    """Templates compilés au chargement et sélection A/B déterministe (Single Responsibility)"""
+
+    def __init__(self, directory: Path = PROMPT_TEMPLATES_DIR, variant_weights: str = PROMPT_VARIANT_WEIGHTS):
+        self.directory = Path(directory)
+        self.system_prompt = (self.directory / SYSTEM_TEMPLATE).read_text(encoding="utf-8").strip()
+        self.system_message = {"role": "system", "content": self.system_prompt}
+        self.weights = parse_variant_weights(variant_weights)
+
+        # Textes bruts par clé puis variante
+        sources: Dict[str, Dict[str, str]] = {}
+        for path in sorted(self.directory.glob("*.txt")):
+            if path.name == SYSTEM_TEMPLATE:
+                continue
+            key, _, variant = path.stem.partition("@")
+            sources.setdefault(key, {})[variant or DEFAULT_VARIANT] = path.read_text(encoding="utf-8").strip()
+        if DEFAULT_KEY not in sources:
+            raise ValueError(f"Template '{DEFAULT_KEY}.txt' introuvable dans {self.directory}")
+
+        # Une table par (cible, prospect_type) : liste de (seuil cumulé, prompt compilé)
+        self._compiled: Dict[Tuple[CibleEnum, ProspectTypeEnum], List[Tuple[int, CompiledPrompt]]] = {}
+        for cible in CibleEnum:
+            for prospect_type in ProspectTypeEnum:
+                key = self._resolve_key(sources, cible, prospect_type)
+                static = {"cible": cible.value, "prospect_type": prospect_type.value}
+                table = []
+                threshold = 0
+                for variant, weight in self._variant_weights(sources[key]):
+                    text = sources[key][variant]
+                    literals, variables = compile_segments(text, static)
+                    threshold += weight
+                    table.append((threshold, CompiledPrompt(key, variant, self._version(key, variant, text), literals, variables)))
+                self._compiled[(cible, prospect_type)] = table
+
+    @staticmethod
+    def _resolve_key(sources: Dict[str, Dict[str, str]], cible: CibleEnum, prospect_type: ProspectTypeEnum) -> str:
+        for key in (f"{cible.value}--{prospect_slug(prospect_type)}", cible.value):
+            if key in sources:
+                return key
+        return DEFAULT_KEY
+
+    def _variant_weights(self, variants: Dict[str, str]) -> List[Tuple[str, int]]:
+        """Variantes servies : celles pondérées dans PROMPT_VARIANT_WEIGHTS, sinon la variante par défaut"""
+        weighted = [(variant, self.weights[variant]) for variant in sorted(variants)
+                    if self.weights.get(variant, 0) > 0]
+        if weighted:
+            return weighted
+        return [(DEFAULT_VARIANT if DEFAULT_VARIANT in variants else sorted(variants)[0], 1)]
+
+    def _version(self, key: str, variant: str, text: str) -> str:
+        digest = hashlib.sha256(f"{self.system_prompt}\x00{text}".encode("utf-8")).hexdigest()[:12]
+        return f"{key}@{variant}:{digest}"
+
+    def select(self, request: ContentRequest) -> CompiledPrompt:
+        """
+        Variante déterministe pour une requête : le même (cible, prospect, date)
+        obtient toujours la même variante, ce qui garde le cache et les reprises cohérents.
+        """
+        table = self._compiled[(request.cible, request.prospect_type)]
+        if len(table) == 1:
+            return table[0][1]
+        seed = f"{request.cible.value}|{request.prospect_type.value}|{request.date}".encode("utf-8")
+        bucket = zlib.crc32(seed) % table[-1][0]
+        for threshold, prompt in table:
+            if bucket < threshold:
+                return prompt
+        return table[-1][1]
+
+    def render(self, request: ContentRequest) -> Tuple[List[dict], str]:
+        """Messages chat (système + utilisateur) et version du prompt"""
+        prompt = self.select(request)
+        PROMPT_RENDERS.inc_values(prompt.label_values)
+        user_prompt = prompt.render({"date": str(request.date)})
+        return [self.system_message, {"role": "user", "content": user_prompt}], prompt.version
+
+    def version_for(self, request: ContentRequest) -> str:
+        return self.select(request).version
+
+    def versions(self) -> Dict[str, List[str]]:
+        """Versions servies par (cible, prospect_type), pour le diagnostic"""
+        return {
+            f"{cible.value}|{prospect_type.value}": [prompt.version for _, prompt in table]
+            for (cible, prospect_type), table in self._compiled.items()
+        }
+
+
+_prompt_registry: Optional[PromptTemplateRegistry] = None
+
+
+def get_prompt_registry() -> PromptTemplateRegistry:
+    """Templates chargés une fois par processus (au démarrage de l'application)"""
+    global _prompt_registry
+    if _prompt_registry is None:
+        _prompt_registry = PromptTemplateRegistry()
+    return _prompt_registry
@@ -0,0 +1,85 @@
+"""
+Analyse des réponses du modèle.
+
+Le texte est validé directement en `GeneratedContentFields` par le parseur JSON
+de pydantic-core (Rust, sans passer par un dict Python). Avec les sorties
+structurées (`response_format` JSON schema strict), le modèle ne peut plus
+renvoyer de balises de code ni de champs manquants : le nettoyage ne sert plus
+que pour les modèles qui ne les supportent pas.
+"""
+import os
+from typing import Optional
+
+from pydantic import ValidationError
+
+from models.schemas import GeneratedContentFields
+from services.metrics import REGISTRY, Counter
+
+# Sorties structurées (gpt-4o-mini, gpt-4o et suivants) ; false pour les anciens modèles
+OPENAI_STRUCTURED_OUTPUTS = os.getenv("OPENAI_STRUCTURED_OUTPUTS", "true").lower() == "true"
+
+STRUCTURED_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "editorial_content",
+        "strict": True,
+        "schema": GeneratedContentFields.model_json_schema(),
+    },
+}
+
+# ok, fenced (JSON valide après nettoyage), invalid_json, schema_mismatch, refusal, empty
+CONTENT_PARSE_RESULTS = REGISTRY.register(Counter(
+    "content_parse_total", "Réponses du modèle analysées, par résultat", ("outcome",)
+))
+
+
+class MalformedCompletionError(ValueError):
+    """Réponse du modèle inexploitable ; `reason` reprend l'étiquette de content_parse_total"""
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(f"Réponse du modèle invalide ({reason}){': ' + detail if detail else ''}")
+        self.reason = reason
+
+
+def strip_code_fences(text: str) -> str:
+    """Retire un bloc ```json ... ``` et le texte autour de l'objet JSON"""
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1 or end < start:
+        return text
+    return text[start:end + 1]
+
+
+def _failure_reason(error: ValidationError) -> str:
+    return "invalid_json" if any(item["type"] == "json_invalid" for item in error.errors()) else "schema_mismatch"
+
+
+def parse_generated_fields(content: Optional[str], refusal: Optional[str] = None) -> GeneratedContentFields:
+    """Valide la réponse du modèle ; lève MalformedCompletionError si elle est inexploitable"""
+    if refusal:
+        CONTENT_PARSE_RESULTS.inc(outcome="refusal")
+        raise MalformedCompletionError("refusal", refusal)
+    if not content or content.isspace():
+        CONTENT_PARSE_RESULTS.inc(outcome="empty")
+        raise MalformedCompletionError("empty")
+
+    try:
+        fields = GeneratedContentFields.model_validate_json(content)
+        CONTENT_PARSE_RESULTS.inc(outcome="ok")
+        return fields
+    except ValidationError as e:
+        error = e
+
+    # Sans sorties structurées : balises de code ou texte autour du JSON
+    cleaned = strip_code_fences(content)
+    if cleaned != content:
+        try:
+            fields = GeneratedContentFields.model_validate_json(cleaned)
+            CONTENT_PARSE_RESULTS.inc(outcome="fenced")
+            return fields
+        except ValidationError as e:
+            error = e
+
+    reason = _failure_reason(error)
+    CONTENT_PARSE_RESULTS.inc(outcome=reason)
+    raise MalformedCompletionError(reason, str(error.errors()[0]["msg"]))
@@ -0,0 +1,43 @@
+"""
+Base SQLite temporaire pour les tests des repositories et services.
+
+DATABASE_URL est fixée avant tout import de `database.connexion` : le moteur
+et `session_scope` de l'application pointent sur cette base. Le schéma est
+créé une fois par les migrations (alembic upgrade head), puis les tables sont
+vidées après chaque test.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_DB_DIR = tempfile.mkdtemp(prefix="content_api_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'tests.db')}"
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+
+@pytest.fixture(scope="session")
+def migrated_database():
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=ROOT, check=True, capture_output=True)
+    yield os.environ["DATABASE_URL"]
+
+
+@pytest.fixture
+def db(migrated_database):
+    """Session synchrone sur la base migrée ; toutes les tables sont vidées après le test"""
+    from database.connexion import Base, SessionLocal, engine
+    from repository import conn_repo
+    import database.models  # noqa: F401
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        with engine.begin() as connection:
+            for table in reversed(Base.metadata.sorted_tables):
+                connection.execute(table.delete())
+        conn_repo._count_cache.clear()
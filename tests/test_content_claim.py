@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from datetime import date
+
+from models.schemas import ContentRequest, ContentResponse
+from repository.conn_repo import DBContentRepository
+
+
+def _save(db, count: int, cible: str = "Mail", day: date = date(2025, 3, 3)):
+    items = []
+    for index in range(count):
+        request = ContentRequest(cible=cible, prospect_type="Qualifié", date=day)
+        content = ContentResponse(
+            theme_general="thème", theme_hebdo="semaine", texte=f"{cible} {index}",
+            cible=cible, prospect_type="Qualifié", generation_date=day, model="gpt-test", prompt_version="v2"
+        )
+        items.append((content, request))
+    return asyncio.run(DBContentRepository(db).save_many(items))
+
+
+def test_claim_returns_oldest_first_and_marks_used(db):
+    ids = _save(db, 3)
+    repository = DBContentRepository(db)
+
+    rows = asyncio.run(repository.claim_unused_content(cible="Mail", limit=2))
+    assert [row.id for row in rows] == ids[:2]
+    assert {(row.model, row.prompt_version) for row in rows} == {("gpt-test", "v2")}
+
+    remaining = asyncio.run(repository.claim_unused_content(cible="Mail", limit=5))
+    assert [row.id for row in remaining] == ids[2:]
+    assert asyncio.run(repository.claim_unused_content(cible="Mail")) == []
+
+
+def test_claim_respects_filters(db):
+    _save(db, 2, cible="Mail")
+    linkedin = _save(db, 2, cible="LinkedIn", day=date(2025, 4, 7))
+    repository = DBContentRepository(db)
+
+    rows = asyncio.run(repository.claim_unused_content(start_date="2025-04-01", limit=10))
+    assert sorted(row.id for row in rows) == sorted(linkedin)
+    # Contenus sans origine : jamais servis au stock
+    assert asyncio.run(repository.claim_unused_content(source="pool", limit=10)) == []
+
+
+def test_concurrent_claims_never_share_a_row(db):
+    from database.connexion import SessionLocal
+
+    ids = _save(db, 40)
+    claimed = []
+    errors = []
+    start = threading.Barrier(8)
+
+    def publisher():
+        session = SessionLocal()
+        try:
+            start.wait()
+            while True:
+                rows = asyncio.run(DBContentRepository(session).claim_unused_content(cible="Mail", limit=3))
+                if not rows:
+                    return
+                claimed.extend(row.id for row in rows)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=publisher) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(claimed) == sorted(ids)
@@ -0,0 +1,79 @@
+import asyncio
+from datetime import date
+
+from models.schemas import CibleEnum, ContentRequest, ContentResponse, ProspectTypeEnum
+from repository.conn_repo import DBContentRepository
+from services.content_ai import ContentGeneratorInterface
+from services.content_pool import ContentPoolScheduler, fetch_from_pool
+
+TODAY = date(2025, 6, 11)
+MONDAY = date(2025, 6, 9)
+COMBINATIONS = len(CibleEnum) * len(ProspectTypeEnum)
+
+
+class _FakeGenerator(ContentGeneratorInterface):
+    """Contenus distincts ; contenus de secours pour les cibles de `fallback_cibles`"""
+
+    def __init__(self, fallback_cibles=()):
+        self.fallback_cibles = set(fallback_cibles)
+        self.calls = 0
+
+    async def generate_content(self, request):
+        self.calls += 1
+        return ContentResponse(
+            theme_general="thème", theme_hebdo="semaine", texte=f"stock {self.calls}",
+            cible=request.cible, prospect_type=request.prospect_type, generation_date=request.date,
+            model="gpt-test", prompt_version="v3", fallback=request.cible.value in self.fallback_cibles
+        )
+
+
+def _scheduler(generator, **kwargs) -> ContentPoolScheduler:
+    return ContentPoolScheduler(generator=generator, target=2, weeks_ahead=0, max_per_run=1000, **kwargs)
+
+
+def _request(cible: str = "Mail", day: date = TODAY) -> ContentRequest:
+    return ContentRequest(cible=cible, prospect_type="Qualifié", date=day)
+
+
+def test_build_requests_fills_combinations_evenly():
+    scheduler = _scheduler(_FakeGenerator())
+    scheduler.max_per_run = 3
+    levels = {("Mail", "Qualifié", MONDAY): 0, ("LinkedIn", "Qualifié", MONDAY): 1}
+
+    requests = scheduler.build_requests(levels)
+    assert [request.cible.value for request in requests] == ["LinkedIn", "Mail", "Mail"]
+
+
+def test_refill_reaches_the_target_once(db):
+    scheduler = _scheduler(_FakeGenerator())
+
+    assert asyncio.run(scheduler.refill(TODAY)) == 2 * COMBINATIONS
+    assert asyncio.run(scheduler.refill(TODAY)) == 0
+    assert set(asyncio.run(scheduler.pool_levels(TODAY)).values()) == {2}
+
+
+def test_refill_never_stores_fallback_content(db):
+    scheduler = _scheduler(_FakeGenerator(fallback_cibles={"Mail"}))
+
+    assert asyncio.run(scheduler.refill(TODAY)) == 2 * (COMBINATIONS - len(ProspectTypeEnum))
+    assert asyncio.run(fetch_from_pool(DBContentRepository(db), _request("Mail"))) is None
+
+
+def test_fetch_claims_only_pool_rows_with_their_metadata(db):
+    repository = DBContentRepository(db)
+    # Génération à la demande pour la même semaine : réservée aux publieurs
+    on_demand = ContentResponse(
+        theme_general="thème", theme_hebdo="semaine", texte="à la demande",
+        cible="Mail", prospect_type="Qualifié", generation_date=MONDAY
+    )
+    asyncio.run(repository.save_many([(on_demand, _request("Mail", MONDAY))]))
+    assert asyncio.run(fetch_from_pool(repository, _request())) is None
+
+    asyncio.run(_scheduler(_FakeGenerator()).refill(TODAY))
+    content = asyncio.run(fetch_from_pool(repository, _request()))
+    assert content.texte.startswith("stock")
+    assert (content.used, content.model, content.prompt_version) == (1, "gpt-test", "v3")
+    assert asyncio.run(fetch_from_pool(repository, _request())) is not None
+    assert asyncio.run(fetch_from_pool(repository, _request())) is None
+    # Autre semaine : hors du stock
+    assert asyncio.run(fetch_from_pool(repository, _request(day=date(2025, 6, 16)))) is None
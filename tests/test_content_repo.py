@@ -0,0 +1,72 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from models.schemas import ContentRequest, ContentResponse
+from repository.content_repo import InMemoryContentRepository
+
+DATES = [date(2025, 1, 6), date(2025, 1, 15), date(2025, 2, 3), date(2025, 3, 10)]
+COMBINATIONS = [("LinkedIn", "Qualifié"), ("Mail", "Peu qualifié"), ("Mail", "Qualifié")]
+
+FILTERS = [
+    {},
+    {"cible": "Mail"},
+    {"prospect_type": "Qualifié"},
+    {"cible": "Mail", "prospect_type": "Qualifié"},
+    {"start_date": "2025-01-15"},
+    {"end_date": "2025-02-03"},
+    {"start_date": "2025-01-07", "end_date": "2025-02-28"},
+    {"start_date": date(2025, 2, 1), "end_date": date(2025, 3, 10), "cible": "LinkedIn"},
+    {"start_date": "2025-04-01"},
+]
+
+
+def _items():
+    items = []
+    for day in DATES:
+        for cible, prospect_type in COMBINATIONS:
+            request = ContentRequest(cible=cible, prospect_type=prospect_type, date=day)
+            content = ContentResponse(
+                theme_general="thème", theme_hebdo="semaine", texte=f"{cible} {prospect_type} {day}",
+                cible=cible, prospect_type=prospect_type, generation_date=day
+            )
+            items.append((content, request))
+    return items
+
+
+def _keys(rows):
+    return sorted((row.cible, row.prospect_type, row.texte) for row in rows)
+
+
+def test_in_memory_filters_accept_iso_strings():
+    repository = InMemoryContentRepository()
+    asyncio.run(repository.save_many(_items()))
+
+    rows = asyncio.run(repository.get_all_content(start_date="2025-01-15", end_date="2025-02-03"))
+    assert {row.generation_date for row in rows} == {date(2025, 1, 15), date(2025, 2, 3)}
+    # Du plus récent au plus ancien
+    assert [row.id for row in rows] == sorted((row.id for row in rows), reverse=True)
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_in_memory_filters_match_db_repository(db, filters):
+    from repository.conn_repo import DBContentRepository
+
+    memory = InMemoryContentRepository()
+    asyncio.run(memory.save_many(_items()))
+    asyncio.run(DBContentRepository(db).save_many(_items()))
+
+    expected = asyncio.run(DBContentRepository(db).get_all_content(**filters))
+    assert _keys(asyncio.run(memory.get_all_content(**filters))) == _keys(expected)
+
+
+def test_in_memory_mark_as_used_leaves_unused_index():
+    repository = InMemoryContentRepository()
+    ids = asyncio.run(repository.save_many(_items()[:3]))
+
+    assert asyncio.run(repository.mark_as_used(ids[1]))
+    assert asyncio.run(repository.mark_as_used(ids[1]))
+    assert not asyncio.run(repository.mark_as_used(999))
+    assert [content.texte for content in asyncio.run(repository.get_unused_content())] == \
+        [_items()[0][0].texte, _items()[2][0].texte]
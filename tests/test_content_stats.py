@@ -0,0 +1,67 @@
+import asyncio
+from datetime import date
+
+from models.schemas import ContentRequest, ContentResponse
+from repository.conn_repo import DBContentRepository
+from repository.stats_repo import DBStatsRepository, week_start
+
+
+def _item(cible: str, prospect_type: str, day: date, texte: str):
+    request = ContentRequest(cible=cible, prospect_type=prospect_type, date=day)
+    content = ContentResponse(
+        theme_general="thème", theme_hebdo="semaine", texte=texte,
+        cible=cible, prospect_type=prospect_type, generation_date=day
+    )
+    return content, request
+
+
+def _stats(db):
+    return [tuple(row) for row in asyncio.run(DBStatsRepository(db).get_stats())]
+
+
+def test_week_start_is_the_iso_monday():
+    assert week_start(date(2025, 3, 9)) == date(2025, 3, 3)
+    assert week_start("2025-03-03T10:00:00") == date(2025, 3, 3)
+
+
+def test_incremental_stats_match_rebuild(db):
+    contents = DBContentRepository(db)
+    ids = asyncio.run(contents.save_many([
+        _item("Mail", "Qualifié", date(2025, 3, 3), "a"),
+        _item("Mail", "Qualifié", date(2025, 3, 7), "b"),
+        _item("LinkedIn", "Peu qualifié", date(2025, 3, 10), "c"),
+    ]))
+    assert asyncio.run(contents.save_content_with_request(*_item("Mail", "Qualifié", date(2025, 3, 5), "d")))
+
+    assert _stats(db) == [
+        ("Mail", "Qualifié", date(2025, 3, 3), 0, 3),
+        ("LinkedIn", "Peu qualifié", date(2025, 3, 10), 0, 1),
+    ]
+
+    assert asyncio.run(contents.mark_as_used(ids[0]))
+    # Déjà utilisé : aucun second décompte
+    assert asyncio.run(contents.mark_as_used(ids[0]))
+    asyncio.run(contents.claim_unused_content(cible="LinkedIn"))
+
+    incremental = _stats(db)
+    assert incremental == [
+        ("Mail", "Qualifié", date(2025, 3, 3), 0, 2),
+        ("Mail", "Qualifié", date(2025, 3, 3), 1, 1),
+        ("LinkedIn", "Peu qualifié", date(2025, 3, 10), 1, 1),
+    ]
+
+    assert asyncio.run(DBStatsRepository(db).rebuild()) == 3
+    assert _stats(db) == incremental
+
+
+def test_get_stats_filters(db):
+    asyncio.run(DBContentRepository(db).save_many([
+        _item("Mail", "Qualifié", date(2025, 3, 3), "a"),
+        _item("Mail", "Qualifié", date(2025, 3, 12), "b"),
+    ]))
+    repository = DBStatsRepository(db)
+
+    # Semaines qui recoupent l'intervalle
+    rows = asyncio.run(repository.get_stats(start_date=date(2025, 3, 5), end_date=date(2025, 3, 9)))
+    assert [row.week_start for row in rows] == [date(2025, 3, 3)]
+    assert asyncio.run(repository.get_stats(used=1)) == []
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import os
+from datetime import date
+
+from models.schemas import ContentRequest, ContentResponse
+from repository.content_repo import FileContentRepository
+
+
+def _items(count: int):
+    items = []
+    for index in range(count):
+        request = ContentRequest(cible="Mail", prospect_type="Qualifié", date=date(2025, 5, 5))
+        content = ContentResponse(
+            theme_general="thème", theme_hebdo="semaine", texte=f"texte é {index}",
+            cible="Mail", prospect_type="Qualifié", generation_date=date(2025, 5, 5)
+        )
+        items.append((content, request))
+    return items
+
+
+def _unused_texts(repository):
+    return [content.texte for content in asyncio.run(repository.get_unused_content())]
+
+
+def test_save_and_reopen_round_trip(tmp_path):
+    path = str(tmp_path / "store.json")
+    repository = FileContentRepository(path, fsync_interval=0)
+
+    assert asyncio.run(repository.save_many(_items(3))) == [1, 2, 3]
+    assert asyncio.run(repository.save_content_with_request(*_items(4)[3]))
+
+    reopened = FileContentRepository(path)
+    record = asyncio.run(reopened.get_content(4))
+    assert (record["id"], record["texte"], record["used"]) == (4, "texte é 3", 0)
+    assert asyncio.run(reopened.get_content(5)) is None
+    assert _unused_texts(reopened) == [f"texte é {index}" for index in range(4)]
+
+
+def test_mark_as_used(tmp_path):
+    repository = FileContentRepository(str(tmp_path / "store.json"), compact_every=0)
+    asyncio.run(repository.save_many(_items(3)))
+
+    assert asyncio.run(repository.mark_as_used(2))
+    assert asyncio.run(repository.mark_as_used(2))
+    assert not asyncio.run(repository.mark_as_used(4))
+    assert asyncio.run(repository.get_content(2))["used"] == 1
+    assert _unused_texts(repository) == ["texte é 0", "texte é 2"]
+
+
+def test_compact_lets_the_journal_rebuild_the_index(tmp_path):
+    path = str(tmp_path / "store.json")
+    repository = FileContentRepository(path, compact_every=0)
+    asyncio.run(repository.save_many(_items(3)))
+    asyncio.run(repository.mark_as_used(1))
+    asyncio.run(repository.mark_as_used(3))
+
+    assert asyncio.run(repository.compact()) == 2
+    assert asyncio.run(repository.compact()) == 0
+
+    # Index et indicateurs perdus : reconstruits depuis le journal seul
+    os.remove(path + ".idx")
+    os.remove(path + ".used")
+    assert _unused_texts(FileContentRepository(path)) == ["texte é 1"]
+
+
+def test_mark_as_used_compacts_periodically(tmp_path):
+    path = str(tmp_path / "store.json")
+    repository = FileContentRepository(path, compact_every=2)
+    asyncio.run(repository.save_many(_items(3)))
+    asyncio.run(repository.mark_as_used(1))
+    asyncio.run(repository.mark_as_used(2))
+
+    with open(path, "rb") as data_file:
+        assert [json.loads(line)["used"] for line in data_file] == [1, 1, 0]
+
+
+def test_legacy_json_file_is_converted_on_open(tmp_path):
+    path = tmp_path / "store.json"
+    fields = {"theme_general": "t", "theme_hebdo": "h", "cible": "Mail", "prospect_type": "Qualifié",
+              "generation_date": "2025-05-05"}
+    legacy = [{**fields, "texte": "ancien 1", "used": 1}, {**fields, "texte": "ancien 2", "used": 0}]
+    path.write_text(json.dumps(legacy, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    repository = FileContentRepository(str(path))
+    assert asyncio.run(repository.get_content(1))["texte"] == "ancien 1"
+    assert _unused_texts(repository) == ["ancien 2"]
+    # Les ids continuent après les contenus convertis
+    assert asyncio.run(repository.save_many(_items(1))) == [3]
+
+
+def test_interrupted_append_is_truncated(tmp_path):
+    path = str(tmp_path / "store.json")
+    repository = FileContentRepository(path)
+    asyncio.run(repository.save_many(_items(2)))
+    # Arrêt après l'écriture du journal, avant celle de l'index
+    with open(path, "ab") as data_file:
+        data_file.write(b'{"used":0,"texte":"incomp')
+
+    assert asyncio.run(repository.save_many(_items(1))) == [3]
+    assert len(_unused_texts(FileContentRepository(path))) == 3
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import date
+
+from models.schemas import ContentResponse, GenerationJobRequest
+from repository.job_repo import DBJobRepository
+from services.content_ai import ContentGeneratorInterface
+from services.generation_jobs import GenerationJobRunner
+
+JOB = GenerationJobRequest(
+    start_date=date(2025, 9, 1), end_date=date(2025, 9, 8),
+    cibles=["LinkedIn", "Mail"], prospect_types=["Qualifié"]
+)
+
+
+class _FakeGenerator(ContentGeneratorInterface):
+    """Générateur déterministe ; `failures` premiers appels en erreur"""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+
+    async def generate_content(self, request):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise RuntimeError("OpenAI indisponible")
+        return ContentResponse(
+            theme_general="thème", theme_hebdo="semaine",
+            texte=f"{request.cible.value} {request.prospect_type.value} {request.date}",
+            cible=request.cible, prospect_type=request.prospect_type, generation_date=request.date
+        )
+
+
+def _runner(generator, **kwargs) -> GenerationJobRunner:
+    return GenerationJobRunner(generator=generator, workers=2, requests_per_minute=0, **kwargs)
+
+
+def test_create_job_builds_the_matrix(db):
+    repository = DBJobRepository(db)
+    job_id = asyncio.run(repository.create_job(JOB))
+
+    status = asyncio.run(repository.get_job_status(job_id))
+    assert (status.status, status.total_items, status.pending_items) == ("pending", 4, 4)
+    assert asyncio.run(repository.get_resumable_job_ids()) == [job_id]
+
+
+def test_run_job_retries_then_completes(db):
+    repository = DBJobRepository(db)
+    job_id = asyncio.run(repository.create_job(JOB))
+    generator = _FakeGenerator(failures=1)
+
+    asyncio.run(_runner(generator, max_attempts=2).run_job(job_id))
+
+    status = asyncio.run(repository.get_job_status(job_id))
+    assert (status.status, status.completed_items, status.failed_items, status.pending_items) == ("completed", 4, 0, 0)
+    assert generator.calls == 5
+    assert len(asyncio.run(repository.get_job_results(job_id, 100, 0))) == 4
+    assert asyncio.run(repository.get_resumable_job_ids()) == []
+
+
+def test_run_job_marks_exhausted_items_failed(db):
+    repository = DBJobRepository(db)
+    job_id = asyncio.run(repository.create_job(JOB))
+
+    asyncio.run(_runner(_FakeGenerator(failures=100), max_attempts=2).run_job(job_id))
+
+    status = asyncio.run(repository.get_job_status(job_id))
+    assert (status.status, status.completed_items, status.failed_items) == ("failed", 0, 4)
+    failures = asyncio.run(repository.get_job_failures(job_id))
+    assert len(failures) == 4
+    assert all("OpenAI indisponible" in failure["error"] for failure in failures)
+
+
+def test_resume_pending_jobs_finishes_an_interrupted_job(db):
+    repository = DBJobRepository(db)
+    job_id = asyncio.run(repository.create_job(JOB))
+    # Processus arrêté après le démarrage du job et un seul élément terminé
+    item_id, request, _ = asyncio.run(repository.start_job(job_id))[0]
+    content = asyncio.run(_FakeGenerator().generate_content(request))
+    asyncio.run(repository.complete_item(job_id, item_id, content, request))
+    assert asyncio.run(repository.get_job_status(job_id)).status == "running"
+
+    generator = _FakeGenerator()
+
+    async def scenario():
+        runner = _runner(generator)
+        await runner.resume_pending_jobs()
+        await asyncio.gather(*runner._tasks.values())
+
+    asyncio.run(scenario())
+
+    status = asyncio.run(repository.get_job_status(job_id))
+    assert (status.status, status.completed_items) == ("completed", 4)
+    # Seuls les éléments restants sont régénérés
+    assert generator.calls == 3
+
+
+def test_rescan_picks_up_jobs_created_after_start(db):
+    repository = DBJobRepository(db)
+
+    async def scenario():
+        runner = _runner(_FakeGenerator(), rescan_interval=0.01)
+        await runner.resume_pending_jobs()
+        runner.start()
+        # Job laissé en attente par un autre réplica après le démarrage
+        job_id = await repository.create_job(JOB)
+        try:
+            for _ in range(200):
+                status = await repository.get_job_status(job_id)
+                if status.status == "completed":
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await runner.shutdown()
+        return status
+
+    status = asyncio.run(scenario())
+    assert (status.status, status.completed_items) == ("completed", 4)
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import date
+
+import httpx
+from openai import AsyncOpenAI
+from sqlalchemy import func, select
+
+from benchmarks import fake_openai
+from database.models import GeneratedContent
+from models.schemas import ContentRequest
+from services.content_ai import OpenAIContentGenerator
+from services.openai_batch import OpenAIBatchService, decode_custom_id, encode_custom_id
+
+
+def _requests(count: int):
+    return [ContentRequest(cible="LinkedIn", prospect_type="Qualifié", date=date(2025, 6, 16 + index))
+            for index in range(count)]
+
+
+def _service(chunk_size: int = 2) -> OpenAIBatchService:
+    """Service branché sur le serveur OpenAI factice, sans réseau"""
+    client = AsyncOpenAI(
+        api_key="sk-test", base_url="http://fake-openai/v1", max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_openai.app))
+    )
+    return OpenAIBatchService(generator=OpenAIContentGenerator(client=client), chunk_size=chunk_size,
+                              poll_interval=0)
+
+
+def _count(db) -> int:
+    return db.scalar(select(func.count()).select_from(GeneratedContent))
+
+
+def test_custom_id_round_trip():
+    request = _requests(1)[0]
+    assert decode_custom_id(encode_custom_id(7, request)) == request
+
+
+def test_run_submits_waits_and_ingests(db):
+    service = _service()
+
+    async def scenario():
+        summary = await service.run(_requests(5))
+        batch = await service.client.batches.retrieve(summary["batch_id"])
+        return summary, await service.ingest(batch)
+
+    summary, again = asyncio.run(scenario())
+    assert (summary["status"], summary["inserted"], summary["failed"]) == ("completed", 5, 0)
+    assert _count(db) == 5
+    # Deuxième ingestion du même batch : aucun doublon
+    assert again["already_ingested"] == 5
+    assert _count(db) == 5
+
+
+def test_interrupted_ingest_resumes_without_duplicates(db):
+    service = _service()
+    save_chunk = service._save_chunk
+    calls = []
+
+    async def failing_second_chunk(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            return []
+        return await save_chunk(*args)
+
+    async def scenario():
+        batch = await service.wait(await service.submit(_requests(5)))
+        service._save_chunk = failing_second_chunk
+        interrupted = await service.ingest(batch)
+        service._save_chunk = save_chunk
+        return interrupted, await service.ingest(batch)
+
+    interrupted, resumed = asyncio.run(scenario())
+    assert (interrupted["interrupted"], interrupted["inserted"]) == (True, 2)
+    assert resumed["inserted"] == 5
+    assert _count(db) == 5
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from services.openai_resilience import CircuitBreaker, CircuitOpenError, ResilientOpenAICaller, RetryPolicy
+
+
+class _NoLimit:
+    async def acquire(self, estimated_tokens: int = 0) -> None:
+        return None
+
+    def update_from_headers(self, headers) -> None:
+        return None
+
+
+def _half_open_caller() -> ResilientOpenAICaller:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    return ResilientOpenAICaller(limiter=_NoLimit(), breaker=breaker, retry_policy=RetryPolicy(max_attempts=1),
+                                 enabled=True)
+
+
+async def _ok():
+    return "ok"
+
+
+def test_cancelled_half_open_trial_releases_the_breaker():
+    caller = _half_open_caller()
+
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(3600)
+
+        trial = asyncio.create_task(caller.call(hang))
+        await started.wait()
+        # Pendant l'essai, les autres appels sont refusés
+        with pytest.raises(CircuitOpenError):
+            await caller.call(_ok)
+
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        # L'essai annulé n'a pas de verdict : un nouvel essai est autorisé et ferme le disjoncteur
+        assert await caller.call(_ok) == "ok"
+        assert caller.breaker.state == "closed"
+
+    asyncio.run(scenario())
+
+
+def test_cancellation_during_limiter_wait_releases_the_trial():
+    caller = _half_open_caller()
+
+    class _BlockingLimit(_NoLimit):
+        async def acquire(self, estimated_tokens: int = 0) -> None:
+            await asyncio.sleep(3600)
+
+    caller.limiter = _BlockingLimit()
+
+    async def scenario():
+        trial = asyncio.create_task(caller.call(_ok))
+        await asyncio.sleep(0)
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+
+        caller.limiter = _NoLimit()
+        assert await caller.call(_ok) == "ok"
+
+    asyncio.run(scenario())
+
+
+def test_rejected_call_does_not_release_a_running_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    breaker.before_call()
+    caller = ResilientOpenAICaller(limiter=_NoLimit(), breaker=breaker, enabled=True)
+
+    # Un appel refusé ne touche pas à l'essai en cours
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(caller.call(_ok))
+    assert breaker._trial_running